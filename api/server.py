@@ -0,0 +1,395 @@
+import json
+import base64
+import struct
+import asyncio
+import hashlib
+import threading
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Espera máxima por uma mudança de estado antes de verificar se o servidor foi finalizado, em segundos
+STOP_CHECK_INTERVAL = 0.5
+
+# Tamanho máximo do corpo de uma requisição HTTP e de um frame WebSocket recebidos, em bytes: as
+# chamadas e os frames de controle cabem com folga, e um tamanho maior não é alocado
+MAX_BODY = 4096
+MAX_FRAME = 4096
+
+# Status de fechamento do WebSocket para uma mensagem grande demais
+WS_CLOSE_TOO_BIG = 1009
+
+HTTP_STATUS = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large"}
+
+
+class FrameTooLargeError(ValueError):
+    """Frame WebSocket recebido maior que `MAX_FRAME`.
+    """
+
+
+class MonitorServer():
+    """Servidor HTTP + WebSocket local para monitoramento e controle dos elevadores.
+
+    Roda em um único event loop asyncio em uma thread própria. O estado enviado aos clientes vem
+    somente da memória do :class:`gpio.ElevatorController`, então a quantidade de clientes conectados
+    não gera nenhuma transação no barramento Modbus.
+
+    Rotas:
+
+    * ``GET /state``: estado atual de todos os elevadores;
+    * ``GET /metrics``: viagens recentes, eventos das portas, emergências e uso dos barramentos;
+    * ``POST /calls``: injeta uma chamada (``{"floor": "S", "direction": "up"}`` para chamadas de andar
+      ou ``{"floor": "S", "car": 1}`` para chamadas internas);
+    * ``GET /ws``: WebSocket que envia o estado de cada elevador sempre que ele muda e aceita chamadas
+      no mesmo formato de ``POST /calls``.
+    """
+    def __init__(self, elevator_controller, host="127.0.0.1", port=8080, push_interval=0.1, send_timeout=1.0) -> None:
+        """Inicializa um novo servidor de monitoramento.
+
+        :param elevator_controller: Instância do controle dos elevadores
+        :type elevator_controller: class:`gpio.ElevatorController`
+        :param host: Endereço de escuta, default é "127.0.0.1"
+        :type host: str
+        :param port: Porta de escuta, default é 8080
+        :type port: int
+        :param push_interval: Intervalo mínimo em segundos entre envios de mudanças de estado, default é 0.1
+        :type push_interval: float
+        :param send_timeout: Tempo máximo em segundos para um cliente receber um envio, depois do qual
+            ele é desconectado, default é 1.0
+        :type send_timeout: float
+        """
+        self.elevator_controller = elevator_controller
+        self.host = host
+        self.port = port
+        self.push_interval = push_interval
+        self.send_timeout = send_timeout
+
+        self._clients = set()
+        self._loop = None
+        self._stop = None
+        self._thread = None
+
+    def start(self) -> None:
+        """Inicia o servidor em uma thread própria.
+        """
+        self._thread = threading.Thread(target=self._run, name="monitor-server", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        """Finaliza o servidor e desconecta os clientes.
+        """
+        if self._loop is not None and self._stop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self) -> None:
+        """Executa o event loop do servidor.
+        """
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        except OSError as e:
+            print(f"Erro ao iniciar o servidor de monitoramento: {e}")
+        finally:
+            self._loop.close()
+
+    async def _serve(self) -> None:
+        """Abre o socket do servidor e envia as mudanças de estado até o servidor ser finalizado.
+        """
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        print(f"Servidor de monitoramento em http://{self.host}:{self.port}")
+
+        async with server:
+            await self._push_changes()
+
+        # Encerra as conexões ainda abertas
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _push_changes(self) -> None:
+        """Envia aos clientes WebSocket o estado de cada elevador que mudou desde o último envio,
+        esperando as mudanças no quadro de estados do controlador em vez de consultá-lo periodicamente.
+        """
+        loop = asyncio.get_running_loop()
+        controller = self.elevator_controller
+        version = controller.state_board.version
+
+        while not self._stop.is_set():
+            snapshots = await loop.run_in_executor(None, controller.state_board.wait_for_version, version,
+                                                   STOP_CHECK_INTERVAL)
+
+            changed = [snapshot for snapshot in snapshots if snapshot.version > version]
+            version = max([version] + [snapshot.version for snapshot in changed])
+
+            if changed and self._clients:
+                for snapshot in changed:
+                    await self._broadcast({"type": "car", **controller.describe_snapshot(snapshot)})
+
+            # Agrupa as mudanças próximas em um único envio
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=self.push_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _broadcast(self, message) -> None:
+        """Envia uma mensagem para todos os clientes WebSocket ao mesmo tempo, removendo os
+        desconectados e os que não recebem o envio em `send_timeout`, para que um cliente lento não
+        atrase os outros.
+
+        :param message: Mensagem a ser enviada
+        :type message: dict
+        """
+        frame = _encode_frame(json.dumps(message).encode())
+        clients = list(self._clients)
+        results = await asyncio.gather(*(self._send(writer, frame) for writer in clients))
+        for writer, sent in zip(clients, results):
+            if not sent:
+                self._clients.discard(writer)
+                writer.close()
+
+    async def _send(self, writer, frame) -> bool:
+        """Envia um frame para um cliente WebSocket, esperando no máximo `send_timeout`.
+
+        :param writer: Stream de escrita da conexão
+        :type writer: class:`asyncio.StreamWriter`
+        :param frame: Frame codificado
+        :type frame: bytes
+        :return: Verdadeiro se o cliente recebeu o frame dentro do tempo
+        :rtype: bool
+        """
+        try:
+            writer.write(frame)
+            await asyncio.wait_for(writer.drain(), timeout=self.send_timeout)
+            return True
+        except (ConnectionError, OSError, asyncio.TimeoutError):
+            return False
+
+    async def _handle_client(self, reader, writer) -> None:
+        """Trata uma conexão: lê a requisição HTTP e responde ou faz o upgrade para WebSocket.
+
+        :param reader: Stream de leitura da conexão
+        :type reader: class:`asyncio.StreamReader`
+        :param writer: Stream de escrita da conexão
+        :type writer: class:`asyncio.StreamWriter`
+        """
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, path, _ = request_line.split(" ", 2)
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            body = b""
+            if "content-length" in headers:
+                length = int(headers["content-length"])
+                if length < 0:
+                    raise ValueError(f"Content-Length inválido: {length}")
+                # O corpo grande demais não é lido: a resposta é enviada e a conexão fechada
+                if length > MAX_BODY:
+                    self._send_http(writer, 413, {"error": f"Corpo maior que {MAX_BODY} bytes"})
+                    await writer.drain()
+                    return
+                body = await reader.readexactly(length)
+
+            if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._handle_websocket(reader, writer, headers)
+                return
+
+            status, payload = self._route(method, path, body)
+            self._send_http(writer, status, payload)
+            await writer.drain()
+        except (ConnectionError, OSError, ValueError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def _route(self, method, path, body) -> tuple:
+        """Executa uma rota HTTP.
+
+        :param method: Método HTTP
+        :type method: str
+        :param path: Caminho requisitado
+        :type path: str
+        :param body: Corpo da requisição
+        :type body: bytes
+        :return: Código de status e corpo JSON da resposta
+        :rtype: tuple(int, dict)
+        """
+        if path == "/state":
+            if method != "GET":
+                return 405, {"error": "Método não permitido"}
+            return 200, {"cars": self.elevator_controller.get_elevators_snapshot()}
+
+        if path == "/metrics":
+            if method != "GET":
+                return 405, {"error": "Método não permitido"}
+            return 200, self._metrics()
+
+        if path == "/calls":
+            if method != "POST":
+                return 405, {"error": "Método não permitido"}
+            try:
+                self._inject_call(json.loads(body or b"{}"))
+            except (ValueError, TypeError) as e:
+                return 400, {"error": str(e)}
+            return 202, {"status": "aceita"}
+
+        return 404, {"error": "Rota não encontrada"}
+
+    def _metrics(self) -> dict:
+        """Monta as métricas recentes a partir dos dados em memória do controlador.
+
+        :return: Viagens recentes, chamadas atendidas e as suas esperas, eventos das portas, latências
+            das emergências, uso dos barramentos, travamentos recuperados pelo watchdog e a coordenação
+            entre grupos (None se desligada)
+        :rtype: dict
+        """
+        controller = self.elevator_controller
+        return {"trips": list(controller.trips),
+                "calls": list(controller.calls.history),
+                "call_waits": controller.calls.wait_stats(),
+                "emergencies": list(controller.emergencies),
+                "door_events": [{"time": event_time, "car": car, "event": event}
+                                for event_time, car, event in list(controller.door_events)],
+                "buses": [modbus_controller.get_stats() for modbus_controller in controller.modbus_controllers],
+                "last_bus_report": controller.last_bus_report,
+                "watchdog": controller.watchdog.get_stats(),
+                "group": controller.group.get_stats() if controller.group is not None else None}
+
+    def _inject_call(self, call) -> None:
+        """Repassa uma chamada recebida de um cliente para o despacho dos elevadores.
+
+        :param call: Chamada com `floor` e, opcionalmente, `car` ou `direction`
+        :type call: dict
+        :raises ValueError: Se a chamada for inválida
+        """
+        if not isinstance(call, dict) or "floor" not in call:
+            raise ValueError("A chamada deve informar o andar em 'floor'!")
+        self.elevator_controller.inject_call(floor=call["floor"], car=call.get("car"), direction=call.get("direction"))
+
+    def _send_http(self, writer, status, payload) -> None:
+        """Escreve uma resposta HTTP com corpo JSON.
+
+        :param writer: Stream de escrita da conexão
+        :type writer: class:`asyncio.StreamWriter`
+        :param status: Código de status HTTP
+        :type status: int
+        :param payload: Corpo da resposta
+        :type payload: dict
+        """
+        body = json.dumps(payload).encode()
+        writer.write((f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                      "Content-Type: application/json\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      "Connection: close\r\n\r\n").encode() + body)
+
+    async def _handle_websocket(self, reader, writer, headers) -> None:
+        """Completa o handshake WebSocket, envia o estado inicial e trata as mensagens do cliente.
+
+        :param reader: Stream de leitura da conexão
+        :type reader: class:`asyncio.StreamReader`
+        :param writer: Stream de escrita da conexão
+        :type writer: class:`asyncio.StreamWriter`
+        :param headers: Cabeçalhos da requisição de upgrade
+        :type headers: dict
+        """
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\n"
+                      "Connection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+        # Estado completo na conexão; depois disso, só as mudanças
+        for car in self.elevator_controller.get_elevators_snapshot():
+            writer.write(_encode_frame(json.dumps({"type": "car", **car}).encode()))
+        await writer.drain()
+        self._clients.add(writer)
+
+        while True:
+            try:
+                opcode, payload = await _read_frame(reader)
+            except FrameTooLargeError:
+                writer.write(_encode_frame(struct.pack("!H", WS_CLOSE_TOO_BIG), opcode=0x8))
+                await writer.drain()
+                return
+
+            if opcode == 0x8:  # Fechamento
+                writer.write(_encode_frame(b"", opcode=0x8))
+                await writer.drain()
+                return
+            if opcode == 0x9:  # Ping
+                writer.write(_encode_frame(payload, opcode=0xA))
+                await writer.drain()
+            elif opcode == 0x1:  # Texto: chamada injetada
+                try:
+                    self._inject_call(json.loads(payload))
+                    reply = {"type": "call", "status": "aceita"}
+                except (ValueError, TypeError) as e:
+                    reply = {"type": "call", "error": str(e)}
+                writer.write(_encode_frame(json.dumps(reply).encode()))
+                await writer.drain()
+
+
+def _encode_frame(payload, opcode=0x1) -> bytes:
+    """Monta um frame WebSocket do servidor (sem máscara).
+
+    :param payload: Conteúdo do frame
+    :type payload: bytes
+    :param opcode: Opcode do frame, default é texto (0x1)
+    :type opcode: int
+    :return: Frame codificado
+    :rtype: bytes
+    """
+    header = struct.pack("B", 0x80 | opcode)
+    length = len(payload)
+
+    if length < 126:
+        header += struct.pack("B", length)
+    elif length < 1 << 16:
+        header += struct.pack("!BH", 126, length)
+    else:
+        header += struct.pack("!BQ", 127, length)
+
+    return header + payload
+
+
+async def _read_frame(reader) -> tuple:
+    """Lê um frame WebSocket enviado pelo cliente, removendo a máscara.
+
+    :param reader: Stream de leitura da conexão
+    :type reader: class:`asyncio.StreamReader`
+    :return: Opcode e conteúdo do frame
+    :rtype: tuple(int, bytes)
+    :raises FrameTooLargeError: Se o frame for maior que `MAX_FRAME`, antes de ler o conteúdo
+    """
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_FRAME:
+        raise FrameTooLargeError(f"Frame de {length} bytes, máximo {MAX_FRAME}")
+
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+
+    if mask is not None:
+        payload = bytes(byte ^ mask[idx % 4] for idx, byte in enumerate(payload))
+
+    return opcode, payload
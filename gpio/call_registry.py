@@ -0,0 +1,341 @@
+import time
+import itertools
+import threading
+from collections import deque
+
+from setup.config import CAR, HALL_UP, HALL_DOWN
+
+# Tipos de chamada, na ordem dos bits de cada andar
+CALL_KINDS = (CAR, HALL_UP, HALL_DOWN)
+
+# Prioridades das paradas (menor valor é atendido primeiro)
+PRIORITY_OVERDUE = 0
+PRIORITY_NORMAL = 1
+
+# Origem das chamadas
+ORIGIN_PANEL = "painel"
+ORIGIN_API = "api"
+ORIGIN_GROUP = "grupo"
+
+
+class Call():
+    """Chamada pendente: andar, tipo do botão, origem e instante de chegada.
+
+    Uma chamada de andar é a mesma para todos os elevadores que a atendem, então a espera é
+    registrada uma única vez, pelo primeiro elevador que chega ao andar.
+    """
+    __slots__ = ("floor", "kind", "origin", "arrived_at", "overdue")
+
+    def __init__(self, floor, kind, origin, arrived_at) -> None:
+        """Cria uma nova chamada.
+
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param kind: Tipo do botão (`car`, `hall_up` ou `hall_down`)
+        :type kind: str
+        :param origin: Origem da chamada (`ORIGIN_PANEL`, `ORIGIN_API` ou `ORIGIN_GROUP`)
+        :type origin: str
+        :param arrived_at: Instante (monotônico) da chamada
+        :type arrived_at: float
+        """
+        self.floor = floor
+        self.kind = kind
+        self.origin = origin
+        self.arrived_at = arrived_at
+        self.overdue = False
+
+    def __repr__(self) -> str:
+        return f"Call(floor={self.floor!r}, kind={self.kind!r}, origin={self.origin!r}, arrived_at={self.arrived_at:.3f})"
+
+
+class CallRegistry():
+    """Registro das chamadas pendentes de cada elevador.
+
+    As chamadas de cada elevador ficam em um conjunto de bits com um bit por andar e tipo de botão
+    (interno, subir e descer), e as paradas em um conjunto de bits com um bit por andar, então a
+    verificação de duplicatas, a inclusão e a remoção são de tempo constante. A ordem das paradas
+    fica em uma fila por prioridade: a parada é atendida na ordem de chegada dentro da prioridade,
+    e as entradas de paradas já atendidas ou promovidas são descartadas ao chegar no início da fila.
+
+    Como o tempo máximo de espera (`wait_sla`) é o mesmo para todas as chamadas, elas ultrapassam o
+    limite na ordem de chegada; uma única fila por ordem de chegada encontra as atrasadas, que são
+    promovidas para a frente da fila dos elevadores que as atendem.
+    """
+    def __init__(self, floor_codes, num_cars, wait_sla=60.0, history=1000, clock=time.monotonic) -> None:
+        """Inicializa um registro sem chamadas.
+
+        :param floor_codes: Códigos dos andares, de baixo para cima
+        :type floor_codes: tuple[str]
+        :param num_cars: Quantidade de elevadores
+        :type num_cars: int
+        :param wait_sla: Espera máxima de uma chamada, em segundos, antes de ser promovida, default é 60.0
+        :type wait_sla: float
+        :param history: Quantidade de chamadas atendidas mantidas em `history`, default é 1000
+        :type history: int
+        :param clock: Função que retorna o instante atual em segundos, default é `time.monotonic`
+        :type clock: callable
+        """
+        self.floor_codes = tuple(floor_codes)
+        self.floor_index = {floor: idx for idx, floor in enumerate(self.floor_codes)}
+        self.num_cars = num_cars
+        self.wait_sla = wait_sla
+        self.clock = clock
+        # O despacho registra as chamadas e as threads de movimento as atendem
+        self._lock = threading.Lock()
+
+        # Bits das chamadas (andar * 3 + tipo) e das paradas (andar) de cada elevador
+        self._calls = [0] * num_cars
+        self._stops = [0] * num_cars
+        self._records = [{} for _ in range(num_cars)]
+        self._stop_count = [0] * num_cars
+
+        # Fila de paradas por prioridade, com a marca da entrada válida de cada andar
+        self._levels = [[deque(), deque()] for _ in range(num_cars)]
+        self._marks = [[0] * len(self.floor_codes) for _ in range(num_cars)]
+        self._mark = itertools.count(1)
+
+        # Chamadas de andar abertas (compartilhadas entre os elevadores) e chamadas por ordem de chegada
+        self._hall_calls = {}
+        self._arrivals = deque()
+
+        # Chamadas atendidas: andar, tipo, origem, elevador, espera e se passou do limite
+        self.history = deque(maxlen=history)
+
+    @staticmethod
+    def _bit(floor_idx, kind) -> int:
+        return floor_idx * len(CALL_KINDS) + CALL_KINDS.index(kind)
+
+    def add(self, car_idx, floor, kind, origin=ORIGIN_PANEL) -> bool:
+        """Registra uma chamada para um elevador, ignorando uma chamada igual já pendente.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param kind: Tipo do botão (`car`, `hall_up` ou `hall_down`)
+        :type kind: str
+        :param origin: Origem da chamada, default é `ORIGIN_PANEL`
+        :type origin: str
+        :return: Verdadeiro se a chamada é nova para o elevador
+        :rtype: bool
+        """
+        with self._lock:
+            floor_idx = self.floor_index[floor]
+            bit = self._bit(floor_idx, kind)
+            if self._calls[car_idx] >> bit & 1:
+                return False
+
+            # Uma chamada de andar já aberta para outro elevador mantém o instante da primeira chegada
+            call = self._hall_calls.get(bit) if kind != CAR else None
+            if call is None:
+                call = Call(floor, kind, origin, self.clock())
+                self._arrivals.append(call)
+                if kind != CAR:
+                    self._hall_calls[bit] = call
+
+            self._calls[car_idx] |= 1 << bit
+            self._records[car_idx][bit] = call
+
+            if not self._stops[car_idx] >> floor_idx & 1:
+                self._stops[car_idx] |= 1 << floor_idx
+                self._stop_count[car_idx] += 1
+                self._enqueue(car_idx, floor_idx, PRIORITY_OVERDUE if call.overdue else PRIORITY_NORMAL)
+            elif call.overdue:
+                self._enqueue(car_idx, floor_idx, PRIORITY_OVERDUE)
+            return True
+
+    def _enqueue(self, car_idx, floor_idx, priority) -> None:
+        """Coloca a parada na fila da prioridade, invalidando a entrada anterior do andar.
+        """
+        mark = next(self._mark)
+        self._marks[car_idx][floor_idx] = mark
+        self._levels[car_idx][priority].append((floor_idx, mark))
+
+    def has_call(self, car_idx, floor, kind) -> bool:
+        """Verifica se o elevador tem uma chamada pendente de um tipo para o andar.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :param floor: Código do andar
+        :type floor: str
+        :param kind: Tipo do botão
+        :type kind: str
+        :return: Verdadeiro se a chamada está pendente
+        :rtype: bool
+        """
+        return bool(self._calls[car_idx] >> self._bit(self.floor_index[floor], kind) & 1)
+
+    def has_stop(self, car_idx, floor) -> bool:
+        """Verifica se o elevador tem alguma chamada pendente para o andar.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :param floor: Código do andar
+        :type floor: str
+        :return: Verdadeiro se o andar é uma parada do elevador
+        :rtype: bool
+        """
+        return bool(self._stops[car_idx] >> self.floor_index[floor] & 1)
+
+    def has_hall_call(self, car_idx, floor) -> bool:
+        """Verifica se alguma das chamadas pendentes do elevador para o andar veio de um botão externo.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :param floor: Código do andar
+        :type floor: str
+        :return: Verdadeiro se algum botão externo pediu o andar
+        :rtype: bool
+        """
+        floor_idx = self.floor_index[floor]
+        return bool(self._calls[car_idx] >> self._bit(floor_idx, HALL_UP) & 0b11)
+
+    def is_empty(self, car_idx) -> bool:
+        """Verifica se o elevador não tem paradas pendentes.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :return: Verdadeiro se não há paradas
+        :rtype: bool
+        """
+        return self._stop_count[car_idx] == 0
+
+    def next_stop(self, car_idx) -> str:
+        """Próxima parada do elevador: a mais antiga da maior prioridade.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :return: Código do andar, ou None se não houver paradas
+        :rtype: str
+        """
+        with self._lock:
+            marks = self._marks[car_idx]
+            for level in self._levels[car_idx]:
+                while level:
+                    floor_idx, mark = level[0]
+                    if marks[floor_idx] == mark:
+                        return self.floor_codes[floor_idx]
+                    level.popleft()
+            return None
+
+    def stops(self, car_idx) -> tuple:
+        """Paradas pendentes do elevador, na ordem de atendimento.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :return: Códigos dos andares
+        :rtype: tuple[str]
+        """
+        with self._lock:
+            marks = self._marks[car_idx]
+            return tuple(self.floor_codes[floor_idx] for level in self._levels[car_idx]
+                         for floor_idx, mark in level if marks[floor_idx] == mark)
+
+    def serve(self, car_idx, floor) -> list:
+        """Atende todas as chamadas do elevador para o andar, registrando a espera de cada uma.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :param floor: Código do andar em que o elevador chegou
+        :type floor: str
+        :return: Chamadas atendidas pela primeira vez (as de andar já atendidas por outro elevador ficam de fora)
+        :rtype: list[class:`Call`]
+        """
+        with self._lock:
+            floor_idx = self.floor_index[floor]
+            if not self._stops[car_idx] >> floor_idx & 1:
+                return []
+
+            now = self.clock()
+            served = []
+            for kind in CALL_KINDS:
+                bit = self._bit(floor_idx, kind)
+                call = self._records[car_idx].pop(bit, None)
+                if call is None:
+                    continue
+                self._calls[car_idx] &= ~(1 << bit)
+
+                if kind == CAR or self._hall_calls.get(bit) is call:
+                    self._hall_calls.pop(bit, None)
+                    served.append(call)
+                    self.history.append({"floor": call.floor, "kind": call.kind, "origin": call.origin,
+                                         "car": car_idx + 1, "wait": now - call.arrived_at, "overdue": call.overdue})
+
+            self._remove_stop(car_idx, floor_idx)
+            return served
+
+    def _remove_stop(self, car_idx, floor_idx) -> None:
+        """Remove a parada do elevador; a entrada na fila é descartada ao chegar no início.
+        """
+        self._stops[car_idx] &= ~(1 << floor_idx)
+        self._marks[car_idx][floor_idx] = 0
+        self._stop_count[car_idx] -= 1
+
+    def clear(self, car_idx) -> None:
+        """Descarta todas as chamadas do elevador (ex.: emergência). As chamadas de andar continuam
+        abertas nos outros elevadores que as têm.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        """
+        with self._lock:
+            for bit, call in self._records[car_idx].items():
+                if call.kind != CAR and not any(self._calls[other] >> bit & 1
+                                                for other in range(self.num_cars) if other != car_idx):
+                    self._hall_calls.pop(bit, None)
+
+            self._calls[car_idx] = 0
+            self._stops[car_idx] = 0
+            self._records[car_idx] = {}
+            self._stop_count[car_idx] = 0
+            self._levels[car_idx] = [deque(), deque()]
+            self._marks[car_idx] = [0] * len(self.floor_codes)
+
+    def _is_pending(self, call) -> bool:
+        """Verifica se algum elevador ainda tem a chamada pendente.
+        """
+        bit = self._bit(self.floor_index[call.floor], call.kind)
+        return any(self._records[car_idx].get(bit) is call for car_idx in range(self.num_cars))
+
+    def overdue(self) -> list:
+        """Encontra as chamadas que passaram de `wait_sla` desde a última consulta e promove as suas
+        paradas para a frente da fila dos elevadores que as atendem.
+
+        :return: Chamadas que passaram do limite de espera
+        :rtype: list[class:`Call`]
+        """
+        with self._lock:
+            limit = self.clock() - self.wait_sla
+            late = []
+            while self._arrivals and self._arrivals[0].arrived_at <= limit:
+                call = self._arrivals.popleft()
+                if not self._is_pending(call):
+                    continue
+
+                call.overdue = True
+                late.append(call)
+                floor_idx = self.floor_index[call.floor]
+                bit = self._bit(floor_idx, call.kind)
+                for car_idx in range(self.num_cars):
+                    if self._records[car_idx].get(bit) is call:
+                        self._enqueue(car_idx, floor_idx, PRIORITY_OVERDUE)
+
+            # Descarta da frente as chamadas já atendidas, sem esperar o limite delas
+            while self._arrivals and not self._is_pending(self._arrivals[0]):
+                self._arrivals.popleft()
+            return late
+
+    def wait_stats(self) -> dict:
+        """Espera das chamadas atendidas recentemente.
+
+        :return: Chamadas, espera média, p95 e máxima em segundos e chamadas que passaram do limite
+        :rtype: dict
+        """
+        waits = sorted(record["wait"] for record in list(self.history))
+        if not waits:
+            return {"calls": 0, "mean": 0.0, "p95": 0.0, "max": 0.0, "overdue": 0}
+        return {"calls": len(waits),
+                "mean": sum(waits) / len(waits),
+                "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+                "max": waits[-1],
+                "overdue": sum(record["overdue"] for record in list(self.history))}
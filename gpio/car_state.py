@@ -0,0 +1,139 @@
+import threading
+
+
+class CarSnapshot():
+    """Estado imutável de um elevador em um instante, com a versão em que foi publicado.
+
+    Os leitores recebem sempre um snapshot completo, então andar, estado, posição e fila são
+    consistentes entre si sem precisar de lock.
+    """
+    __slots__ = ("car", "floor", "between", "state", "direction", "door", "position", "temperature", "queue",
+                 "version")
+
+    def __init__(self, car, floor, state="Parado", between=None, direction=None, door=None, position=None,
+                 temperature=None, queue=(), version=0) -> None:
+        """Cria um novo snapshot.
+
+        :param car: Número do elevador
+        :type car: int
+        :param floor: Nome do último andar em que o elevador esteve
+        :type floor: str
+        :param state: Estado do elevador, default é "Parado"
+        :type state: str
+        :param between: Andares abaixo e acima do elevador quando ele está entre andares, opcional
+        :type between: tuple(str, str)
+        :param direction: Sentido do movimento ("up" ou "down"), None se parado
+        :type direction: str
+        :param door: Estado da porta, opcional
+        :type door: str
+        :param position: Última posição lida do encoder, opcional
+        :type position: int
+        :param temperature: Última temperatura medida, opcional
+        :type temperature: float
+        :param queue: Fila de requisições do elevador
+        :type queue: tuple[str]
+        :param version: Versão do quadro em que o snapshot foi publicado
+        :type version: int
+        """
+        for name, value in (("car", car), ("floor", floor), ("between", between), ("state", state),
+                            ("direction", direction), ("door", door), ("position", position),
+                            ("temperature", temperature), ("queue", tuple(queue)), ("version", version)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value) -> None:
+        raise AttributeError("CarSnapshot é imutável!")
+
+    def __repr__(self) -> str:
+        return f"CarSnapshot({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+    def replace(self, **changes) -> "CarSnapshot":
+        """Cria um novo snapshot com os campos de `changes` alterados.
+
+        :return: Novo snapshot
+        :rtype: class:`CarSnapshot`
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return CarSnapshot(**fields)
+
+    def as_dict(self) -> dict:
+        """Converte o snapshot em um dicionário serializável em JSON.
+
+        :return: Campos do snapshot
+        :rtype: dict
+        """
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields["between"] = None if self.between is None else list(self.between)
+        fields["queue"] = list(self.queue)
+        return fields
+
+
+class StateBoard():
+    """Quadro com o snapshot mais recente de cada elevador.
+
+    Cada publicação cria um novo :class:`CarSnapshot` e troca de uma vez a tupla de snapshots,
+    então a leitura é só a leitura de uma referência. Os consumidores podem esperar na condição do
+    quadro por uma versão maior que a última que viram, sem custo enquanto nada muda.
+    """
+    def __init__(self, snapshots) -> None:
+        """Inicializa o quadro com o snapshot inicial de cada elevador.
+
+        :param snapshots: Snapshot inicial de cada elevador, na ordem dos índices
+        :type snapshots: list[class:`CarSnapshot`]
+        """
+        self._snapshots = tuple(snapshots)
+        self._condition = threading.Condition()
+        self.version = 0
+
+    def publish(self, car_idx, **changes) -> CarSnapshot:
+        """Publica um novo snapshot do elevador com os campos de `changes` alterados. Não publica
+        nada se nenhum campo mudar.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :return: Snapshot atual do elevador
+        :rtype: class:`CarSnapshot`
+        """
+        with self._condition:
+            current = self._snapshots[car_idx]
+            if all(getattr(current, name) == value for name, value in changes.items()):
+                return current
+
+            self.version += 1
+            snapshot = current.replace(version=self.version, **changes)
+            self._snapshots = self._snapshots[:car_idx] + (snapshot,) + self._snapshots[car_idx + 1:]
+            self._condition.notify_all()
+
+        return snapshot
+
+    def snapshots(self) -> tuple:
+        """Snapshots atuais de todos os elevadores, sem lock.
+
+        :return: Snapshot de cada elevador
+        :rtype: tuple[class:`CarSnapshot`]
+        """
+        return self._snapshots
+
+    def get(self, car_idx) -> CarSnapshot:
+        """Snapshot atual de um elevador, sem lock.
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :return: Snapshot do elevador
+        :rtype: class:`CarSnapshot`
+        """
+        return self._snapshots[car_idx]
+
+    def wait_for_version(self, version, timeout=None) -> tuple:
+        """Espera algum elevador publicar um snapshot com versão maior que `version`.
+
+        :param version: Última versão vista pelo consumidor
+        :type version: int
+        :param timeout: Tempo máximo de espera em segundos, default é esperar indefinidamente
+        :type timeout: float
+        :return: Snapshots atuais de todos os elevadores (os que mudaram têm `version` maior que a informada)
+        :rtype: tuple[class:`CarSnapshot`]
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version > version, timeout=timeout)
+            return self._snapshots
@@ -0,0 +1,169 @@
+import time
+import threading
+
+
+class Door():
+    """Máquina de estados da porta de um elevador (abrindo, aberta, fechando e fechada).
+
+    As transições são temporizadas por uma thread própria da porta, de modo que abrir, estender ou
+    fechar a porta nunca bloqueia a thread de movimento do elevador nem o barramento Modbus.
+    """
+    OPENING = "Abrindo"
+    OPEN = "Aberta"
+    CLOSING = "Fechando"
+    CLOSED = "Fechada"
+
+    def __init__(self, elevator_num, open_time=1.0, close_time=1.0, car_dwell=2.0,
+                 hall_dwell=4.0, extend_dwell=3.0, min_dwell=1.0) -> None:
+        """Inicializa uma nova porta, inicialmente fechada.
+
+        :param elevator_num: Número do elevador ao qual a porta pertence
+        :type elevator_num: int
+        :param open_time: Tempo de abertura da porta em segundos
+        :type open_time: float
+        :param close_time: Tempo de fechamento da porta em segundos
+        :type close_time: float
+        :param car_dwell: Tempo de porta aberta quando a parada atende apenas chamadas internas
+        :type car_dwell: float
+        :param hall_dwell: Tempo de porta aberta quando a parada atende uma chamada de andar
+        :type hall_dwell: float
+        :param extend_dwell: Tempo adicional de porta aberta após uma nova chamada no mesmo andar
+        :type extend_dwell: float
+        :param min_dwell: Tempo mínimo de porta aberta antes de um fechamento antecipado
+        :type min_dwell: float
+        """
+        self.elevator_num = elevator_num
+        self.open_time = open_time
+        self.close_time = close_time
+        self.car_dwell = car_dwell
+        self.hall_dwell = hall_dwell
+        self.extend_dwell = extend_dwell
+        self.min_dwell = min_dwell
+
+        self.state = Door.CLOSED
+
+        # Função que indica se não há nada pendente para o elevador (permite fechar antes do tempo)
+        self.can_close_early = None
+
+        self._dwell = car_dwell
+        self._deadline = None
+        self._opened_at = 0.0
+        self._hold_until = 0.0
+        self._listeners = []
+        self._running = True
+
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add_listener(self, callback) -> None:
+        """Registra uma função chamada a cada evento da porta com os argumentos `(elevator_num, event)`.
+
+        :param callback: Função chamada nos eventos da porta
+        :type callback: callable
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, event) -> None:
+        """Repassa um evento da porta para os ouvintes registrados.
+
+        :param event: Evento ocorrido (um dos estados da porta ou "Estendida")
+        :type event: str
+        """
+        for callback in self._listeners:
+            callback(self.elevator_num, event)
+
+    def _set_state(self, state, deadline) -> None:
+        """Troca o estado da porta e define o instante da próxima transição.
+
+        :param state: Novo estado da porta
+        :type state: str
+        :param deadline: Instante (monotônico) da próxima transição, ou None
+        :type deadline: float
+        """
+        self.state = state
+        self._deadline = deadline
+        self._notify(state)
+        self._condition.notify_all()
+
+    def open(self, hall_call=False) -> None:
+        """Abre a porta. O tempo de permanência aberta depende do tipo de chamada atendida na parada.
+        Se a porta já estiver aberta, o tempo é estendido.
+
+        :param hall_call: Indica se a parada atende uma chamada de andar
+        :type hall_call: bool
+        """
+        with self._condition:
+            if self.state in (Door.OPEN, Door.OPENING):
+                self.extend()
+                return
+
+            self._dwell = self.hall_dwell if hall_call else self.car_dwell
+            self._set_state(Door.OPENING, time.monotonic() + self.open_time)
+
+    def extend(self) -> None:
+        """Estende o tempo de porta aberta por causa de uma nova chamada no mesmo andar,
+        reabrindo a porta caso ela esteja fechando.
+        """
+        with self._condition:
+            now = time.monotonic()
+            self._hold_until = now + self.extend_dwell
+
+            if self.state == Door.OPEN:
+                self._deadline = max(self._deadline, self._hold_until)
+            elif self.state == Door.OPENING:
+                self._dwell = max(self._dwell, self.extend_dwell)
+            else:
+                self._dwell = self.extend_dwell
+                self._set_state(Door.OPENING, now + self.open_time)
+
+            self._notify("Estendida")
+            self._condition.notify_all()
+
+    def is_closed(self) -> bool:
+        """Verifica se a porta está totalmente fechada.
+
+        :return: Verdadeiro se a porta estiver fechada
+        :rtype: bool
+        """
+        return self.state == Door.CLOSED
+
+    def _run(self) -> None:
+        """Loop da thread da porta, que executa as transições temporizadas da máquina de estados.
+        """
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                timeout = None
+
+                if self.state == Door.OPENING and now >= self._deadline:
+                    self._opened_at = now
+                    self._set_state(Door.OPEN, now + self._dwell)
+                    continue
+
+                if self.state == Door.OPEN:
+                    min_dwell_reached = now - self._opened_at >= self.min_dwell and now >= self._hold_until
+                    nothing_pending = self.can_close_early is not None and self.can_close_early()
+
+                    if now >= self._deadline or (min_dwell_reached and nothing_pending):
+                        self._set_state(Door.CLOSING, now + self.close_time)
+                        continue
+
+                    # Reavalia periodicamente se a porta pode fechar antes do tempo
+                    timeout = min(self._deadline - now, 0.1)
+
+                elif self.state == Door.CLOSING and now >= self._deadline:
+                    self._set_state(Door.CLOSED, None)
+                    continue
+
+                if timeout is None and self._deadline is not None:
+                    timeout = max(self._deadline - now, 0.0)
+
+                self._condition.wait(timeout)
+
+    def shutdown(self) -> None:
+        """Finaliza a thread da porta.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
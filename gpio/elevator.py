@@ -1,130 +1,271 @@
-import json
 import time
 import math
+import threading
+from collections import deque
+from dataclasses import asdict
 
 import RPi.GPIO as GPIO
 
+from uart.modbus_controller import PRIORITY_EMERGENCY
+from .door import Door
 from .engine import Engine
-from .pid import PID
+from .floor_estimator import FloorEstimator
+from .pid import PID, GainSchedule, RelayAutotuner
+
+# Quantidade de intervalos entre amostras do laço de controle mantidos para a medida do jitter
+CONTROL_JITTER_WINDOW = 2000
 
 
 class Elevator():
     """Classe responsável por controlar o elevador, gerenciando a calibração, movimento e detecção de andares.
     """
-    def __init__(self, elevator_num, modbus_controller, controller) -> None:
+    def __init__(self, elevator_config, system_config, modbus_controller, controller) -> None:
         """Inicializa um novo elevador.
 
-        :param elevator_num: Número do elevador
-        :type elevator_num: int
+        :param elevator_config: Configuração do elevador
+        :type elevator_config: class:`setup.config.ElevatorConfig`
+        :param system_config: Configuração do sistema
+        :type system_config: class:`setup.config.SystemConfig`
         :param modbus_controller: Instância do controlador Modbus
         :type modbus_controller: class:`uart.ModbusController`
         :param controller: Instância do controlador de elevadores
         :type controller: class:`gpio.ElevatorController`
         """
-        self.elevator_num = elevator_num
-        self.engine = Engine(elevator_num)
-        self.pid = PID()
+        self.config = elevator_config
+        self.timing = system_config.timing
+        self.control = system_config.control
+        self.engine_config = system_config.engine
+        self.elevator_num = elevator_config.number
+        self.engine_id = elevator_config.engine_id
+        self.engine = Engine(elevator_config, pwm_frequency=self.timing.pwm_frequency,
+                             slew_rate=self.engine_config.slew_rate,
+                             reversal_dead_time=self.engine_config.reversal_dead_time,
+                             control_period=self.timing.control_period)
+        self.pid = PID(T=self.timing.control_period)
 
         self.modbus_controller = modbus_controller
         self.controller = controller
 
-        self.current_floor = "ground_floor"
+        self.floors = system_config.floors
+        self.floor_estimator = FloorEstimator(tolerance=self.control.floor_tolerance,
+                                              sensor_window=self.control.sensor_window)
+
+        self.current_floor = self.floors[0].name
         self.state = "Parado"
 
-        self.floors_positions = {"ground_floor": -1,
-                                 "first_floor": -1,
-                                 "second_floor": -1,
-                                 "third_floor": -1}
+        # Emergência ativa: interrompe o laço de movimento e mantém o freio travado
+        self.emergency_event = threading.Event()
+
+        # Parada segura pedida pelo watchdog: interrompe a viagem, mantendo a requisição na fila
+        self.trip_fault = threading.Event()
+        # Instante da última leitura do laço de controle, ou None fora de uma viagem
+        self.last_control = None
+
+        # Última posição lida do encoder e última temperatura medida (para consulta sem acessar o barramento)
+        self._position_published_at = 0.0
+        self.position = None
+        self.temperature = None
+
+        # Intervalos entre as leituras do encoder do laço de controle, para a medida do jitter
+        self.control_intervals = deque(maxlen=CONTROL_JITTER_WINDOW)
+
+        # Último PWM espelhado na ESP32 (None para enviar no próximo comando) e envios feitos e evitados
+        self._mirrored_pwm = None
+        self._mirrored_at = 0.0
+        self.mirror_sent = 0
+        self.mirror_skipped = 0
+
+        self.floors_positions = {floor.name: -1 for floor in self.floors}
+        self.floor_indexes = {floor.name: idx for idx, floor in enumerate(self.floors)}
+
+        # Ganhos do PID escalonados pela viagem, substituídos pelos do ensaio do relé na calibração
+        self.short_trip_scale = {"kp": self.control.short_kp_scale, "kd": self.control.short_kd_scale,
+                                 "kd_fast": self.control.short_kd_fast_scale}
+        self.gain_schedule = GainSchedule(up=(self.control.kp, self.control.ki, self.control.kd, self.control.kd_fast),
+                                          down=(self.control.kp_down, self.control.ki_down, self.control.kd_down,
+                                                self.control.kd_fast_down),
+                                          max_speed=self.control.max_speed, short_trip_scale=self.short_trip_scale)
+        self.requests_floor_table = {floor.code: floor.name for floor in self.floors}
+
+        # Porta do elevador, com os tempos de permanência definidos na configuração
+        self.door = Door(self.elevator_num, **asdict(system_config.door))
+        self.door.can_close_early = lambda: self.controller.is_queue_empty(queue_idx=self.config.index)
+        self.controller.state_board.publish(self.config.index, door=self.door.state)
+
+        # Configurações da GPIO: sensor de cada andar e andar de cada sensor
+        self.floor_sensors = {floor.name: gpio for floor, gpio in zip(self.floors, elevator_config.sensors)}
+        self.sensor_floors = {gpio: floor_name for floor_name, gpio in self.floor_sensors.items()}
 
-        self.requests_floor_table = {"G": "ground_floor",
-                                     "F": "first_floor",
-                                     "S": "second_floor",
-                                     "T": "third_floor"}
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
 
-        # Configurações da GPIO
-        with open("./setup/config.json", "r") as f:
-            configs_file = json.load(f)
+        for sensor in self.floor_sensors.values():
+            GPIO.setup(sensor, GPIO.IN)
 
-        inputs = configs_file[f"elevador_{elevator_num}"]["inputs"]
+    @property
+    def state(self) -> str:
+        """Estado do elevador ("Parado", "Subindo", "Descendo" ou "Emergencia"), publicado no quadro de estados.
+        """
+        return self._state
 
-        for inp in inputs:
-            if inp["tag"] == "SENSOR_TERREO":
-                self.ground_sensor = inp["gpio"]
-            elif inp["tag"] == "SENSOR_1_ANDAR":
-                self.first_sensor = inp["gpio"]
-            elif inp["tag"] == "SENSOR_2_ANDAR":
-                self.second_sensor = inp["gpio"]
-            elif inp["tag"] == "SENSOR_3_ANDAR":
-                self.third_sensor = inp["gpio"]
+    @state.setter
+    def state(self, value) -> None:
+        self._state = value
+        direction = {"Subindo": "up", "Descendo": "down"}.get(value)
+        self.controller.state_board.publish(self.config.index, state=value, direction=direction)
 
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setwarnings(False)
+    @property
+    def current_floor(self) -> str:
+        """Último andar em que o elevador esteve, publicado no quadro de estados.
+        """
+        return self._current_floor
+
+    @current_floor.setter
+    def current_floor(self, value) -> None:
+        self._current_floor = value
+        self.controller.state_board.publish(self.config.index, floor=value)
+
+    @property
+    def position(self) -> int:
+        """Última posição lida do encoder, publicada no quadro de estados junto com os andares
+        vizinhos quando o elevador está entre andares.
+
+        Durante uma viagem, os andares vizinhos são publicados sempre que mudam, mas a posição só é
+        publicada a cada `timing.position_interval` segundos e no fim da viagem, para que os leitores
+        do quadro não acordem a cada leitura do encoder.
+        """
+        return self._position
+
+    @position.setter
+    def position(self, value) -> None:
+        self._position = value
+        if (self.last_control is None or self._between() != self.controller.state_board.get(self.config.index).between
+                or time.monotonic() - self._position_published_at >= self.timing.position_interval):
+            self._publish_position()
+
+    def _between(self) -> tuple:
+        """Andares abaixo e acima da última posição lida, ou None se o elevador estiver em um andar.
+        """
+        lower, upper = self.floor_estimator.locate(self._position)
+        return (lower, upper) if lower != upper else None
 
-        GPIO.setup(self.ground_sensor, GPIO.IN)
-        GPIO.setup(self.first_sensor, GPIO.IN)
-        GPIO.setup(self.second_sensor, GPIO.IN)
-        GPIO.setup(self.third_sensor, GPIO.IN)     
+    def _publish_position(self) -> None:
+        """Publica no quadro de estados a última posição lida e os andares vizinhos.
+        """
+        self.controller.state_board.publish(self.config.index, position=self._position, between=self._between())
+        self._position_published_at = time.monotonic()
+
+    @property
+    def temperature(self) -> float:
+        """Última temperatura medida, publicada no quadro de estados.
+        """
+        return self._temperature
+
+    @temperature.setter
+    def temperature(self, value) -> None:
+        self._temperature = value
+        self.controller.state_board.publish(self.config.index, temperature=value)
 
     def set_floor_detection_callbacks(self):
         """Seta os callbacks dos sensores dos andares depois que a calibração finaliza.
         """
-        GPIO.add_event_detect(self.ground_sensor, GPIO.BOTH, callback=self.detect_floor, bouncetime=200)
-        GPIO.add_event_detect(self.first_sensor, GPIO.BOTH, callback=self.detect_floor, bouncetime=200)
-        GPIO.add_event_detect(self.second_sensor, GPIO.BOTH, callback=self.detect_floor, bouncetime=200)
-        GPIO.add_event_detect(self.third_sensor, GPIO.BOTH, callback=self.detect_floor, bouncetime=200)
+        for sensor in self.floor_sensors.values():
+            GPIO.add_event_detect(sensor, GPIO.BOTH, callback=self.detect_floor,
+                                  bouncetime=self.timing.sensor_bouncetime)
 
     def detect_floor(self, channel) -> None:
-        """Detecta qual andar o elevador está com base no canal do sensor ativado.
+        """Repassa a borda do sensor ao estimador de andar, que só a aceita se ela for compatível
+        com a posição do encoder, e atualiza o andar atual.
 
         :param channel: Canal do sensor ativado
         :type channel: int
         """
+        floor = self.sensor_floors.get(channel)
+        if floor is None:
+            return
 
-        if channel == self.ground_sensor:
-            self.current_floor = "ground_floor"
-        elif channel == self.first_sensor:
-            self.current_floor = "first_floor"
-        elif channel == self.second_sensor:
-            self.current_floor = "second_floor"
-        elif channel == self.third_sensor:
-            self.current_floor = "third_floor"
-            
+        rising = GPIO.input(channel) == GPIO.HIGH
+        if self.floor_estimator.sensor_edge(floor, rising) and self.floor_estimator.last_floor is not None:
+            self.current_floor = self.floor_estimator.last_floor
+
+    def read_position(self, deadline=None) -> int:
+        """Lê a posição do encoder e a repassa ao estimador de andar.
+
+        :param deadline: Prazo da leitura em segundos, default é o prazo do barramento
+        :type deadline: float
+        :return: Posição lida do encoder
+        :rtype: int
+        """
+        position = self.modbus_controller.read_encoder(engine_id=self.engine_id, deadline=deadline)
+        self.floor_estimator.update_position(position)
+        self.position = position
+        return position
+
+    def publish_pwm(self, value) -> None:
+        """Espelha na ESP32 o PWM aplicado ao motor, só quando ele muda pelo menos
+        `engine.mirror_threshold`, chega a zero ou está há `engine.mirror_heartbeat` segundos sem ser enviado.
+
+        :param value: PWM aplicado, em %
+        :type value: int
+        :raises ConnectionError: Se a transação não terminar dentro do prazo
+        :raises ValueError: Se a resposta da ESP32 for inválida
+        """
+        now = time.monotonic()
+        last = self._mirrored_pwm
+        if (last is not None and now - self._mirrored_at < self.engine_config.mirror_heartbeat
+                and (value == last or (value != 0 and abs(value - last) < self.engine_config.mirror_threshold))):
+            self.mirror_skipped += 1
+            return
+
+        self.modbus_controller.send_control_signal(engine_id=self.engine_id, value=value,
+                                                   deadline=self.timing.control_deadline)
+        self._mirrored_pwm, self._mirrored_at = value, now
+        self.mirror_sent += 1
+
+    def _publish_stop(self) -> None:
+        """Espelha na ESP32 o motor parado no fim de um movimento.
+        """
+        try:
+            self.publish_pwm(0)
+        except (ValueError, ConnectionError) as e:
+            print(f"Elevador {self.elevator_num}: falha no envio do PWM zerado: {e}")
+
+    def _drive(self, power) -> None:
+        """Aciona o motor com uma potência fixa, repetindo o comando a cada período de controle
+        enquanto o estágio de saída segura a inversão do sentido ou limita o aumento da potência.
+
+        :param power: Potência do motor
+        :type power: float
+        """
+        while self.engine.trigger_movement(power) != power:
+            if self.engine.stop_latched or self.emergency_event.wait(self.timing.control_period):
+                return
 
     def calibrate(self) -> None:
         """Calibra o elevador, identificando as posições dos andares com base nos sensores.
         """
         print(f"Iniciando Calibração do Elevador {self.elevator_num}  ...")
-        starting_pos = self.modbus_controller.read_encoder(engine_id=self.elevator_num - 1)
+        starting_pos = self.position = self.modbus_controller.read_encoder(engine_id=self.engine_id)
         print(f"Posição inicial: {starting_pos}  ...")
 
         # Descer até o térreo
-        if not GPIO.input(self.ground_sensor) == GPIO.HIGH and starting_pos > 0:
+        if not GPIO.input(self.config.sensors[0]) == GPIO.HIGH and starting_pos > 0:
             print("Descendo até o final ...")
             self.state = "Descendo"
-            self.engine.trigger_movement(-10)  # Define uma potência negativa para descer
+            self._drive(-10)  # Define uma potência negativa para descer
 
         # Para o elevador
         self.engine.trigger_movement(0)
 
         # Subir lentamente e registrar posições dos sensores
-        self.engine.trigger_movement(15)  # Define uma potência baixa para subir lentamente
+        self._drive(15)  # Define uma potência baixa para subir lentamente
         self.state = "Subindo"
         
-        for floor in self.floors_positions:
-            # Define qual sensor usar
-            if floor == "ground_floor":
-                channel = self.ground_sensor
-            elif floor == "first_floor":
-                channel = self.first_sensor
-            elif floor == "second_floor":
-                channel = self.second_sensor
-            elif floor == "third_floor":
-                channel = self.third_sensor
-
+        for floor, channel in self.floor_sensors.items():
             # Espera pela borda de subida e da timeout caso não encontre
-            rising_edge = GPIO.wait_for_edge(channel, GPIO.RISING, timeout=60000)
+            rising_edge = GPIO.wait_for_edge(channel, GPIO.RISING, timeout=self.timing.calibration_timeout)
 
-            asc_position = self.modbus_controller.read_encoder(engine_id=self.elevator_num - 1)
+            asc_position = self.modbus_controller.read_encoder(engine_id=self.engine_id)
 
             if rising_edge is None:
                 print(f"Timeout na calibração do andar {floor}!")
@@ -138,11 +279,12 @@ class Elevator():
             # if falling_edge is None:
                 # print(f"Borda de descida do andar {floor} não encontrada!")
 
-            desc_position = self.modbus_controller.read_encoder(engine_id=self.elevator_num - 1)
+            desc_position = self.read_position()
             self.current_floor = floor
 
             # Calcula a média para determinar a posição exata do andar
             self.floors_positions[floor] = math.ceil((desc_position + asc_position) / 2)
+            self.floor_estimator.set_floor_position(floor, self.floors_positions[floor])
             print(f"Andar {floor} calibrado: {self.floors_positions[floor]}")
 
             GPIO.remove_event_detect(channel)
@@ -150,60 +292,254 @@ class Elevator():
 
         # Finaliza o movimento
         self.engine.trigger_movement(0)  # Para o elevador
-        self.state = "Parado"
-        print(f"Calibração do Elevador {self.elevator_num} finalizada!")
-        self.move_to_floor("G")
 
+        # O ensaio é feito em um andar do meio, longe das extremidades do poço
+        if self.control.autotune:
+            self.autotune(self.floors[len(self.floors) // 2].name)
 
-    def move_to_floor(self, target_floor_request) -> None:
+        self.state = "Parado"
+        print(f"Calibração do Elevador {self.elevator_num} finalizada!")
+        self.move_to_floor(self.floors[0].code)
+
+    def autotune(self, floor) -> bool:
+        """Ajusta os ganhos do PID com o ensaio do relé em torno de um andar calibrado, mantendo os
+        ganhos da configuração se a oscilação não se formar, se o elevador se afastar mais de
+        `control.relay_limit` pulsos do andar ou se o barramento falhar durante o ensaio. O motor é
+        parado ao fim do ensaio em qualquer caso.
+
+        :param floor: Nome do andar em torno do qual o elevador oscila
+        :type floor: str
+        :return: Verdadeiro se os ganhos foram ajustados
+        :rtype: bool
+        """
+        center = self.floors_positions[floor]
+        tuner = RelayAutotuner(center, amplitude=self.control.relay_amplitude, cycles=self.control.relay_cycles)
+
+        # Leva o elevador até o andar com os ganhos da configuração antes de oscilar em torno dele
+        floor_code = next(code for code, name in self.requests_floor_table.items() if name == floor)
+        self.move_to_floor(floor_code, parking=True)
+
+        print(f"Elevador {self.elevator_num}: ensaio do relé em torno do andar {floor} ...")
+        self._mirrored_pwm = None
+        try:
+            while not tuner.done:
+                if self.emergency_event.is_set():
+                    return False
+
+                position = self.read_position(deadline=self.timing.control_deadline)
+                if abs(position - center) > self.control.relay_limit:
+                    print(f"Elevador {self.elevator_num}: ensaio do relé interrompido a {position - center:+.0f} pulsos "
+                          f"do andar {floor}, mantendo os ganhos da configuração")
+                    return False
+
+                applied = self.engine.trigger_movement(tuner.update(position))
+                self.publish_pwm(int(abs(applied)))
+                self.emergency_event.wait(self.timing.control_period)
+        except (ValueError, ConnectionError) as e:
+            print(f"Elevador {self.elevator_num}: falha no barramento durante o ensaio do relé, mantendo os ganhos "
+                  f"da configuração: {e}")
+            return False
+        finally:
+            self.engine.trigger_movement(0)
+            self._publish_stop()
+
+        result = tuner.result()
+        if result is None:
+            print(f"Elevador {self.elevator_num}: ensaio do relé sem oscilação, mantendo os ganhos da configuração")
+            return False
+
+        # Os ganhos derivativos dependem do período de amostragem do PID das viagens
+        self.gain_schedule = GainSchedule.from_relay(result, period=self.timing.control_period,
+                                                     short_trip_scale=self.short_trip_scale)
+        print(f"Elevador {self.elevator_num}: ganhos ajustados ({self.gain_schedule.describe()})")
+        return True
+
+
+    def move_to_floor(self, target_floor_request, parking=False) -> None:
         """Move o elevador para o andar desejado.
 
         :param target_floor_request: Código do andar de destino
         :type target_floor_request: char
+        :param parking: Indica o reposicionamento de um elevador ocioso, que não abre as portas e é
+            interrompido assim que o elevador recebe uma requisição
+        :type parking: bool
         """
         # Define o target do pid
 
         target_floor = self.requests_floor_table[target_floor_request]
 
         target_position = self.floors_positions[target_floor]
-        self.pid = PID()
+        self.pid = PID(T=self.timing.control_period)
         self.pid.update_reference(target_position)
 
-        # Pega a posição atual do elevador
-        current_position = self.modbus_controller.read_encoder(engine_id=self.elevator_num - 1)
+        # Pega a posição atual do elevador. Despachar a viagem destrava uma parada segura anterior
+        self.engine.release_stop()
+        self.trip_fault.clear()
+        try:
+            current_position = self.read_position(deadline=self.timing.control_deadline)
+        except (ValueError, ConnectionError) as e:
+            print(f"Elevador {self.elevator_num}: viagem não iniciada, falha no barramento: {e}")
+            return
+        start_floor, start_time = self.current_floor, time.monotonic()
+        trip_floors = abs(self.floor_indexes[target_floor] - self.floor_indexes[start_floor])
 
         self.state = "Subindo" if target_position - current_position > 0 else "Descendo"
 
         print(f"Elevador {self.elevator_num}: Iniciando deslocamento de {self.current_floor} ({current_position}) para {target_floor} ({target_position}) ...")
 
-        error = target_position - current_position
+        # Atualiza a potencia do motor até o encoder indicar o elevador parado no andar de destino, ou
+        # até `settle_ticks` períodos depois de chegar à zona de parada. A parada é confirmada pelo
+        # encoder, então uma borda perdida não faz o elevador passar do andar e uma borda com repique
+        # não o faz parar fora dele
+        previous_position, settle_ticks = current_position, 0
+        sampled_at, self.last_control = None, time.monotonic()
+        self._mirrored_pwm = None
+        while True:
+            if self.emergency_event.is_set():
+                self._end_control()
+                return
+            if parking and not self.controller.is_queue_empty(queue_idx=self.config.index):
+                print(f"Elevador {self.elevator_num}: reposicionamento interrompido por uma requisição")
+                self._abort_trip()
+                return
+            if self.trip_fault.is_set() or self.engine.stop_latched:
+                self._abort_trip()
+                return
+
+            # Uma leitura que falha ou volta depois de `control_deadline` para o elevador
+            try:
+                current_position = self.read_position(deadline=self.timing.control_deadline)
+            except (ValueError, ConnectionError) as e:
+                print(f"Elevador {self.elevator_num}: falha na leitura do encoder: {e}")
+                self.engine.latch_stop()
+                self._abort_trip()
+                return
+            now = time.monotonic()
+            if sampled_at is not None:
+                self.control_intervals.append(now - sampled_at)
+            sampled_at = self.last_control = now
+
+            if self.floor_estimator.last_floor is not None:
+                self.current_floor = self.floor_estimator.last_floor
+
+            # Deslocamento desde a leitura anterior: a velocidade em pulsos por período de controle
+            step, previous_position = current_position - previous_position, current_position
+
+            if self.floor_estimator.at_floor(target_floor) and abs(step) <= self.control.floor_tolerance:
+                break
+            if self.floor_estimator.reached(target_floor, window=self.control.stop_window):
+                settle_ticks += 1
+                if settle_ticks > self.control.settle_ticks:
+                    break
+            if self.emergency_event.is_set():
+                self._end_control()
+                return
+
+            direction = "up" if target_position >= current_position else "down"
+            self.pid.set_gains(*self.gain_schedule.gains(trip_floors, direction, step))
+            pwm_output = self.pid.control(current_position)
+            # Uma parada segura durante a leitura não deixa o motor ser acionado de novo
+            if self.trip_fault.is_set() or self.engine.stop_latched:
+                self._abort_trip()
+                return
+            applied = self.engine.trigger_movement(pwm_output)
+            # O PWM só vai para a ESP32 quando muda de forma significativa, não a cada período
+            try:
+                self.publish_pwm(int(abs(applied)))
+            except (ValueError, ConnectionError) as e:
+                print(f"Elevador {self.elevator_num}: falha no envio do sinal de controle: {e}")
+                self.engine.latch_stop()
+                self._abort_trip()
+                return
+
+            # Espera o próximo período, acordando na hora em caso de emergência
+            self.emergency_event.wait(self.timing.control_period)
+
+        self._end_control()
+
+        if self.emergency_event.is_set():
+            return
 
-        # Atualiza a potencia do motor enquanto não chegar no target
-        while abs(error) > 5 and not self.current_floor == target_floor:
-            current_position = self.modbus_controller.read_encoder(engine_id=self.elevator_num - 1)
+        # Chegando no andar desejado, desliga o motor e o(s) respectivo(s) botão(s)
+        self.engine.trigger_movement(0)
+        self._publish_stop()
+        self.current_floor = target_floor
 
-            pwm_output = self.pid.control(current_position)
-            self.engine.trigger_movement(pwm_output)
-            self.modbus_controller.send_control_signal(engine_id=self.elevator_num - 1, value=int(abs(pwm_output)))
+        if parking:
+            self.state = "Parado"
+            return
 
-            time.sleep(0.2)
-            error = target_position - current_position
+        self.controller.record_trip(elevator_num=self.elevator_num, origin=start_floor, destination=target_floor,
+                                    duration=time.monotonic() - start_time)
 
-        # Chegando no andar desejado, desliga o motor e o(s) respectivo(s) botão(s)
+        # Abre as portas antes de liberar o elevador, para que ele só seja despachado com a porta fechada
+        hall_call = self.controller.is_hall_request(queue_idx=self.config.index, request=target_floor_request)
+        print("Portas abertas para embarque/desembarque de passageiros ...")
+        self.door.open(hall_call=hall_call)
+
+        self.state = "Parado"
+        self.controller.turn_btns_off(elevator_idx=self.config.index, request_code=target_floor_request)
+        self.controller.remove_request(queue_idx=self.config.index, request=target_floor_request)
+
+    def _end_control(self) -> None:
+        """Encerra o laço de controle da viagem, publicando a posição final do elevador.
+        """
+        self.last_control = None
+        self._publish_position()
+
+    def _abort_trip(self) -> None:
+        """Interrompe a viagem em andamento com o motor parado, deixando o elevador livre para ser
+        despachado de novo a partir da posição atual.
+        """
         self.engine.trigger_movement(0)
+        self.trip_fault.clear()
+        self._end_control()
         self.state = "Parado"
-        self.controller.turn_btns_off(elevator_idx=self.elevator_num - 1, request_code=target_floor_request)
-        self.controller.remove_last_request(queue_idx=self.elevator_num - 1)
 
-        # Abre as portas e espera passageiros entrarem/sairem
-        print("Portas abertas para embarque/desembarque de passageiros ...")
-        self.current_floor = target_floor
-        
-        time.sleep(5)
+    def safe_stop(self, reason) -> None:
+        """Para o motor pela GPIO, sem depender do barramento, e interrompe a viagem em andamento no
+        próximo período de controle. A parada fica travada no motor até o elevador ser despachado de
+        novo, então um laço de controle que volte de uma leitura atrasada não o aciona. A requisição
+        continua na fila e é atendida de novo depois.
 
-    def emergency(self):
-        """Aciona o modo de emergência, parando o elevador imediatamente.
+        :param reason: Motivo da parada, mostrado no terminal
+        :type reason: str
         """
-        print(f"Parada de emergência {self.elevator_num}!")
-        self.state = "Emergencia"
+        print(f"Elevador {self.elevator_num}: parada segura ({reason})")
+        self.engine.latch_stop()
+        if self.last_control is not None:
+            self.trip_fault.set()
+
+    def emergency(self, detected_at=None) -> None:
+        """Aciona o modo de emergência, parando o elevador imediatamente: trava o freio, interrompe o
+        laço de movimento em andamento e envia o PWM zerado à ESP32 na frente das outras transações
+        do barramento. As latências desde a detecção são registradas no controlador.
+
+        :param detected_at: Instante (monotônico) em que a emergência foi detectada, default é agora
+        :type detected_at: float
+        """
+        detected_at = time.monotonic() if detected_at is None else detected_at
+
         self.engine.brake()
+        braked_at = time.monotonic()
+        self.emergency_event.set()
+        self.state = "Emergencia"
+        print(f"Parada de emergência {self.elevator_num}!")
+
+        try:
+            self.modbus_controller.send_control_signal(engine_id=self.engine_id, value=0, priority=PRIORITY_EMERGENCY)
+            self._mirrored_pwm, self._mirrored_at = 0, time.monotonic()
+        except (ValueError, ConnectionError) as e:
+            print(f"Elevador {self.elevator_num}: falha ao enviar a emergência pelo barramento: {e}")
+        commanded_at = time.monotonic()
+
+        self.controller.record_emergency(elevator_num=self.elevator_num, brake_latency=braked_at - detected_at,
+                                         command_latency=commanded_at - detected_at)
+
+    def release_emergency(self) -> None:
+        """Encerra o modo de emergência, destravando o freio e liberando o elevador para novas viagens.
+        """
+        print(f"Fim da emergência {self.elevator_num}!")
+        self.emergency_event.clear()
+        self.engine.release_brake()
+        self.state = "Parado"
@@ -1,25 +1,108 @@
 import time
+import queue
+import statistics
 import threading
+from collections import deque
 
-from uart.modbus_controller import ModbusController
+from setup.config import load_config, CAR, EMERGENCY, HALL_DOWN, HALL_UP
+from uart.modbus_controller import ModbusController, PRIORITY_CONTROL
+from .call_registry import CallRegistry, ORIGIN_API, ORIGIN_GROUP, ORIGIN_PANEL
+from .car_state import CarSnapshot, StateBoard
 from .elevator import Elevator
+from .parking import ParkingPolicy
+from .watchdog import Watchdog
 
 class ElevatorController():
     """Classe responsável por gerenciar as requisições dos elevadores e o envio/recebimento de mensagens pelo Modbus. 
     Também administra a fila de requisições, comandando cada elevador ao andar necessário. 
     """
-    def __init__(self) -> None:
-        self.modbus_controller = ModbusController(device_id=0x01, student_id=[9, 6, 2, 0])
-        self.elevators = [Elevator(elevator_num=1, modbus_controller=self.modbus_controller, controller=self),
-                          Elevator(elevator_num=2, modbus_controller=self.modbus_controller, controller=self)]
-        self.requests_queues = [[], []]
-        self.elevators_registers = [b'\x00' * 11, b'\x00' * 11]
+    def __init__(self, config=None, transports=None) -> None:
+        """Inicializa o controlador a partir da configuração do sistema.
 
-        self.btn_addresses = [[0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A],
-                              [0xA0, 0xA1, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7, 0xA8, 0xA9, 0xAA]]
+        :param config: Configuração do sistema, carregada de `setup/config.json` se não informada
+        :type config: class:`setup.config.SystemConfig`, opcional
+        :param transports: Transporte de cada barramento no lugar da UART (ex.: ESP32 simulada), opcional
+        :type transports: list
+        """
+        self.config = config if config is not None else load_config()
+
+        # Um controlador Modbus (com porta serial e thread de I/O próprias) por ESP32
+        self.modbus_controllers = [ModbusController(device_id=bus.device_id, student_id=bus.student_id,
+                                                    port=bus.port, baudrate=bus.baudrate,
+                                                    turnaround=self.config.timing.bus_turnaround,
+                                                    transport=transports[bus_idx] if transports else None,
+                                                    shadow_max_age=self.config.timing.shadow_max_age,
+                                                    capture_path=bus.capture_path or None,
+                                                    timeout=bus.timeout, deadline=self.config.timing.bus_deadline)
+                                   for bus_idx, bus in enumerate(self.config.buses)]
+
+        # Quadro com o snapshot imutável mais recente de cada elevador, publicado a cada mudança
+        self.state_board = StateBoard([CarSnapshot(car=elevator_config.number, floor=self.config.floors[0].name)
+                                       for elevator_config in self.config.elevators])
+        self.floors_display = {floor.name: floor.display for floor in self.config.floors}
+
+        self.elevators = [Elevator(elevator_config=elevator_config, system_config=self.config,
+                                   modbus_controller=self.modbus_controllers[elevator_config.bus], controller=self)
+                          for elevator_config in self.config.elevators]
+        self._last_bus_report = time.monotonic()
+
+        # Chamadas pendentes de cada elevador, com o instante de chegada e a origem de cada uma
+        self.calls = CallRegistry(self.config.floor_codes, len(self.elevators), wait_sla=self.config.calls.wait_sla,
+                                  history=self.config.calls.history)
+        self.door_events = deque(maxlen=100)
+        self.trips = deque(maxlen=100)
+        self.emergencies = deque(maxlen=100)
+        self.injected_calls = deque()
+        self._injected_buttons = set()
+        # Chamadas de andar atribuídas pela coordenação, recebidas na thread dela e aplicadas pela leitura dos botões
+        self.awarded_calls = deque()
+        self.last_bus_report = []
+        self._zero_registers = tuple(b'\x00' * elevator_config.register_count for elevator_config in self.config.elevators)
+        self.elevators_registers = self._empty_registers()
+        self.registers_read_at = [time.monotonic() for _ in self.elevators]
+
+        # Uma thread fixa por elevador executa as viagens recebidas pela fila, em vez de uma thread
+        # nova a cada viagem; `trip_active` fica definido do despacho até o fim da viagem
+        self.trip_queues = [queue.SimpleQueue() for _ in self.elevators]
+        self.trip_active = [threading.Event() for _ in self.elevators]
+        self.trip_threads = []
+        self._stopping_trips = False
+
+        # Demanda das chamadas de andar aprendida para estacionar os elevadores ociosos
+        self.parking = ParkingPolicy(self.config.floor_codes, path=self.config.parking.path or None,
+                                     slot_minutes=self.config.parking.slot_minutes)
+        self.floor_codes_by_name = {floor.name: floor.code for floor in self.config.floors}
+        self._idle_since = [None for _ in self.elevators]
+        self._last_demand_save = time.monotonic()
+
+        # Endereço e código de requisição de cada botão, por elevador
+        self.btn_addresses = [list(elevator_config.btn_addresses) for elevator_config in self.config.elevators]
+        self.requests_idx = [list(elevator_config.requests_idx) for elevator_config in self.config.elevators]
+
+        # Índice de cada botão pelo seu tipo e andar, usado para espelhar os botões externos entre elevadores
+        self.buttons_idx = [{(button.kind, button.floor): btn_index for btn_index, button in enumerate(elevator_config.buttons)}
+                            for elevator_config in self.config.elevators]
+
+        for elevator in self.elevators:
+            elevator.door.add_listener(self.handle_door_event)
+
+        # Instante da última volta da leitura dos botões (None até o fim da calibração), acompanhado pelo watchdog
+        self.heartbeat = None
+        self.watchdog = Watchdog(self, self.config.watchdog)
 
-        # G = Ground, F = First, S = Second, T = Third, E = Emergency
-        self.requests_idx = ["G", "F", "F", "S", "S", "T", "E", "G", "F", "S", "T"]
+        # Coordenação das chamadas de andar com os outros grupos de elevadores, se configurada, e o
+        # instante em que cada botão externo foi desligado por uma chamada atendida por outro grupo
+        self.group = None
+        self._hall_btns_off_at = {}
+
+    def _empty_registers(self) -> list:
+        """Cria a lista de registradores zerados de todos os elevadores, reaproveitando os mesmos
+        objetos `bytes` (imutáveis) a cada leitura.
+
+        :return: Registradores zerados de cada elevador
+        :rtype: list[bytes]
+        """
+        return list(self._zero_registers)
 
     def calibrate_elevators(self) -> None:
         """Envia o comando de calibração para os elevadores.
@@ -28,30 +111,294 @@ class ElevatorController():
             elevator.calibrate()
 
 
-    def insert_request(self, request, queue_idx) -> None:
+    def insert_request(self, request, queue_idx, kind=CAR, origin=ORIGIN_PANEL) -> None:
         """Insere na fila de índice `queue_idx` a requisição para movimentar os elevadores para o andar de `request`.
 
         :param request: Andar no qual um elevador é requisitado
         :type request: char
         :param queue_idx: Índice da fila de requisição do elevador
         :type queue_idx: int
+        :param kind: Tipo do botão que fez a chamada (`car`, `hall_up` ou `hall_down`), default é `car`
+        :type kind: str
+        :param origin: Origem da chamada (painel ou API), default é o painel
+        :type origin: str
         """
         print(f"Inserindo requisição para {request} no Elevador {queue_idx + 1}")
-        q = self.requests_queues[queue_idx]
-        if request not in q:
-            q.append(request)
+        if self.calls.add(queue_idx, request, kind, origin=origin):
+            self.publish_queue(queue_idx)
+
+    def is_hall_request(self, queue_idx, request) -> bool:
+        """Verifica se a requisição para o andar de `request` na fila `queue_idx` inclui uma chamada de andar.
+
+        :param queue_idx: Índice da fila de requisição do elevador
+        :type queue_idx: int
+        :param request: Andar da requisição
+        :type request: char
+        :return: Verdadeiro se algum botão externo pediu o andar
+        :rtype: bool
+        """
+        return self.calls.has_hall_call(queue_idx, request)
 
-    def remove_last_request(self, queue_idx) -> None:
-        """Remove da fila de índice `queue_idx` todas as requisições para o último andar em que o elevador chegou.
+    def is_queue_empty(self, queue_idx) -> bool:
+        """Verifica se não há requisições pendentes na fila de índice `queue_idx`.
 
         :param queue_idx: Índice da fila de requisição do elevador
         :type queue_idx: int
+        :return: Verdadeiro se a fila estiver vazia
+        :rtype: bool
+        """
+        return self.calls.is_empty(queue_idx)
+
+    def handle_door_event(self, elevator_num, event) -> None:
+        """Registra os eventos das portas dos elevadores, usados nas decisões de despacho.
+
+        :param elevator_num: Número do elevador
+        :type elevator_num: int
+        :param event: Evento da porta
+        :type event: str
+        """
+        self.door_events.append((time.monotonic(), elevator_num, event))
+        self.state_board.publish(elevator_num - 1, door=self.elevators[elevator_num - 1].door.state)
+
+    def publish_queue(self, queue_idx) -> None:
+        """Publica no quadro de estados a fila de requisições atual de um elevador.
+
+        :param queue_idx: Índice da fila de requisição do elevador
+        :type queue_idx: int
+        """
+        self.state_board.publish(queue_idx, queue=self.calls.stops(queue_idx))
+
+    def record_trip(self, elevator_num, origin, destination, duration) -> None:
+        """Registra uma viagem concluída por um elevador nas métricas recentes.
+
+        :param elevator_num: Número do elevador
+        :type elevator_num: int
+        :param origin: Andar de partida
+        :type origin: str
+        :param destination: Andar de chegada
+        :type destination: str
+        :param duration: Duração da viagem em segundos
+        :type duration: float
+        """
+        self.trips.append({"time": time.time(), "car": elevator_num, "origin": origin,
+                           "destination": destination, "duration": duration})
+
+    def record_emergency(self, elevator_num, brake_latency, command_latency) -> None:
+        """Registra as latências de uma parada de emergência nas métricas recentes.
+
+        :param elevator_num: Número do elevador
+        :type elevator_num: int
+        :param brake_latency: Tempo entre a detecção e o freio travado, em segundos
+        :type brake_latency: float
+        :param command_latency: Tempo entre a detecção e a confirmação do comando pelo barramento, em segundos
+        :type command_latency: float
+        """
+        self.emergencies.append({"time": time.time(), "car": elevator_num, "brake_latency": brake_latency,
+                                 "command_latency": command_latency})
+
+    def update_temperature(self, elevator_idx, temperature) -> None:
+        """Publica a temperatura medida de um elevador e a envia para a ESP32.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        :param temperature: Temperatura medida
+        :type temperature: float
+        """
+        elevator = self.elevators[elevator_idx]
+        elevator.temperature = temperature
+        elevator.modbus_controller.send_temperature(elevator_id=elevator.engine_id, temperature=temperature)
+
+    def inject_call(self, floor, car=None, direction=None) -> None:
+        """Injeta uma chamada como se o botão correspondente tivesse sido pressionado. Sem `car`
+        a chamada é de andar (botão externo); com `car` é uma chamada interna do elevador.
+
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param car: Número do elevador para chamadas internas, opcional
+        :type car: int
+        :param direction: Sentido da chamada de andar ("up" ou "down"), opcional
+        :type direction: str
+        :raises ValueError: Se o andar, o elevador ou o sentido forem inválidos
+        """
+        if floor not in self.config.floor_codes:
+            raise ValueError(f"Andar desconhecido: {floor}!")
+
+        if car is not None:
+            if not 1 <= car <= len(self.elevators):
+                raise ValueError(f"Elevador desconhecido: {car}!")
+            elv_idxs, kinds = [car - 1], [CAR]
+        else:
+            kinds = {"up": [HALL_UP], "down": [HALL_DOWN], None: [HALL_UP, HALL_DOWN]}.get(direction)
+            if kinds is None:
+                raise ValueError(f"Sentido desconhecido: {direction}!")
+            elv_idxs = range(len(self.elevators))
+
+        for kind in kinds:
+            if any((kind, floor) in self.buttons_idx[elv_index] for elv_index in elv_idxs):
+                self.injected_calls.append((car, kind, floor))
+                return
+
+        raise ValueError(f"Não há botão para a chamada {floor} ({direction or 'interna'})!")
+
+    def _merge_injected_calls(self) -> None:
+        """Marca nos registradores lidos os botões das chamadas injetadas, para que sejam tratadas
+        junto com os botões pressionados. Uma chamada de andar é marcada no painel do primeiro
+        elevador fora de emergência que tem o botão, já que os painéis em emergência são ignorados
+        por :meth:`handle_registers`.
+        """
+        while self.injected_calls:
+            car, kind, floor = self.injected_calls.popleft()
+            elv_idxs = [car - 1] if car is not None else [idx for idx, elevator in enumerate(self.elevators)
+                                                           if not elevator.emergency_event.is_set()]
+            for elv_index in elv_idxs:
+                btn_index = self.buttons_idx[elv_index].get((kind, floor))
+                if btn_index is None:
+                    continue
+                registers = list(self.elevators_registers[elv_index])
+                registers[btn_index] = 1
+                self.elevators_registers[elv_index] = registers
+                self._injected_buttons.add((elv_index, btn_index))
+                break
+            else:
+                print(f"Chamada {floor} descartada: nenhum elevador fora de emergência tem o botão")
+
+    def serve_at_open_door(self, request, queue_idxs) -> bool:
+        """Atende uma chamada para o andar de `request` com um elevador que já está parado
+        nele de porta aberta, estendendo o tempo da porta em vez de enfileirar a requisição.
+
+        :param request: Andar no qual um elevador é requisitado
+        :type request: char
+        :param queue_idxs: Índices dos elevadores que podem atender a chamada
+        :type queue_idxs: list[int]
+        :return: Verdadeiro se a chamada foi atendida por uma porta aberta
+        :rtype: bool
+        """
+        for idx in queue_idxs:
+            elevator = self.elevators[idx]
+            at_floor = elevator.current_floor == elevator.requests_floor_table[request]
+
+            if at_floor and elevator.state == "Parado" and not elevator.door.is_closed():
+                elevator.door.extend()
+                for other_idx in queue_idxs:
+                    self.turn_btns_off(elevator_idx=other_idx, request_code=request)
+                return True
+
+        return False
+
+    def remove_request(self, queue_idx, request) -> None:
+        """Remove da fila de índice `queue_idx` todas as requisições para o andar em que o elevador chegou,
+        registrando a espera de cada chamada atendida.
+
+        :param queue_idx: Índice da fila de requisição do elevador
+        :type queue_idx: int
+        :param request: Andar em que o elevador chegou
+        :type request: char
+        """
+        if self.calls.has_stop(queue_idx, request):
+            served = self.calls.serve(queue_idx, request)
+            self.publish_queue(queue_idx)
+
+            if self.group is not None:
+                for call in served:
+                    if call.kind != CAR:
+                        self.group.served_locally(call.floor, call.kind)
+
+    def estimate_eta(self, request, floor_time) -> float:
+        """Estima o tempo até o elevador mais próximo chegar ao andar de `request`, percorrendo as
+        paradas pendentes de cada elevador na ordem da fila.
+
+        :param request: Andar chamado
+        :type request: char
+        :param floor_time: Tempo estimado de viagem por andar, em segundos
+        :type floor_time: float
+        :return: Menor tempo estimado em segundos, ou None se nenhum elevador puder atender
+        :rtype: float
+        """
+        floor_index = {code: idx for idx, code in enumerate(self.config.floor_codes)}
+        target = floor_index[request]
+        best = None
+
+        for idx, elevator in enumerate(self.elevators):
+            if elevator.emergency_event.is_set() or -1 in elevator.floors_positions.values():
+                continue
+
+            door = elevator.door
+            stop_time = door.open_time + door.hall_dwell + door.close_time
+            position = floor_index[self.floor_codes_by_name[elevator.current_floor]]
+            eta = 0.0
+            for stop in self.calls.stops(idx):
+                if stop == request:
+                    break
+                eta += abs(floor_index[stop] - position) * floor_time + stop_time
+                position = floor_index[stop]
+            eta += abs(target - position) * floor_time
+
+            if best is None or eta < best:
+                best = eta
+
+        return best
+
+    def accept_hall_call(self, request, kind) -> None:
+        """Recebe uma chamada de andar atribuída a este grupo pela coordenação. Chamado pela thread
+        da coordenação, só enfileira a chamada: ela é posta nos elevadores por :meth:`_merge_awarded_calls`
+        na thread de leitura dos botões, junto com as outras requisições.
+
+        :param request: Andar chamado
+        :type request: char
+        :param kind: Tipo do botão (`hall_up` ou `hall_down`)
+        :type kind: str
+        """
+        self.awarded_calls.append((request, kind))
+
+    def _merge_awarded_calls(self) -> None:
+        """Põe os elevadores fora de emergência para atender as chamadas de andar atribuídas a este
+        grupo, ou atende na hora com um elevador parado de porta aberta no andar.
+        """
+        all_idxs = list(range(len(self.elevators)))
+        while self.awarded_calls:
+            request, kind = self.awarded_calls.popleft()
+            if self.serve_at_open_door(request=request, queue_idxs=all_idxs):
+                if self.group is not None:
+                    self.group.served_locally(request, kind)
+                continue
+
+            for q_index in all_idxs:
+                if self.elevators[q_index].emergency_event.is_set():
+                    continue
+                self.insert_request(request=request, queue_idx=q_index, kind=kind, origin=ORIGIN_GROUP)
+
+    def turn_hall_btns_off(self, request, kind) -> None:
+        """Desliga em todos os elevadores o botão externo de um andar e tipo (ex.: chamada atendida por outro grupo).
+
+        :param request: Andar do botão
+        :type request: char
+        :param kind: Tipo do botão
+        :type kind: str
+        """
+        self._hall_btns_off_at[(request, kind)] = time.monotonic()
+        for elv_index, elevator in enumerate(self.elevators):
+            btn_index = self.buttons_idx[elv_index].get((kind, request))
+            if btn_index is None:
+                continue
+            try:
+                elevator.modbus_controller.write_registers(initial_address=self.btn_addresses[elv_index][btn_index],
+                                                           quantity=1, values=bytes([0]))
+            except (ValueError, ConnectionError) as e:
+                print(f"Elevador {elv_index + 1}: falha ao desligar o botão {request}: {e}")
+
+    def check_waiting_calls(self) -> None:
+        """Avisa das chamadas esperando há mais de `calls.wait_sla` segundos, que passam para a frente
+        das filas dos elevadores que as atendem.
         """
-        requests_queue = self.requests_queues[queue_idx]
-        if len(requests_queue) != 0:
-            current_floor = requests_queue[0]
-            while current_floor in requests_queue:
-                requests_queue.remove(current_floor)
+        late = self.calls.overdue()
+        if not late:
+            return
+
+        now = time.monotonic()
+        for call in late:
+            print(f"Chamada para {call.floor} ({call.kind}, {call.origin}) esperando há {now - call.arrived_at:.0f} s")
+        for queue_idx in range(len(self.elevators)):
+            self.publish_queue(queue_idx)
 
     def set_registers(self, elevator_idx, registers) -> None:
         """Atualiza a lista de registradores de um determinado elevador.
@@ -62,6 +409,38 @@ class ElevatorController():
         :type registers: bytes
         """
         self.elevators_registers[elevator_idx] = list(registers)
+        self.registers_read_at[elevator_idx] = time.monotonic()
+
+    def handle_emergency(self, elevator_idx) -> bool:
+        """Trata o botão de emergência de um elevador logo após a leitura dos seus registradores, antes
+        de qualquer outro botão: para o elevador na hora, limpando a sua fila, ou o libera se o botão
+        foi desligado.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        :return: Verdadeiro se o elevador está em emergência
+        :rtype: bool
+        """
+        elevator = self.elevators[elevator_idx]
+        btn_index = self.buttons_idx[elevator_idx].get((EMERGENCY, None))
+        if btn_index is None:
+            return False
+
+        if not self.elevators_registers[elevator_idx][btn_index]:
+            if elevator.emergency_event.is_set():
+                elevator.release_emergency()
+            return False
+
+        if not elevator.emergency_event.is_set():
+            elevator.emergency(detected_at=self.registers_read_at[elevator_idx])
+            self.calls.clear(elevator_idx)
+            self.publish_queue(elevator_idx)
+
+            # Desliga todos os outros botões
+            for floor in self.config.floor_codes:
+                self.turn_btns_off(elevator_idx, floor)
+
+        return True
 
     def turn_btns_off(self, elevator_idx, request_code) -> None:
         """Desliga todos os botões referentes ao andar de `request_code` para o elevador de índice `elevator_idx`.
@@ -72,79 +451,127 @@ class ElevatorController():
         :type request_code: char
         """
         # Pega o endereço dos botões a serem desligados
-        btns_adresses = [addr for idx, addr in enumerate(self.btn_addresses[elevator_idx]) if self.requests_idx[idx] == request_code]
+        btns_adresses = [addr for idx, addr in enumerate(self.btn_addresses[elevator_idx])
+                         if self.requests_idx[elevator_idx][idx] == request_code]
 
-        # Chama o modbus para desligar cada um
+        # Chama o modbus do elevador para desligar cada um; um botão que fica aceso não impede o atendimento
         for btn_adress in btns_adresses:
-            self.modbus_controller.write_registers(initial_address=btn_adress,
-                                                               quantity=1, values=bytes([0]))
+            try:
+                self.elevators[elevator_idx].modbus_controller.write_registers(initial_address=btn_adress,
+                                                                   quantity=1, values=bytes([0]))
+            except (ValueError, ConnectionError) as e:
+                print(f"Elevador {elevator_idx + 1}: falha ao desligar o botão {request_code}: {e}")
 
     def handle_registers(self) -> None:
         """Trata a lista de registradores de cada um dos elevadores. Verifica quais botões 
         foram pressionados e adiciona as respectivas requisições na fila.
         """
-        for elv_index in range(2):
+        all_idxs = list(range(len(self.elevators)))
+        recorded_calls = set()
 
-            # Pega os registradores dos dois elevadores
+        for elv_index, elevator_config in enumerate(self.config.elevators):
+            # Em emergência os outros botões do elevador são ignorados
+            if self.elevators[elv_index].emergency_event.is_set():
+                continue
+
+            # Pega os registradores do elevador
             elevator_registers = self.elevators_registers[elv_index]
-            other_elv_index = elv_index == 0
-            other_elevator_registers = self.elevators_registers[other_elv_index]
 
-            for btn_index in range(11):
+            for btn_index, button in enumerate(elevator_config.buttons):
                 btn = elevator_registers[btn_index]
+                request = self.requests_idx[elv_index][btn_index]
 
-                # Se o botão não estiver pressionado ou já estiver na fila, continua
-                if not btn or self.requests_idx[btn_index] in self.requests_queues[elv_index]:
+                # Se o botão não estiver pressionado, for o de emergência ou a chamada já estiver na fila, continua
+                if not btn or button.kind == EMERGENCY or self.calls.has_call(elv_index, request, button.kind):
                     continue
-
-                # Botão de emergência
-                if btn_index == 6:
-                    self.requests_queues[elv_index] = [self.requests_idx[btn_index]]
-                    # Desliga todos os outros botões
-                    for floor in ["G", "F", "S", "T"]:
-                        self.turn_btns_off(elv_index, floor)
-                    break  # Em caso de emergência, interrompe o processamento
+                # Chamada de andar ainda em leilão ou atribuída a outro grupo, ou botão lido aceso antes
+                # de ser desligado pela chamada atendida por outro grupo
+                if button.is_hall and self.group is not None:
+                    off_at = self._hall_btns_off_at.get((request, button.kind))
+                    if self.group.is_pending(request, button.kind) or (off_at is not None
+                                                                       and self.registers_read_at[elv_index] <= off_at):
+                        continue
+                origin = ORIGIN_API if (elv_index, btn_index) in self._injected_buttons else ORIGIN_PANEL
 
                 # Lógica exclusiva dos botões externos
-                if btn_index < 6:
-                    # Botão do outro elevador
-                    other_btn = other_elevator_registers[btn_index]
-
-                    # Se o outro botão não tiver pressionado, pressiona ele
-                    if not other_btn:
-                        self.modbus_controller.write_registers(initial_address=self.btn_addresses[other_elv_index][btn_index],
-                                                               quantity=1, values=bytes([1]))
-
-                    # Põe ambos elevadores para atender o pedido
-                    for q_index in range(2):
-                        self.insert_request(request=self.requests_idx[btn_index], queue_idx=q_index)
+                if button.is_hall:
+                    # Registra a chamada uma única vez, mesmo que apareça no painel de mais de um elevador
+                    if (button.kind, button.floor) not in recorded_calls:
+                        recorded_calls.add((button.kind, button.floor))
+                        self.parking.record_call(button.floor)
+
+                    # Se o mesmo botão dos outros elevadores não estiver pressionado, pressiona ele
+                    for other_elv_index in all_idxs:
+                        other_btn_index = self.buttons_idx[other_elv_index].get((button.kind, button.floor))
+                        if other_elv_index == elv_index or other_btn_index is None:
+                            continue
+
+                        if not self.elevators_registers[other_elv_index][other_btn_index]:
+                            try:
+                                self.elevators[other_elv_index].modbus_controller.write_registers(
+                                    initial_address=self.btn_addresses[other_elv_index][other_btn_index],
+                                    quantity=1, values=bytes([1]), priority=PRIORITY_CONTROL)
+                            except (ValueError, ConnectionError) as e:
+                                print(f"Elevador {other_elv_index + 1}: falha ao acender o botão {request}: {e}")
+
+                    # Um elevador parado de porta aberta no andar atende o pedido na hora
+                    if self.serve_at_open_door(request=request, queue_idxs=all_idxs):
+                        continue
+
+                    # Com a coordenação entre grupos, a chamada só entra nas filas do grupo que vencer o leilão
+                    if self.group is not None:
+                        self.group.submit(request, button.kind)
+                        continue
+
+                    # Põe todos os elevadores fora de emergência para atender o pedido
+                    for q_index in all_idxs:
+                        if self.elevators[q_index].emergency_event.is_set():
+                            continue
+                        self.insert_request(request=request, queue_idx=q_index, kind=button.kind, origin=origin)
 
                 # Lógica exclusiva dos botões internos
                 else:
+                    if self.serve_at_open_door(request=request, queue_idxs=[elv_index]):
+                        continue
+
                     # Põe apenas o respectivo elevador para atender o pedido
-                    self.insert_request(request=self.requests_idx[btn_index], queue_idx=elv_index)
+                    self.insert_request(request=request, queue_idx=elv_index, origin=origin)
 
-        # Reseta os registradores de ambos os elevadores
-        self.elevators_registers = [b'\x00' * 11, b'\x00' * 11]
+        # Reseta os registradores de todos os elevadores
+        self.elevators_registers = self._empty_registers()
+        self._injected_buttons.clear()
 
     def get_elevator_info(self, elevator_number):
-        """Requisita ao elevador `elevator_number` seu andar e estado atual.
+        """Busca no quadro de estados o andar e o estado atual do elevador `elevator_number`.
 
         :param elevator_number: Número do elevador
         :type elevator_number: int
         :return: Andar e estado do elevador
         :rtype: tuple(str, str)
         """
-        floors_display = {"ground_floor": "Terreo",
-                    "first_floor": "1º Andar",
-                    "second_floor": "2º Andar",
-                    "third_floor": "3º Andar",
-                    None: "N/A",}
+        snapshot = self.state_board.get(elevator_number)
+        return self.floors_display.get(snapshot.floor, "N/A"), snapshot.state
+
+    def describe_snapshot(self, snapshot) -> dict:
+        """Converte o snapshot de um elevador em um dicionário serializável, com o nome de exibição do andar.
+
+        :param snapshot: Snapshot do elevador
+        :type snapshot: class:`gpio.car_state.CarSnapshot`
+        :return: Campos do snapshot
+        :rtype: dict
+        """
+        fields = snapshot.as_dict()
+        fields["floor"] = self.floors_display.get(snapshot.floor, "N/A")
+        return fields
 
-        floor = floors_display[self.elevators[elevator_number].current_floor]
-        state = self.elevators[elevator_number].state
+    def get_elevators_snapshot(self) -> list:
+        """Monta o estado de todos os elevadores a partir do quadro de estados, sem acessar o barramento.
 
-        return floor, state
+        :return: Elevador, andar, andares vizinhos (se estiver entre andares), estado, sentido, porta,
+            posição, temperatura, fila e versão de cada elevador
+        :rtype: list[dict]
+        """
+        return [self.describe_snapshot(snapshot) for snapshot in self.state_board.snapshots()]
 
     def handle_requests(self, exit_event):
         """Lê os botões do Modbus e trata-os, mandando as requisições para os elevadores enquanto
@@ -153,36 +580,216 @@ class ElevatorController():
         :param exit_event: Evento para finalização da thread
         :type exit_event: class:`threading.Event`
         """
+        if self.config.watchdog.enabled:
+            self.watchdog.start()
+        self.start_trip_threads()
+
         self.calibrate_elevators()
 
         for elevator in self.elevators:
             elevator.set_floor_detection_callbacks()
 
         while not exit_event.is_set():
-            self.set_registers(elevator_idx= 0, registers=self.modbus_controller.read_registers(initial_address=0x00, quantity=11))
-            self.set_registers(elevator_idx= 1, registers=self.modbus_controller.read_registers(initial_address=0xA0, quantity=11))
+            self.heartbeat = time.monotonic()
+
+            # A leitura dos botões tem a mesma prioridade do controle, para que a detecção de uma
+            # emergência não espere o fim dos laços de movimento
+            for elevator_config, elevator in zip(self.config.elevators, self.elevators):
+                try:
+                    registers = elevator.modbus_controller.read_registers(initial_address=elevator_config.register_base,
+                                                                          quantity=elevator_config.register_count,
+                                                                          priority=PRIORITY_CONTROL)
+                except (ValueError, ConnectionError) as e:
+                    print(f"Elevador {elevator_config.number}: falha na leitura dos botões: {e}")
+                    continue
+                self.set_registers(elevator_idx=elevator_config.index, registers=registers)
+                self.handle_emergency(elevator_idx=elevator_config.index)
+            self._merge_injected_calls()
             self.handle_registers()
+            self._merge_awarded_calls()
+            self.report_bus_utilization()
+            self.check_waiting_calls()
+
+            for idx in range(len(self.elevators)):
+                # Só despacha o elevador depois que a porta terminar de fechar
+                if not self.calls.is_empty(idx) and self.is_available(idx):
+                    self.dispatch(idx, self.calls.next_stop(idx))
+                time.sleep(self.config.timing.poll_interval)
+
+            self.park_idle_elevators()
+            self.save_demand()
 
-            for idx, queue in enumerate(self.requests_queues):
-                elevator = self.elevators[idx]
+    def is_available(self, elevator_idx) -> bool:
+        """Verifica se o elevador pode ser despachado: parado, de porta fechada e sem viagem em andamento.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        :return: Verdadeiro se o elevador está disponível
+        :rtype: bool
+        """
+        elevator = self.elevators[elevator_idx]
+        return (elevator.state == "Parado" and elevator.door.is_closed()
+                and not self.trip_active[elevator_idx].is_set())
+
+    def dispatch(self, elevator_idx, target_floor, parking=False) -> None:
+        """Envia a viagem de um elevador para o andar `target_floor` para a thread de viagens dele.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        :param target_floor: Código do andar de destino
+        :type target_floor: char
+        :param parking: Indica o reposicionamento de um elevador ocioso
+        :type parking: bool
+        """
+        self.trip_active[elevator_idx].set()
+        self.trip_queues[elevator_idx].put((target_floor, parking))
+
+    def start_trip_threads(self) -> None:
+        """Inicia a thread de viagens de cada elevador.
+        """
+        if self.trip_threads:
+            return
+        self.trip_threads = [threading.Thread(target=self._run_trips, args=(idx,), name=f"viagens-{idx + 1}", daemon=True)
+                             for idx in range(len(self.elevators))]
+        for trip_thread in self.trip_threads:
+            trip_thread.start()
+
+    def _run_trips(self, elevator_idx) -> None:
+        """Executa as viagens de um elevador, uma de cada vez, até receber None pela fila.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        """
+        elevator = self.elevators[elevator_idx]
+        while True:
+            trip = self.trip_queues[elevator_idx].get()
+            if trip is None:
+                return
+            target_floor, parking = trip
+            # No desligamento, as viagens ainda na fila são descartadas
+            if self._stopping_trips:
+                self.trip_active[elevator_idx].clear()
+                continue
+            try:
+                elevator.move_to_floor(target_floor, parking=parking)
+            except Exception as e:
+                # Uma viagem com erro não pode derrubar a thread dos próximos despachos
+                print(f"Elevador {elevator_idx + 1}: erro na viagem para {target_floor}: {e!r}")
+                elevator.engine.trigger_movement(0)
+                elevator.state = "Parado"
+            finally:
+                self.trip_active[elevator_idx].clear()
+
+    def stop_trip_threads(self) -> None:
+        """Interrompe as viagens em andamento com o motor parado e finaliza as threads de viagens.
+        """
+        self._stopping_trips = True
+        for elevator_idx, elevator in enumerate(self.elevators):
+            if self.trip_active[elevator_idx].is_set():
+                elevator.safe_stop("desligamento")
+            self.trip_queues[elevator_idx].put(None)
+
+        for trip_thread in self.trip_threads:
+            trip_thread.join()
+        self.trip_threads = []
+
+    def park_idle_elevators(self) -> None:
+        """Reposiciona os elevadores ociosos há pelo menos `parking.idle_delay` segundos nos andares
+        com mais chance de receber as próximas chamadas, mantendo-os espalhados pelo poço. Só
+        reposiciona quando nenhum elevador está em viagem, para não disputar o barramento com elas.
+        """
+        if not self.config.parking.enabled:
+            return
+
+        now = time.monotonic()
+        idle = {}
+        for idx, elevator in enumerate(self.elevators):
+            if not self.calls.is_empty(idx) or elevator.emergency_event.is_set() or not self.is_available(idx):
+                self._idle_since[idx] = None
+                continue
+            if self._idle_since[idx] is None:
+                self._idle_since[idx] = now
+            idle[idx] = self.floor_codes_by_name[elevator.current_floor]
+
+        if any(idx not in idle and not elevator.emergency_event.is_set() for idx, elevator in enumerate(self.elevators)):
+            return
+
+        # Todos os ociosos entram na divisão do poço, mas só os ociosos há tempo suficiente se movem
+        for idx, floor in self.parking.assign(idle).items():
+            if floor != idle[idx] and now - self._idle_since[idx] >= self.config.parking.idle_delay:
+                print(f"Elevador {idx + 1}: reposicionando no andar {floor}")
+                self.dispatch(idx, floor, parking=True)
+
+    def save_demand(self, force=False) -> None:
+        """Grava o histograma de demanda a cada `parking.save_interval` segundos, se ele mudou.
+
+        :param force: Grava mesmo antes do intervalo
+        :type force: bool
+        """
+        now = time.monotonic()
+        if not self.parking.dirty or (not force and now - self._last_demand_save < self.config.parking.save_interval):
+            return
+        self._last_demand_save = now
+
+        try:
+            self.parking.save()
+        except OSError as e:
+            print(f"Erro ao gravar o histograma de demanda: {e}")
+
+    def control_jitter(self) -> dict:
+        """Intervalos entre as amostras dos laços de controle de todos os elevadores, nas últimas
+        viagens. O jitter é a diferença entre o p99 e a mediana dos intervalos.
+
+        :return: Amostras, média, desvio padrão, mediana, p99 e máximo dos intervalos em segundos, e o jitter
+        :rtype: dict
+        """
+        intervals = sorted(interval for elevator in self.elevators for interval in list(elevator.control_intervals))
+        if len(intervals) < 2:
+            return {"samples": len(intervals), "mean": 0.0, "stdev": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0, "jitter": 0.0}
+
+        p50 = intervals[len(intervals) // 2]
+        p99 = intervals[min(len(intervals) - 1, int(len(intervals) * 0.99))]
+        return {"samples": len(intervals),
+                "mean": statistics.fmean(intervals),
+                "stdev": statistics.stdev(intervals),
+                "p50": p50,
+                "p99": p99,
+                "max": intervals[-1],
+                "jitter": p99 - p50}
+
+    def report_bus_utilization(self, force=False) -> list:
+        """Mostra o uso de cada barramento Modbus a cada `timing.bus_report_interval` segundos.
+
+        :param force: Mostra o relatório mesmo antes do intervalo
+        :type force: bool
+        :return: Uso de cada barramento no período, ou lista vazia se ainda não for hora do relatório
+        :rtype: list[dict]
+        """
+        now = time.monotonic()
+        if not force and now - self._last_bus_report < self.config.timing.bus_report_interval:
+            return []
+        self._last_bus_report = now
 
-                # Em emergência para o elevador e limpa a fila
-                if len(queue) != 0 and queue[0] == 'E':
-                    print("DEBUG: Emergencia")
-                    elevator.emergency()
-                    self.requests_queues[idx] = []
+        report = [modbus_controller.get_utilization() for modbus_controller in self.modbus_controllers]
+        self.last_bus_report = report
+        for stats in report:
+            print(f"Barramento {stats['port']}: {stats['utilization'] * 100:.1f}% de uso, "
+                  f"{stats['transactions']} transações, {stats['errors']} erros, {stats['timeouts']} fora do prazo, "
+                  f"{stats['suppressed_writes']} escritas suprimidas, fila com {stats['queue_depth']}")
 
-                elif len(queue) != 0 and elevator.state == "Parado":
-                    target_floor = queue[0]
-                    move_elevator_thread = threading.Thread(target=elevator.move_to_floor, args=(target_floor,))
-                    move_elevator_thread.start()
-                time.sleep(0.05)
+        return report
 
     def shutdown_elevators(self):
         """Desliga o motor dos elevadores e desconecta o Modbus.
         """
         print("Desligando elevadores ...")
+        self.watchdog.stop()
+        # As viagens terminam antes de fechar os barramentos que elas usam
+        self.stop_trip_threads()
+        self.save_demand(force=True)
         for elevator in self.elevators:
             elevator.engine.shutdown()
+            elevator.door.shutdown()
 
-        self.modbus_controller.disconnect()
+        for modbus_controller in self.modbus_controllers:
+            modbus_controller.disconnect()
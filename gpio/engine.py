@@ -1,31 +1,40 @@
-import json
+import time
+import threading
 
 import RPi.GPIO as GPIO
 
 class Engine():
     """Classe para controlar o movimento do motor.
+
+    Os comandos passam por um estágio de saída: os pinos de direção e o PWM só são escritos quando
+    mudam, o aumento da potência é limitado a `slew_rate` e a inversão do sentido deixa o motor livre
+    por `reversal_dead_time` segundos antes de acioná-lo no sentido oposto. A redução da potência e a
+    parada são aplicadas na hora.
     """
-    def __init__(self, elevator_num) -> None:
+    def __init__(self, elevator_config, pwm_frequency=1000, slew_rate=0.0, reversal_dead_time=0.0,
+                 control_period=0.2) -> None:
         """Inicializa um novo motor.
 
-        :param elevator_num: Número do elevador ao qual o motor pertence
-        :type elevator_num: int
+        :param elevator_config: Configuração do elevador ao qual o motor pertence
+        :type elevator_config: class:`setup.config.ElevatorConfig`
+        :param pwm_frequency: Frequência do PWM do motor em Hz, default é 1000
+        :type pwm_frequency: int
+        :param slew_rate: Aumento máximo da potência, em % por segundo (0 desliga o limite)
+        :type slew_rate: float
+        :param reversal_dead_time: Tempo com o motor livre antes de inverter o sentido, em segundos
+        :type reversal_dead_time: float
+        :param control_period: Período entre os comandos do laço de controle, em segundos, usado para
+            converter `slew_rate` no aumento máximo de cada comando
+        :type control_period: float
         """
-        self.elevator_num = elevator_num
+        self.elevator_num = elevator_config.number
+        self.max_step = slew_rate * control_period
+        self.reversal_dead_time = reversal_dead_time
 
         # Configurações da GPIO
-        with open("./setup/config.json", "r") as f:
-            configs_file = json.load(f)
-
-        outputs = configs_file[f"elevador_{elevator_num}"]["outputs"]
-
-        for out in outputs:
-            if out["tag"] == "DIR1":
-                self.dir_1 = out["gpio"]
-            elif out["tag"] == "DIR2":
-                self.dir_2 = out["gpio"]
-            elif out["tag"] == "POTM":
-                self.potm = out["gpio"]
+        self.dir_1 = elevator_config.dir_1
+        self.dir_2 = elevator_config.dir_2
+        self.potm = elevator_config.potm
 
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
@@ -35,10 +44,29 @@ class Engine():
         GPIO.setup(self.potm, GPIO.OUT)
 
         # Início do PWM
-        self.pwm = GPIO.PWM(self.potm, 1000)
+        self.pwm = GPIO.PWM(self.potm, pwm_frequency)
         self.pwm.start(0)
         self.status = 'Parado'
 
+        # Freio travado (emergência): enquanto ativo, `trigger_movement` não altera o motor
+        self.lock = threading.Lock()
+        self.brake_latched = False
+        # Parada travada (parada segura): enquanto ativa, `trigger_movement` mantém o motor livre
+        self.stop_latched = False
+
+        # Saída aplicada: potência com sinal, PWM e sentido dos pinos (None quando desconhecido, ex.: freado)
+        self.output = 0.0
+        self._duty = 0.0
+        self._direction = None
+        # Último sentido acionado e instante até o qual o sentido oposto fica bloqueado
+        self._last_direction = 0
+        self._reversal_until = 0.0
+
+        # Escritas na GPIO feitas e evitadas por não haver mudança
+        self.gpio_writes = 0
+        self.skipped_writes = 0
+        self._apply(0.0, time.monotonic())
+
     def _up(self) -> None:
         """Define os pinos da GPIO para o motor subir.
         """
@@ -58,34 +86,120 @@ class Engine():
         GPIO.output(self.dir_2, GPIO.LOW)
 
     def brake(self) -> None:
-        """Define os pinos da GPIO para o motor frear.
+        """Freia o motor e trava o freio até :meth:`release_brake`, para que nenhum comando de
+        movimento em andamento o solte.
         """
-        GPIO.output(self.dir_1, GPIO.HIGH)
-        GPIO.output(self.dir_2, GPIO.HIGH)
+        with self.lock:
+            self.brake_latched = True
+            GPIO.output(self.dir_1, GPIO.HIGH)
+            GPIO.output(self.dir_2, GPIO.HIGH)
+            self.status = 'Freado'
+            if self._direction:
+                self._last_direction = self._direction
+                self._reversal_until = time.monotonic() + self.reversal_dead_time
+            self._direction = None
+            self.output = 0.0
+
+    def release_brake(self) -> None:
+        """Destrava o freio e deixa o motor livre.
+        """
+        with self.lock:
+            self.brake_latched = False
+            self._apply(0.0, time.monotonic())
+
+    def latch_stop(self) -> None:
+        """Deixa o motor livre e trava a parada até :meth:`release_stop`, para que um laço de
+        controle que volte de uma leitura atrasada não acione o motor de novo.
+        """
+        with self.lock:
+            self.stop_latched = True
+            if not self.brake_latched:
+                self._apply(0.0, time.monotonic())
+
+    def release_stop(self) -> None:
+        """Destrava a parada, liberando o motor para os comandos de movimento.
+        """
+        with self.lock:
+            self.stop_latched = False
 
     def set_duty_cycle(self, power) -> None:
         """Define a potência do PWM do motor.
         """
         self.pwm.ChangeDutyCycle(power)
 
-    def trigger_movement(self, power) -> None:
+    def trigger_movement(self, power) -> float:
         """Define a potência e direção de movimento do motor.
         Valores negativos indicam descida, positivos, subida e
         o zero deixa o motor livre.
 
+        Na inversão do sentido o motor fica livre até o fim do tempo morto: enquanto ele durar, o
+        comando deixa a saída em zero e retorna sem esperar, e o novo sentido é aplicado pelo
+        primeiro comando seguinte depois de `_reversal_until`.
+
         :param power: Potência do motor
         :type power: float
+        :return: Potência aplicada, com sinal, depois do limite de aumento (0 se o freio ou a parada
+            estiverem travados ou durante o tempo morto da inversão)
+        :rtype: float
         """
-        self.set_duty_cycle(abs(power))
-        if power < 0:
-            self._down()
-            self.status = 'Descendo'
-        elif power > 0:
-            self._up()
-            self.status = 'Subindo'
+        direction = (power > 0) - (power < 0)
+        with self.lock:
+            if self.brake_latched or self.stop_latched:
+                return 0.0
+
+            now = time.monotonic()
+            # Deixar o sentido atual registra em `_reversal_until` quando o oposto pode ser acionado
+            if direction and self._direction == -direction:
+                self._apply(0.0, now)
+            if direction and direction == -self._last_direction and now < self._reversal_until:
+                self._apply(0.0, now)
+                return 0.0
+
+            magnitude = abs(power)
+            if self.max_step > 0 and direction:
+                # O sentido novo parte do zero
+                current = self._duty if self._direction == direction else 0.0
+                magnitude = min(magnitude, current + self.max_step)
+            output = direction * magnitude
+            self._apply(output, now)
+            return output
+
+    def _apply(self, output, now) -> None:
+        """Escreve na GPIO só o que mudou na saída do motor. Deve ser chamado com a trava.
+
+        :param output: Potência com sinal
+        :type output: float
+        :param now: Instante (monotônico) da escrita
+        :type now: float
+        """
+        direction = (output > 0) - (output < 0)
+        magnitude = abs(output)
+
+        if magnitude != self._duty:
+            self.set_duty_cycle(magnitude)
+            self._duty = magnitude
+            self.gpio_writes += 1
         else:
-            self._idle()
-            self.status = 'Parado'
+            self.skipped_writes += 1
+
+        if direction != self._direction:
+            # Ao deixar um sentido, o oposto fica bloqueado pelo tempo morto
+            if self._direction:
+                self._last_direction = self._direction
+                self._reversal_until = now + self.reversal_dead_time
+            if direction > 0:
+                self._up()
+            elif direction < 0:
+                self._down()
+            else:
+                self._idle()
+            self._direction = direction
+            self.gpio_writes += 1
+        else:
+            self.skipped_writes += 1
+
+        self.output = output
+        self.status = 'Subindo' if direction > 0 else 'Descendo' if direction < 0 else 'Parado'
 
     def shutdown(self) -> None:
         """Desliga totalmente o motor.
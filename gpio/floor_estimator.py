@@ -0,0 +1,245 @@
+import time
+from bisect import bisect_left, bisect_right
+
+
+class FloorEstimator():
+    """Estimador de andar que combina as posições calibradas dos andares, as amostras do encoder
+    e as bordas dos sensores de andar.
+
+    As posições calibradas ficam em um índice ordenado, então o andar mais próximo, o próximo andar
+    no sentido do movimento e os andares vizinhos de uma posição são buscas binárias (O(log n)).
+    Bordas de sensor incompatíveis com a posição estimada pelo encoder (repiques ou leituras
+    espúrias) são descartadas.
+    """
+    def __init__(self, tolerance=5, sensor_window=600) -> None:
+        """Inicializa um novo estimador sem andares calibrados.
+
+        :param tolerance: Distância máxima (em pulsos) até a posição do andar para considerar o elevador nele, default é 5
+        :type tolerance: int
+        :param sensor_window: Distância máxima (em pulsos) entre a posição estimada e o andar para aceitar uma borda de sensor, default é 600
+        :type sensor_window: int
+        """
+        self.tolerance = tolerance
+        self.sensor_window = sensor_window
+
+        # Índice ordenado: posições calibradas e os respectivos andares
+        self._positions = []
+        self._names = []
+        self._floor_positions = {}
+
+        self.position = None
+        self.velocity = 0.0
+        self._sample_time = None
+
+        self.last_floor = None
+        self.sensor_floor = None
+        self.crossed_floors = ()
+        self.rejected_edges = 0
+
+    def set_floor_position(self, name, position) -> None:
+        """Registra (ou atualiza) a posição calibrada de um andar no índice ordenado.
+
+        :param name: Nome do andar
+        :type name: str
+        :param position: Posição calibrada do andar
+        :type position: int
+        """
+        if name in self._floor_positions:
+            idx = self._names.index(name)
+            del self._positions[idx]
+            del self._names[idx]
+
+        idx = bisect_left(self._positions, position)
+        self._positions.insert(idx, position)
+        self._names.insert(idx, name)
+        self._floor_positions[name] = position
+
+    def floor_position(self, name) -> int:
+        """Posição calibrada de um andar, ou None se ele não foi calibrado.
+
+        :param name: Nome do andar
+        :type name: str
+        :return: Posição calibrada do andar
+        :rtype: int
+        """
+        return self._floor_positions.get(name)
+
+    def update_position(self, position, timestamp=None) -> None:
+        """Registra uma amostra do encoder. Andares cruzados entre a amostra anterior e a atual
+        passam a ser o último andar conhecido, mesmo que a borda do sensor tenha sido perdida.
+
+        :param position: Posição lida do encoder
+        :type position: int
+        :param timestamp: Instante (monotônico) da leitura, default é agora
+        :type timestamp: float
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+
+        if self.position is not None and self._sample_time is not None and timestamp > self._sample_time:
+            self.velocity = (position - self.position) / (timestamp - self._sample_time)
+
+            # Andares entre a posição anterior e a atual (o mais distante da anterior é o último cruzado)
+            low, high = sorted((self.position, position))
+            start, end = bisect_left(self._positions, low), bisect_right(self._positions, high)
+            self.crossed_floors = tuple(self._names[start:end])
+            if start < end:
+                self.last_floor = self._names[end - 1] if position >= self.position else self._names[start]
+
+        self.position = position
+        self._sample_time = timestamp
+
+        nearest, distance = self.nearest_floor()
+        if nearest is not None and distance <= self.tolerance:
+            self.last_floor = nearest
+
+    def predict_position(self, timestamp=None) -> float:
+        """Extrapola a posição atual a partir da última amostra do encoder e da velocidade estimada.
+
+        :param timestamp: Instante (monotônico) da estimativa, default é agora
+        :type timestamp: float
+        :return: Posição estimada, ou None se ainda não houver amostras
+        :rtype: float
+        """
+        if self.position is None:
+            return None
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        return self.position + self.velocity * max(timestamp - self._sample_time, 0.0)
+
+    def sensor_edge(self, name, rising, timestamp=None) -> bool:
+        """Registra uma borda do sensor de um andar, se ela for compatível com a posição estimada.
+
+        :param name: Nome do andar do sensor
+        :type name: str
+        :param rising: Verdadeiro para borda de subida (sensor ativado)
+        :type rising: bool
+        :param timestamp: Instante (monotônico) da borda, default é agora
+        :type timestamp: float
+        :return: Verdadeiro se a borda foi aceita
+        :rtype: bool
+        """
+        floor_position = self._floor_positions.get(name)
+        predicted = self.predict_position(timestamp)
+
+        if floor_position is not None and predicted is not None and abs(predicted - floor_position) > self.sensor_window:
+            self.rejected_edges += 1
+            return False
+
+        if rising:
+            self.sensor_floor = name
+            self.last_floor = name
+        elif self.sensor_floor == name:
+            self.sensor_floor = None
+
+        return True
+
+    def nearest_floor(self, position=None) -> tuple:
+        """Busca o andar calibrado mais próximo de uma posição.
+
+        :param position: Posição consultada, default é a última amostra do encoder
+        :type position: float
+        :return: Nome do andar e distância até ele, ou (None, None) sem andares calibrados ou posição
+        :rtype: tuple(str, float)
+        """
+        position = self.position if position is None else position
+        if position is None or not self._positions:
+            return None, None
+
+        idx = bisect_left(self._positions, position)
+        candidates = [i for i in (idx - 1, idx) if 0 <= i < len(self._positions)]
+        best = min(candidates, key=lambda i: abs(self._positions[i] - position))
+
+        return self._names[best], abs(self._positions[best] - position)
+
+    def next_floor(self, direction, position=None) -> str:
+        """Busca o próximo andar no sentido do movimento, ignorando o andar em que o elevador já está.
+
+        :param direction: Sentido do movimento (positivo sobe, negativo desce)
+        :type direction: int
+        :param position: Posição consultada, default é a última amostra do encoder
+        :type position: float
+        :return: Nome do próximo andar, ou None se não houver
+        :rtype: str
+        """
+        position = self.position if position is None else position
+        if position is None:
+            return None
+
+        if direction > 0:
+            idx = bisect_right(self._positions, position + self.tolerance)
+            return self._names[idx] if idx < len(self._names) else None
+
+        idx = bisect_left(self._positions, position - self.tolerance) - 1
+        return self._names[idx] if idx >= 0 else None
+
+    def at_floor(self, name, position=None) -> bool:
+        """Verifica se a posição está dentro da tolerância da posição calibrada de um andar.
+
+        :param name: Nome do andar
+        :type name: str
+        :param position: Posição consultada, default é a última amostra do encoder
+        :type position: float
+        :return: Verdadeiro se o elevador está no andar
+        :rtype: bool
+        """
+        position = self.position if position is None else position
+        floor_position = self._floor_positions.get(name)
+        if position is None or floor_position is None:
+            return False
+        return abs(position - floor_position) <= self.tolerance
+
+    def reached(self, name, window) -> bool:
+        """Verifica se o elevador chegou à zona de parada de um andar: a última amostra do encoder
+        está a até `window` pulsos dele, a amostra cruzou a posição dele ou o sensor dele está ativo
+        com uma borda confirmada pelo encoder.
+
+        :param name: Nome do andar
+        :type name: str
+        :param window: Distância (em pulsos) a partir da qual o motor pode ser desligado
+        :type window: int
+        :return: Verdadeiro se o elevador pode parar no andar
+        :rtype: bool
+        """
+        if name in self.crossed_floors:
+            return True
+
+        floor_position = self._floor_positions.get(name)
+        if self.position is None or floor_position is None:
+            return False
+
+        # A borda de descida pode ser perdida pelo tempo de repique, então o sensor só vale perto do andar
+        if self.sensor_floor == name and abs(self.position - floor_position) <= self.sensor_window:
+            return True
+        return abs(self.position - floor_position) <= window
+
+    def locate(self, position=None) -> tuple:
+        """Localiza uma posição em relação aos andares calibrados.
+
+        :param position: Posição consultada, default é a última amostra do encoder
+        :type position: float
+        :return: Andares abaixo e acima da posição; ambos iguais ao andar se a posição estiver nele,
+            e None acima do último ou abaixo do primeiro andar
+        :rtype: tuple(str, str)
+        """
+        position = self.position if position is None else position
+        if position is None or not self._positions:
+            return None, None
+
+        nearest, distance = self.nearest_floor(position)
+        if distance <= self.tolerance:
+            return nearest, nearest
+
+        idx = bisect_left(self._positions, position)
+        lower = self._names[idx - 1] if idx > 0 else None
+        upper = self._names[idx] if idx < len(self._names) else None
+        return lower, upper
+
+    def between_floors(self, position=None) -> bool:
+        """Verifica se a posição está entre dois andares (fora da tolerância de qualquer andar).
+
+        :param position: Posição consultada, default é a última amostra do encoder
+        :type position: float
+        :return: Verdadeiro se o elevador está entre andares
+        :rtype: bool
+        """
+        lower, upper = self.locate(position)
+        return (lower, upper) != (None, None) and lower != upper
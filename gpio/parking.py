@@ -0,0 +1,180 @@
+import os
+import time
+import struct
+from array import array
+
+# Cabeçalho do arquivo de demanda: identificador, versão, faixas do dia e andares
+DEMAND_MAGIC = b"DMND"
+DEMAND_VERSION = 1
+DEMAND_HEADER = struct.Struct("<4sBHH")
+
+
+class ParkingPolicy():
+    """Política de estacionamento dos elevadores ociosos que aprende a demanda das chamadas de andar.
+
+    Mantém um histograma de chamadas por andar e por faixa do dia e, quando há elevadores ociosos,
+    divide o poço em trechos contíguos de demanda parecida, um por elevador, e estaciona cada
+    elevador na mediana ponderada da demanda do seu trecho. Como os trechos são disjuntos, os
+    elevadores ficam sempre espalhados pelo poço.
+
+    O histograma é salvo em um arquivo binário compacto (contadores de 32 bits).
+    """
+    def __init__(self, floor_codes, path=None, slot_minutes=60, clock=time.time) -> None:
+        """Inicializa a política, carregando o histograma salvo em `path`, se existir.
+
+        :param floor_codes: Códigos dos andares, de baixo para cima
+        :type floor_codes: tuple[str]
+        :param path: Arquivo do histograma de demanda, default é manter só em memória
+        :type path: str
+        :param slot_minutes: Duração de cada faixa do dia em minutos, default é 60
+        :type slot_minutes: int
+        :param clock: Função que retorna o horário atual (segundos desde a época), default é `time.time`
+        :type clock: callable
+        :raises ValueError: Se a duração da faixa não dividir o dia
+        """
+        if slot_minutes <= 0 or (24 * 60) % slot_minutes:
+            raise ValueError("A duração da faixa de demanda deve dividir as 24 horas do dia!")
+
+        self.floor_codes = tuple(floor_codes)
+        self.path = path
+        self.slot_minutes = slot_minutes
+        self.slots = 24 * 60 // slot_minutes
+        self.clock = clock
+
+        self.counts = array("I", bytes(4 * self.slots * len(self.floor_codes)))
+        self.dirty = False
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def _slot(self, timestamp=None) -> int:
+        """Faixa do dia (no horário local) de um instante.
+        """
+        local = time.localtime(self.clock() if timestamp is None else timestamp)
+        return (local.tm_hour * 60 + local.tm_min) // self.slot_minutes
+
+    def record_call(self, floor, timestamp=None) -> None:
+        """Registra uma chamada de andar no histograma.
+
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param timestamp: Horário da chamada, default é agora
+        :type timestamp: float
+        """
+        idx = self._slot(timestamp) * len(self.floor_codes) + self.floor_codes.index(floor)
+        if self.counts[idx] < 0xFFFFFFFF:
+            self.counts[idx] += 1
+            self.dirty = True
+
+    def demand(self, timestamp=None) -> list:
+        """Demanda estimada de cada andar para a faixa do dia, somando metade das faixas vizinhas
+        para suavizar históricos ainda pequenos.
+
+        :param timestamp: Horário consultado, default é agora
+        :type timestamp: float
+        :return: Peso de cada andar, na ordem de `floor_codes`
+        :rtype: list[float]
+        """
+        floors = len(self.floor_codes)
+        slot = self._slot(timestamp)
+
+        weights = [0.0] * floors
+        for offset, factor in ((0, 1.0), (-1, 0.5), (1, 0.5)):
+            base = ((slot + offset) % self.slots) * floors
+            for idx in range(floors):
+                weights[idx] += factor * self.counts[base + idx]
+
+        # Sem histórico, todos os andares têm o mesmo peso
+        if not any(weights):
+            return [1.0] * floors
+        return weights
+
+    def parking_floors(self, num_cars, timestamp=None) -> list:
+        """Calcula os andares de estacionamento de `num_cars` elevadores ociosos.
+
+        :param num_cars: Quantidade de elevadores ociosos
+        :type num_cars: int
+        :param timestamp: Horário consultado, default é agora
+        :type timestamp: float
+        :return: Códigos dos andares de estacionamento, distintos e de baixo para cima
+        :rtype: list[str]
+        """
+        floors = len(self.floor_codes)
+        num_cars = min(num_cars, floors)
+        if num_cars <= 0:
+            return []
+
+        weights = self.demand(timestamp)
+        total = sum(weights)
+
+        # Divide os andares em trechos contíguos com demanda parecida (ao menos um andar por trecho)
+        bounds, start, accumulated = [], 0, 0.0
+        for zone in range(num_cars - 1):
+            target = total * (zone + 1) / num_cars
+            end = start + 1
+            accumulated += weights[start]
+            while end < floors - (num_cars - 1 - zone) and accumulated + weights[end] / 2 <= target:
+                accumulated += weights[end]
+                end += 1
+            bounds.append((start, end))
+            start = end
+        bounds.append((start, floors))
+
+        # Estaciona na mediana ponderada da demanda de cada trecho
+        parking = []
+        for start, end in bounds:
+            zone_weights = weights[start:end]
+            half, accumulated = sum(zone_weights) / 2, 0.0
+            for idx, weight in enumerate(zone_weights, start=start):
+                accumulated += weight
+                if accumulated >= half:
+                    parking.append(self.floor_codes[idx])
+                    break
+
+        return parking
+
+    def assign(self, cars_floors, timestamp=None) -> dict:
+        """Associa cada elevador ocioso a um andar de estacionamento. Ordenando elevadores e andares
+        pela altura, a associação em ordem minimiza o deslocamento total.
+
+        :param cars_floors: Código do andar atual de cada elevador ocioso, pelo índice do elevador
+        :type cars_floors: dict[int, str]
+        :param timestamp: Horário consultado, default é agora
+        :type timestamp: float
+        :return: Andar de estacionamento de cada elevador, pelo índice do elevador
+        :rtype: dict[int, str]
+        """
+        parking = self.parking_floors(len(cars_floors), timestamp)
+        cars = sorted(cars_floors, key=lambda car: self.floor_codes.index(cars_floors[car]))
+        return dict(zip(cars, parking))
+
+    def save(self) -> None:
+        """Salva o histograma no arquivo, substituindo o anterior de uma vez.
+        """
+        if self.path is None:
+            return
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(DEMAND_HEADER.pack(DEMAND_MAGIC, DEMAND_VERSION, self.slots, len(self.floor_codes)))
+            file.write(self.counts.tobytes())
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def load(self) -> None:
+        """Carrega o histograma do arquivo. Um arquivo de outra configuração de andares ou faixas
+        é ignorado, e o aprendizado recomeça.
+        """
+        with open(self.path, "rb") as file:
+            data = file.read()
+
+        header = data[:DEMAND_HEADER.size]
+        if len(header) == DEMAND_HEADER.size:
+            magic, version, slots, floors = DEMAND_HEADER.unpack(header)
+            payload = data[DEMAND_HEADER.size:]
+            if (magic, version, slots, floors) == (DEMAND_MAGIC, DEMAND_VERSION, self.slots, len(self.floor_codes)) \
+                    and len(payload) == len(self.counts) * 4:
+                self.counts = array("I", payload)
+                return
+
+        print(f"Histograma de demanda incompatível em {self.path}, reiniciando o aprendizado.")
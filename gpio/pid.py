@@ -1,3 +1,15 @@
+import math
+
+# Escala padrão dos ganhos em viagens de um andar: o elevador não chega à velocidade máxima, então
+# usa menos ganho proporcional e mais derivativo para frear mais cedo em relação à distância
+SHORT_TRIP_SCALE = {"kp": 0.85, "kd": 2.0, "kd_fast": 1.3}
+
+# Regra de ajuste a partir do ganho crítico (Ku) e do período crítico (Tu) do ensaio do relé.
+# O movimento já integra o sinal de controle, então o ajuste é PD, mais conservador que o de
+# Ziegler-Nichols para não ultrapassar o andar
+RELAY_RULE = {"kp": 0.25, "kd": 0.01, "kd_fast": 0.04}
+
+
 class PID:
     """Classe que define um controle PID para o movimento dos motores dos elevadores.
     """
@@ -24,6 +36,18 @@ class PID:
         self.sinal_de_controle_MAX = 100.0
         self.sinal_de_controle_MIN = -100.0
 
+    def set_gains(self, kp, ki, kd) -> None:
+        """Troca os ganhos do controle, mantendo o erro acumulado e o erro anterior.
+
+        :param kp: Ganho Proporcional
+        :type kp: float
+        :param ki: Ganho Integral
+        :type ki: float
+        :param kd: Ganho Derivativo
+        :type kd: float
+        """
+        self.kp, self.ki, self.kd = kp, ki, kd
+
     def update_reference(self, referencia) -> None:
         """Atualiza a referência do controle.
 
@@ -66,3 +90,164 @@ class PID:
         self.erro_anterior = erro
 
         return sinal_de_controle
+
+
+class GainSchedule:
+    """Escalonamento dos ganhos do PID pelo tamanho da viagem, pelo sentido do movimento e pela
+    velocidade medida.
+
+    Cada sentido tem os seus ganhos `(kp, ki, kd, kd_fast)`. O ganho derivativo cresce linearmente
+    de `kd`, com o elevador parado, até `kd_fast` na velocidade máxima, freando mais cedo quando o
+    elevador chega rápido ao destino. Viagens de um andar usam os ganhos escalados por `short_trip_scale`.
+
+    A velocidade é o deslocamento do encoder entre duas leituras do laço de controle, então não
+    depende do tempo real de cada período (que inclui as transações no barramento).
+    """
+    def __init__(self, up, down=None, max_speed=3200.0, short_trip_scale=None) -> None:
+        """Inicializa um novo escalonamento.
+
+        :param up: Ganhos `(kp, ki, kd, kd_fast)` para subir
+        :type up: tuple(float, float, float, float)
+        :param down: Ganhos `(kp, ki, kd, kd_fast)` para descer, default são os mesmos de subir
+        :type down: tuple(float, float, float, float)
+        :param max_speed: Velocidade máxima em pulsos por período de controle, default é 3200
+        :type max_speed: float
+        :param short_trip_scale: Escala de `kp`, `kd` e `kd_fast` nas viagens de um andar, default é `SHORT_TRIP_SCALE`
+        :type short_trip_scale: dict
+        """
+        self.directions = {"up": tuple(up), "down": tuple(up if down is None else down)}
+        self.max_speed = max_speed
+        self.short_trip_scale = dict(SHORT_TRIP_SCALE if short_trip_scale is None else short_trip_scale)
+
+    @classmethod
+    def from_relay(cls, result, period, short_trip_scale=None) -> "GainSchedule":
+        """Calcula os ganhos de cada sentido a partir do resultado de um :class:`RelayAutotuner`.
+
+        :param result: Resultado do ensaio do relé
+        :type result: dict
+        :param period: Período de amostragem `T` do PID usado nas viagens, em segundos
+        :type period: float
+        :param short_trip_scale: Escala dos ganhos nas viagens de um andar, default é `SHORT_TRIP_SCALE`
+        :type short_trip_scale: dict
+        :return: Escalonamento com os ganhos ajustados
+        :rtype: class:`GainSchedule`
+        """
+        tu = result["tu_ticks"] * period
+        gains = {}
+        for direction in ("up", "down"):
+            ku = result[f"ku_{direction}"]
+            gains[direction] = (RELAY_RULE["kp"] * ku, 0.0, RELAY_RULE["kd"] * ku * tu, RELAY_RULE["kd_fast"] * ku * tu)
+        return cls(up=gains["up"], down=gains["down"], max_speed=result["max_speed"], short_trip_scale=short_trip_scale)
+
+    def gains(self, trip_floors, direction, speed) -> tuple:
+        """Ganhos do PID para o período de controle atual.
+
+        :param trip_floors: Quantidade de andares da viagem
+        :type trip_floors: int
+        :param direction: Sentido do movimento comandado ("up" ou "down")
+        :type direction: str
+        :param speed: Deslocamento do encoder desde a leitura anterior
+        :type speed: float
+        :return: Ganhos `(kp, ki, kd)`
+        :rtype: tuple(float, float, float)
+        """
+        kp, ki, kd, kd_fast = self.directions[direction]
+        if trip_floors <= 1:
+            kp *= self.short_trip_scale["kp"]
+            kd *= self.short_trip_scale["kd"]
+            kd_fast *= self.short_trip_scale["kd_fast"]
+
+        fraction = min(abs(speed) / self.max_speed, 1.0) if self.max_speed > 0 else 0.0
+        return kp, ki, kd + (kd_fast - kd) * fraction
+
+    def describe(self) -> str:
+        """Descreve os ganhos de cada sentido.
+
+        :return: Ganhos formatados
+        :rtype: str
+        """
+        return ", ".join(f"{direction}: kp={kp:.4g} ki={ki:.4g} kd={kd:.4g}-{kd_fast:.4g}"
+                         for direction, (kp, ki, kd, kd_fast) in self.directions.items())
+
+
+class RelayAutotuner:
+    """Ensaio do relé (Åström-Hägglund) em torno de uma posição: aplica ±`amplitude` de PWM conforme
+    o lado em que o elevador está, até o movimento entrar em oscilação sustentada, e mede a amplitude
+    (de cada lado) e o período da oscilação para obter o ganho e o período críticos do laço.
+    """
+    def __init__(self, setpoint, amplitude=20.0, cycles=4, max_ticks=80) -> None:
+        """Inicializa um novo ensaio.
+
+        :param setpoint: Posição em torno da qual o elevador oscila
+        :type setpoint: int
+        :param amplitude: Potência do relé em %, default é 20
+        :type amplitude: float
+        :param cycles: Ciclos completos medidos depois do transitório, default é 4
+        :type cycles: int
+        :param max_ticks: Máximo de períodos de controle antes de desistir, default é 80
+        :type max_ticks: int
+        """
+        self.setpoint = setpoint
+        self.amplitude = amplitude
+        self.cycles = cycles
+        self.max_ticks = max_ticks
+
+        self.ticks = 0
+        self.output = 0.0
+        self.switches = []
+        self.highest = None
+        self.lowest = None
+        self.max_step = 0.0
+        self._previous = None
+
+    @property
+    def done(self) -> bool:
+        """Indica se o ensaio terminou (com os ciclos medidos ou por tempo esgotado).
+        """
+        return len(self.switches) >= 2 + 2 * self.cycles or self.ticks >= self.max_ticks
+
+    def update(self, position) -> float:
+        """Registra uma leitura do encoder e calcula a saída do relé para o próximo período.
+
+        :param position: Posição lida do encoder
+        :type position: int
+        :return: Potência do motor (positiva sobe, negativa desce)
+        :rtype: float
+        """
+        output = self.amplitude if position < self.setpoint else -self.amplitude
+        if self.output and output != self.output:
+            self.switches.append(self.ticks)
+
+        # Os dois primeiros chaveamentos são o transitório até a oscilação se formar
+        if len(self.switches) >= 2:
+            self.highest = position if self.highest is None else max(self.highest, position)
+            self.lowest = position if self.lowest is None else min(self.lowest, position)
+            if self._previous is not None:
+                self.max_step = max(self.max_step, abs(position - self._previous))
+
+        self._previous = position
+        self.output = output
+        self.ticks += 1
+        return output
+
+    def result(self) -> dict:
+        """Ganhos e período críticos medidos no ensaio.
+
+        :return: Ganho crítico de cada sentido (`ku_up`, `ku_down`), período crítico em períodos de
+            controle (`tu_ticks`) e velocidade máxima estimada em pulsos por período (`max_speed`),
+            ou None se a oscilação não se formou
+        :rtype: dict
+        """
+        if len(self.switches) < 2 + 2 * self.cycles:
+            return None
+
+        above = self.highest - self.setpoint
+        below = self.setpoint - self.lowest
+        if above <= 0 or below <= 0:
+            return None
+
+        half_periods = len(self.switches) - 2
+        return {"ku_up": 4 * self.amplitude / (math.pi * above),
+                "ku_down": 4 * self.amplitude / (math.pi * below),
+                "tu_ticks": 2 * (self.switches[-1] - self.switches[1]) / half_periods,
+                "max_speed": self.max_step * 100 / self.amplitude}
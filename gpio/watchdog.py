@@ -0,0 +1,161 @@
+import time
+import threading
+from collections import deque
+
+from uart.modbus_controller import PRIORITY_EMERGENCY
+
+
+class Watchdog():
+    """Watchdog dos barramentos Modbus e das threads de controle, em uma thread própria.
+
+    Um barramento com uma transação em execução há mais de `stall_timeout` segundos é considerado
+    travado: os motores dos elevadores ligados a ele são parados pela GPIO, a porta é reaberta (o que
+    descarta os buffers e interrompe a leitura travada), a thread de I/O é substituída se não voltar,
+    e a ESP32 é ressincronizada com o PWM zerado. As viagens interrompidas continuam na fila e são
+    refeitas pelo despacho a partir da posição atual.
+
+    A leitura dos botões e os laços de controle das viagens marcam o instante de cada volta; uma
+    thread sem progresso há mais de `heartbeat_timeout` segundos é considerada travada e os elevadores
+    que dependem dela são parados pela GPIO. Como uma thread do Python não pode ser interrompida de
+    fora, ela só é registrada como recuperada quando volta a marcar o progresso.
+    """
+    def __init__(self, elevator_controller, config) -> None:
+        """Inicializa o watchdog, sem iniciá-lo.
+
+        :param elevator_controller: Instância do controle dos elevadores
+        :type elevator_controller: class:`gpio.ElevatorController`
+        :param config: Configuração do watchdog
+        :type config: class:`setup.config.WatchdogConfig`
+        """
+        self.elevator_controller = elevator_controller
+        self.config = config
+
+        # Eventos de travamento e recuperação, e threads travadas no momento (nome e instante da detecção)
+        self.events = deque(maxlen=config.history)
+        self.hung_threads = 0
+        self._hung = {}
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Inicia a thread do watchdog.
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Finaliza a thread do watchdog.
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        """Verifica os barramentos e as threads a cada `interval` segundos.
+        """
+        while not self._stop_event.wait(self.config.interval):
+            self.check()
+
+    def check(self, now=None) -> None:
+        """Verifica uma vez os barramentos e as threads de controle, recuperando os travados.
+
+        :param now: Instante (monotônico) da verificação, default é agora
+        :type now: float
+        """
+        now = time.monotonic() if now is None else now
+        controller = self.elevator_controller
+
+        for bus_idx, modbus_controller in enumerate(controller.modbus_controllers):
+            stalled = modbus_controller.stalled_for(now)
+            if stalled > self.config.stall_timeout:
+                self.recover_bus(bus_idx, stalled)
+
+        self._check_thread("leitura dos botões", controller.heartbeat, now, controller.elevators)
+        for elevator in controller.elevators:
+            self._check_thread(f"controle do Elevador {elevator.elevator_num}", elevator.last_control, now, [elevator])
+
+    def recover_bus(self, bus_idx, stalled) -> None:
+        """Para os elevadores de um barramento travado e o recupera.
+
+        :param bus_idx: Índice do barramento
+        :type bus_idx: int
+        :param stalled: Duração da transação travada, em segundos
+        :type stalled: float
+        """
+        controller = self.elevator_controller
+        modbus_controller = controller.modbus_controllers[bus_idx]
+        cars = [elevator for elevator in controller.elevators if elevator.config.bus == bus_idx]
+        print(f"Watchdog: barramento {modbus_controller.port} sem resposta há {stalled:.2f} s, recuperando ...")
+
+        started_at = time.monotonic()
+        for elevator in cars:
+            elevator.safe_stop(f"barramento {modbus_controller.port} travado")
+
+        replaced = modbus_controller.recover(grace=self.config.recovery_grace)
+
+        # Ressincroniza a ESP32 com os motores parados, na frente das outras transações
+        for elevator in cars:
+            try:
+                modbus_controller.send_control_signal(engine_id=elevator.engine_id, value=0, priority=PRIORITY_EMERGENCY)
+            except (ValueError, ConnectionError) as e:
+                print(f"Watchdog: falha ao zerar o PWM do Elevador {elevator.elevator_num}: {e}")
+
+        elapsed = time.monotonic() - started_at
+        self.events.append({"time": time.time(), "source": modbus_controller.port, "event": "barramento travado",
+                            "stalled": stalled, "replaced_thread": replaced, "recovery": elapsed})
+        print(f"Watchdog: barramento {modbus_controller.port} reaberto em {elapsed * 1000:.0f} ms"
+              f"{' (thread de I/O substituída)' if replaced else ''}")
+
+    def _check_thread(self, name, last_progress, now, elevators) -> None:
+        """Verifica o progresso de uma thread, parando os elevadores que dependem dela se estiver travada.
+
+        :param name: Nome da thread, mostrado no terminal
+        :type name: str
+        :param last_progress: Instante (monotônico) da última volta da thread, ou None se ela não estiver ativa
+        :type last_progress: float
+        :param now: Instante (monotônico) da verificação
+        :type now: float
+        :param elevators: Elevadores parados se a thread travar
+        :type elevators: list[class:`gpio.Elevator`]
+        """
+        hung = last_progress is not None and now - last_progress > self.config.heartbeat_timeout
+
+        if hung and name not in self._hung:
+            self._hung[name] = now
+            self.hung_threads += 1
+            print(f"Watchdog: {name} sem progresso há {now - last_progress:.1f} s")
+            for elevator in elevators:
+                if elevator.last_control is not None:
+                    elevator.safe_stop(f"{name} travado")
+            self.events.append({"time": time.time(), "source": name, "event": "thread travada",
+                                "stalled": now - last_progress, "replaced_thread": False, "recovery": None})
+
+        elif not hung and name in self._hung:
+            elapsed = now - self._hung.pop(name)
+            print(f"Watchdog: {name} voltou depois de {elapsed:.1f} s")
+            self.events.append({"time": time.time(), "source": name, "event": "thread recuperada",
+                                "stalled": None, "replaced_thread": False, "recovery": elapsed})
+
+    def get_stats(self) -> dict:
+        """Resumo dos travamentos e recuperações.
+
+        :return: Travamentos dos barramentos, threads de I/O substituídas, threads travadas, tempos de
+            recuperação dos barramentos (do travamento até a primeira transação bem-sucedida, em
+            segundos) e eventos recentes
+        :rtype: dict
+        """
+        modbus_controllers = self.elevator_controller.modbus_controllers
+        recovery_times = [duration for modbus_controller in modbus_controllers
+                          for duration in list(modbus_controller.recovery_times)]
+        return {"bus_stalls": sum(modbus_controller.stalls for modbus_controller in modbus_controllers),
+                "replaced_io_threads": sum(modbus_controller.replaced_threads for modbus_controller in modbus_controllers),
+                "hung_threads": self.hung_threads,
+                "recovery_mean": sum(recovery_times) / len(recovery_times) if recovery_times else 0.0,
+                "recovery_max": max(recovery_times, default=0.0),
+                "events": list(self.events)}
@@ -0,0 +1,461 @@
+import json
+import time
+import queue
+import socket
+import struct
+import itertools
+import threading
+from collections import deque
+
+# Versão das mensagens trocadas entre os grupos
+PROTOCOL_VERSION = 1
+
+# Maior datagrama UDP aceito
+MAX_DATAGRAM = 65507
+
+# Espera máxima por uma mensagem antes de verificar os prazos, em segundos
+TICK = 0.05
+
+
+def parse_address(address) -> tuple:
+    """Converte um endereço "host:porta" na tupla usada pelo socket.
+
+    :param address: Endereço no formato "host:porta"
+    :type address: str
+    :return: Host e porta
+    :rtype: tuple(str, int)
+    :raises ValueError: Se o endereço não tiver porta
+    """
+    host, separator, port = address.rpartition(":")
+    if not separator:
+        raise ValueError(f"Endereço sem porta: {address}!")
+    return host, int(port)
+
+
+class GroupCoordinator():
+    """Coordenação pela rede local entre grupos de elevadores, cada um controlado por um processo.
+
+    Cada grupo anuncia periodicamente (e a cada mudança) o snapshot dos seus elevadores e as chamadas
+    que está atendendo; os anúncios também servem de heartbeat. Uma chamada de andar feita em um
+    grupo é leiloada: todos os grupos com elevadores disponíveis respondem com o tempo estimado de
+    chegada (ETA) e, depois de `bid_window` segundos, a chamada é atribuída ao menor lance.
+
+    O grupo em que a chamada foi feita acompanha a chamada até ela ser atendida: a atribuição é
+    reenviada até aparecer nos anúncios do vencedor, e, se o vencedor ficar sem anunciar por
+    `node_timeout` segundos, a chamada volta a leilão entre os grupos restantes.
+
+    As mensagens são objetos JSON em datagramas UDP, enviadas para um endereço multicast ou, sem
+    multicast, para cada endereço de `peers`. Todo o estado da coordenação é tratado por uma única
+    thread; as chamadas do controlador só enfileiram pedidos para ela.
+    """
+    def __init__(self, elevator_controller, config) -> None:
+        """Inicializa a coordenação, sem iniciá-la.
+
+        :param elevator_controller: Instância do controle dos elevadores deste grupo
+        :type elevator_controller: class:`gpio.ElevatorController`
+        :param config: Configuração da coordenação
+        :type config: class:`setup.config.GroupConfig`
+        """
+        self.elevator_controller = elevator_controller
+        self.config = config
+        self.node_id = config.node_id
+        self.peer_addresses = [parse_address(peer) for peer in config.peers]
+
+        # Outros grupos: endereço, último anúncio, se está no ar, snapshots e chamadas atendidas
+        self.peers = {}
+
+        # Leilões abertos e chamadas feitas neste grupo até serem atendidas (por id da chamada)
+        self._auctions = {}
+        self._ledger = {}
+        # Chamadas atribuídas a este grupo: andar, tipo, grupo de origem e endereço dele
+        self._held = {}
+        # Andar e tipo das chamadas deste grupo ainda não atendidas, consultados pelo controlador
+        self._open = set()
+        self._open_lock = threading.Lock()
+
+        self._inbox = queue.SimpleQueue()
+        self._call_ids = itertools.count(1)
+        self._sequence = itertools.count(1)
+        self._last_announce = 0.0
+        self._announced_version = None
+        self._announce_now = False
+
+        # Estatísticas
+        self.served = deque(maxlen=config.history)
+        self.failures = 0
+        self.reassignments = 0
+        self.resent_awards = 0
+        self.invalid_messages = 0
+
+        self._socket = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self) -> None:
+        """Abre o socket UDP e inicia a thread da coordenação.
+        """
+        self._socket = self._open_socket()
+        self._thread = threading.Thread(target=self._loop, name="group-coordinator", daemon=True)
+        self._thread.start()
+        destination = self.config.multicast or ", ".join(self.config.peers) or "nenhum grupo"
+        print(f"Coordenação entre grupos: nó {self.node_id} na porta {self.config.port} ({destination})")
+
+    def shutdown(self) -> None:
+        """Finaliza a thread da coordenação e fecha o socket.
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._socket.close()
+        self._thread = None
+
+    def _open_socket(self) -> socket.socket:
+        """Abre o socket UDP, entrando no grupo multicast se configurado.
+
+        :return: Socket aberto
+        :rtype: class:`socket.socket`
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.config.multicast:
+            # Vários processos na mesma máquina recebem o mesmo grupo na mesma porta
+            sock.bind(("", self.config.port))
+            membership = struct.pack("4s4s", socket.inet_aton(self.config.multicast), socket.inet_aton(self.config.host))
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        else:
+            sock.bind((self.config.host, self.config.port))
+        sock.settimeout(TICK)
+        return sock
+
+    # Interface usada pelo controlador (de qualquer thread)
+
+    def submit(self, floor, kind) -> None:
+        """Leiloa uma chamada de andar feita neste grupo.
+
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param kind: Tipo do botão (`hall_up` ou `hall_down`)
+        :type kind: str
+        """
+        with self._open_lock:
+            if (floor, kind) in self._open:
+                return
+            self._open.add((floor, kind))
+        self._inbox.put(("submit", floor, kind))
+
+    def is_pending(self, floor, kind) -> bool:
+        """Verifica se uma chamada de andar feita neste grupo ainda não foi atendida.
+
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param kind: Tipo do botão
+        :type kind: str
+        :return: Verdadeiro se a chamada está em leilão ou atribuída
+        :rtype: bool
+        """
+        with self._open_lock:
+            return (floor, kind) in self._open
+
+    def served_locally(self, floor, kind) -> None:
+        """Informa que um elevador deste grupo atendeu as chamadas de um andar e tipo.
+
+        :param floor: Código do andar atendido
+        :type floor: str
+        :param kind: Tipo do botão
+        :type kind: str
+        """
+        self._inbox.put(("served", floor, kind))
+
+    # Thread da coordenação
+
+    def _loop(self) -> None:
+        """Recebe as mensagens dos outros grupos e trata os pedidos e os prazos.
+        """
+        while not self._stop_event.is_set():
+            try:
+                data, address = self._socket.recvfrom(MAX_DATAGRAM)
+            except socket.timeout:
+                data, address = None, None
+            except OSError as e:
+                print(f"Coordenação entre grupos: erro de recepção: {e}")
+                self._stop_event.wait(TICK)
+                continue
+
+            now = time.monotonic()
+            if data is not None:
+                self._handle(data, address, now)
+
+            while True:
+                try:
+                    request = self._inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if request[0] == "submit":
+                    self._start_auction(request[1], request[2], now, created=now)
+                else:
+                    self._release_held(request[1], request[2], now)
+
+            self._tick(now)
+
+    def _send(self, message, address=None) -> None:
+        """Envia uma mensagem a um grupo ou, sem `address`, a todos.
+
+        :param message: Campos da mensagem, sem a versão e o nó de origem
+        :type message: dict
+        :param address: Endereço de um único grupo, opcional
+        :type address: tuple(str, int)
+        """
+        data = json.dumps(dict(message, v=PROTOCOL_VERSION, node=self.node_id), separators=(",", ":")).encode()
+        if address is not None:
+            addresses = [address]
+        elif self.config.multicast:
+            addresses = [(self.config.multicast, self.config.port)]
+        else:
+            addresses = self.peer_addresses
+
+        for destination in addresses:
+            try:
+                self._socket.sendto(data, destination)
+            except OSError as e:
+                print(f"Coordenação entre grupos: falha ao enviar para {destination[0]}:{destination[1]}: {e}")
+
+    def _handle(self, data, address, now) -> None:
+        """Trata uma mensagem recebida.
+
+        :param data: Datagrama recebido
+        :type data: bytes
+        :param address: Endereço de quem enviou
+        :type address: tuple(str, int)
+        :param now: Instante (monotônico) da recepção
+        :type now: float
+        """
+        try:
+            message = json.loads(data)
+        except (ValueError, UnicodeDecodeError):
+            self.invalid_messages += 1
+            return
+        if not isinstance(message, dict) or message.get("v") != PROTOCOL_VERSION:
+            self.invalid_messages += 1
+            return
+
+        node = message.get("node")
+        # O multicast também entrega as mensagens do próprio grupo
+        if node == self.node_id:
+            return
+
+        handler = {"announce": self._on_announce, "call": self._on_call, "bid": self._on_bid,
+                   "award": self._on_award, "served": self._on_served}.get(message.get("type"))
+        if handler is None:
+            self.invalid_messages += 1
+            return
+        try:
+            handler(node, message, address, now)
+        except (KeyError, TypeError, ValueError):
+            self.invalid_messages += 1
+
+    def _on_announce(self, node, message, address, now) -> None:
+        """Atualiza o estado de um grupo e confirma as chamadas atribuídas a ele.
+        """
+        peer = self.peers.get(node)
+        if peer is None or not peer["alive"]:
+            print(f"Coordenação entre grupos: nó {node} no ar ({address[0]}:{address[1]})")
+        if peer is not None and message["seq"] <= peer["seq"] and peer["alive"]:
+            return
+
+        calls = set(message["calls"])
+        self.peers[node] = {"address": address, "last_seen": now, "alive": True, "seq": message["seq"],
+                            "cars": message["cars"], "calls": calls}
+
+        for call_id, entry in list(self._ledger.items()):
+            if entry["winner"] != node:
+                continue
+            if call_id in calls:
+                entry["confirmed"] = True
+            elif entry["confirmed"]:
+                # Saiu dos anúncios depois de confirmada: atendida, mesmo que o aviso tenha se perdido
+                self._finish(call_id, now)
+
+    def _on_call(self, node, message, address, now) -> None:
+        """Responde ao leilão de uma chamada com o ETA deste grupo.
+        """
+        eta = self.elevator_controller.estimate_eta(message["floor"], floor_time=self.config.floor_time)
+        if eta is not None:
+            self._send({"type": "bid", "call_id": message["call_id"], "eta": eta}, address)
+
+    def _on_bid(self, node, message, address, now) -> None:
+        """Registra o lance de um grupo em um leilão aberto.
+        """
+        auction = self._auctions.get(message["call_id"])
+        if auction is not None:
+            auction["bids"][node] = float(message["eta"])
+
+    def _on_award(self, node, message, address, now) -> None:
+        """Aceita uma chamada atribuída a este grupo.
+        """
+        if message["winner"] != self.node_id or message["call_id"] in self._held:
+            return
+        self._hold(message["call_id"], message["floor"], message["kind"], node, address)
+
+    def _on_served(self, node, message, address, now) -> None:
+        """Encerra uma chamada deste grupo atendida por outro.
+        """
+        if message["call_id"] in self._ledger:
+            self._finish(message["call_id"], now)
+
+    def _start_auction(self, floor, kind, now, created) -> None:
+        """Abre o leilão de uma chamada feita neste grupo, já com o lance do próprio grupo.
+
+        :param floor: Código do andar chamado
+        :type floor: str
+        :param kind: Tipo do botão
+        :type kind: str
+        :param now: Instante (monotônico) atual
+        :type now: float
+        :param created: Instante (monotônico) em que a chamada foi feita
+        :type created: float
+        """
+        call_id = f"{self.node_id}:{next(self._call_ids)}"
+        bids = {}
+        eta = self.elevator_controller.estimate_eta(floor, floor_time=self.config.floor_time)
+        if eta is not None:
+            bids[self.node_id] = eta
+
+        self._auctions[call_id] = {"floor": floor, "kind": kind, "created": created,
+                                   "deadline": now + self.config.bid_window, "bids": bids}
+        self._send({"type": "call", "call_id": call_id, "floor": floor, "kind": kind})
+
+    def _tick(self, now) -> None:
+        """Fecha os leilões vencidos, acompanha as chamadas atribuídas, detecta os grupos fora do ar e
+        anuncia o estado deste grupo.
+
+        :param now: Instante (monotônico) atual
+        :type now: float
+        """
+        for call_id, auction in list(self._auctions.items()):
+            if now >= auction["deadline"]:
+                del self._auctions[call_id]
+                self._award(call_id, auction, now)
+
+        for node, peer in self.peers.items():
+            if peer["alive"] and now - peer["last_seen"] > self.config.node_timeout:
+                peer["alive"] = False
+                self.failures += 1
+                print(f"Coordenação entre grupos: nó {node} fora do ar há {now - peer['last_seen']:.1f} s")
+
+        for call_id, entry in list(self._ledger.items()):
+            winner = entry["winner"]
+            if winner == self.node_id:
+                continue
+            if not self._is_alive(winner):
+                # Volta a leilão entre os grupos no ar, mantendo o instante da chamada
+                del self._ledger[call_id]
+                self.reassignments += 1
+                print(f"Chamada para {entry['floor']} ({entry['kind']}) do nó {winner} fora do ar, reatribuindo ...")
+                self._start_auction(entry["floor"], entry["kind"], now, created=entry["created"])
+            elif not entry["confirmed"] and now - entry["awarded_at"] > self.config.award_timeout:
+                entry["awarded_at"] = now
+                self.resent_awards += 1
+                self._send_award(call_id, entry)
+
+        version = self.elevator_controller.state_board.version
+        since_announce = now - self._last_announce
+        if (since_announce >= self.config.announce_interval or self._announce_now
+                or (version != self._announced_version and since_announce >= self.config.min_announce_interval)):
+            self._announce(now, version)
+
+    def _is_alive(self, node) -> bool:
+        peer = self.peers.get(node)
+        return peer is not None and peer["alive"]
+
+    def _award(self, call_id, auction, now) -> None:
+        """Atribui uma chamada ao menor lance dos grupos no ar; sem lances, fica com este grupo.
+        """
+        bids = {node: eta for node, eta in auction["bids"].items() if node == self.node_id or self._is_alive(node)}
+        winner = min(bids, key=lambda node: (bids[node], node)) if bids else self.node_id
+
+        entry = {"floor": auction["floor"], "kind": auction["kind"], "created": auction["created"],
+                 "winner": winner, "awarded_at": now, "confirmed": winner == self.node_id}
+        self._ledger[call_id] = entry
+        eta = f"ETA {bids[winner]:.1f} s" if winner in bids else "sem lances"
+        print(f"Chamada para {entry['floor']} ({entry['kind']}) atribuída ao nó {winner} ({eta}, {len(bids)} lances)")
+
+        if winner == self.node_id:
+            self._hold(call_id, entry["floor"], entry["kind"], self.node_id, None)
+        else:
+            self._send_award(call_id, entry)
+
+    def _send_award(self, call_id, entry) -> None:
+        self._send({"type": "award", "call_id": call_id, "floor": entry["floor"], "kind": entry["kind"],
+                    "winner": entry["winner"]})
+
+    def _hold(self, call_id, floor, kind, origin, address) -> None:
+        """Coloca nos elevadores deste grupo uma chamada atribuída a ele.
+        """
+        self._held[call_id] = (floor, kind, origin, address)
+        self._announce_now = True
+        self.elevator_controller.accept_hall_call(floor, kind)
+
+    def _release_held(self, floor, kind, now) -> None:
+        """Avisa os grupos de origem das chamadas de um andar e tipo atendidas por este grupo.
+        """
+        for call_id, (held_floor, held_kind, origin, address) in list(self._held.items()):
+            if (held_floor, held_kind) != (floor, kind):
+                continue
+            del self._held[call_id]
+            self._announce_now = True
+            if origin == self.node_id:
+                self._finish(call_id, now)
+            else:
+                self._send({"type": "served", "call_id": call_id}, address)
+
+    def _finish(self, call_id, now) -> None:
+        """Encerra uma chamada feita neste grupo, apagando o botão se outro grupo a atendeu.
+        """
+        entry = self._ledger.pop(call_id)
+        self.served.append({"call_id": call_id, "floor": entry["floor"], "kind": entry["kind"],
+                            "winner": entry["winner"], "wait": now - entry["created"]})
+
+        # Uma chamada igual pode ter voltado a leilão depois de reatribuída
+        if not any((other["floor"], other["kind"]) == (entry["floor"], entry["kind"]) for other in self._ledger.values()):
+            if entry["winner"] != self.node_id:
+                self.elevator_controller.turn_hall_btns_off(entry["floor"], entry["kind"])
+            with self._open_lock:
+                self._open.discard((entry["floor"], entry["kind"]))
+
+    def _announce(self, now, version) -> None:
+        """Anuncia os snapshots dos elevadores e as chamadas atendidas por este grupo.
+        """
+        controller = self.elevator_controller
+        self._send({"type": "announce", "seq": next(self._sequence),
+                    "cars": controller.get_elevators_snapshot(), "calls": sorted(self._held)})
+        self._last_announce = now
+        self._announced_version = version
+        self._announce_now = False
+
+    def get_stats(self) -> dict:
+        """Estado da coordenação entre grupos.
+
+        :return: Nó, grupos conhecidos (no ar, idade do último anúncio, elevadores e chamadas), leilões
+            abertos, chamadas deste grupo ainda não atendidas, chamadas atribuídas a este grupo,
+            falhas, reatribuições, atribuições reenviadas e chamadas atendidas
+        :rtype: dict
+        """
+        now = time.monotonic()
+        served = list(self.served)
+        return {"node": self.node_id,
+                "peers": {node: {"alive": peer["alive"], "age": now - peer["last_seen"], "cars": peer["cars"],
+                                 "calls": sorted(peer["calls"])}
+                          for node, peer in list(self.peers.items())},
+                "auctions": len(self._auctions),
+                "pending": [{"call_id": call_id, "floor": entry["floor"], "kind": entry["kind"],
+                             "winner": entry["winner"], "confirmed": entry["confirmed"]}
+                            for call_id, entry in list(self._ledger.items())],
+                "held": len(self._held),
+                "failures": self.failures,
+                "reassignments": self.reassignments,
+                "resent_awards": self.resent_awards,
+                "invalid_messages": self.invalid_messages,
+                "served": served}
@@ -0,0 +1,169 @@
+import os
+import signal
+import threading
+import multiprocessing
+
+from .shared_state import SharedCarState
+
+
+def run_screen(state_name, config, display, temperature, stop_event) -> None:
+    """Ponto de entrada do processo da tela: lê o estado dos elevadores da memória compartilhada e
+    devolve as temperaturas pelo anel.
+
+    :param state_name: Nome do bloco de memória compartilhada
+    :type state_name: str
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :param display: Indica se a tela OLED deve ser usada
+    :type display: bool
+    :param temperature: Indica se os sensores de temperatura devem ser lidos
+    :type temperature: bool
+    :param stop_event: Evento para finalização do processo
+    :type stop_event: class:`multiprocessing.Event`
+    """
+    from .oled_screen import Screen
+
+    state = attach_state(state_name, config)
+    try:
+        screen = Screen(config=config, board=state, floors_display={floor.name: floor.display for floor in config.floors},
+                        on_temperature=state.push_temperature, display=display, temperature=temperature)
+        screen.update(stop_event)
+    finally:
+        state.close()
+
+
+def attach_state(state_name, config) -> SharedCarState:
+    """Conecta ao bloco de memória compartilhada criado pelo processo dos elevadores.
+
+    :param state_name: Nome do bloco de memória compartilhada
+    :type state_name: str
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :return: Bloco de memória compartilhada
+    :rtype: class:`i2c.shared_state.SharedCarState`
+    """
+    return SharedCarState([floor.name for floor in config.floors], num_cars=len(config.elevators),
+                          ring_size=config.screen.ring_size, name=state_name)
+
+
+def _process_main(target, state_name, config, display, temperature, stop_event) -> None:
+    """Executa `target` no processo filho, deixando o encerramento por conta do processo dos elevadores.
+    """
+    # O Ctrl+C chega a todo o grupo de processos; quem encerra a tela é o processo dos elevadores
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    # Com menos CPUs que processos ocupados, o escalonador do sistema favorece os laços de controle
+    if config.screen.nice:
+        os.nice(config.screen.nice)
+    target(state_name, config, display, temperature, stop_event)
+
+
+class DisplayProcess():
+    """Tela e sensores de temperatura em um processo separado, com interpretador e GIL próprios, para
+    que a renderização e as leituras I2C não atrasem os laços de controle.
+
+    O processo da tela roda com prioridade menor (`screen.nice`), o que uma thread não consegue:
+    mesmo com um único núcleo, o escalonador do sistema dá a CPU aos laços de controle primeiro.
+
+    Uma thread do processo dos elevadores copia o quadro de estados para um :class:`SharedCarState`
+    a cada mudança e retira as temperaturas do anel, publicando-as e enviando-as para a ESP32. Essa
+    thread só empacota alguns bytes por mudança, então o seu custo no processo dos elevadores é
+    pequeno e independe do trabalho da tela.
+    """
+    def __init__(self, elevator_controller, display=True, temperature=True, isolated=True, target=run_screen) -> None:
+        """Inicializa a tela em processo separado, sem iniciá-la.
+
+        :param elevator_controller: Instância do controle dos elevadores
+        :type elevator_controller: class:`gpio.ElevatorController`
+        :param display: Indica se a tela OLED deve ser usada, default é True
+        :type display: bool
+        :param temperature: Indica se os sensores de temperatura devem ser lidos, default é True
+        :type temperature: bool
+        :param isolated: Executa `target` em outro processo; se falso, em uma thread deste processo
+            (para comparar o efeito do isolamento), default é True
+        :type isolated: bool
+        :param target: Função executada com o nome do bloco, a configuração, `display`, `temperature`
+            e o evento de finalização, default é :func:`run_screen`
+        :type target: callable
+        """
+        self.elevator_controller = elevator_controller
+        self.config = elevator_controller.config
+        self.display = display
+        self.temperature = temperature
+        self.isolated = isolated
+        self.target = target
+
+        self.state = None
+        self._worker = None
+        self._bridge = None
+        self._bridge_stop = threading.Event()
+
+        if isolated:
+            # "spawn" não herda as threads nem os locks do processo dos elevadores
+            context = multiprocessing.get_context("spawn")
+            self._stop_event = context.Event()
+        else:
+            context = None
+            self._stop_event = threading.Event()
+        self._context = context
+
+    def start(self) -> None:
+        """Cria o bloco de memória compartilhada e inicia a thread de sincronização e a tela.
+        """
+        board = self.elevator_controller.state_board
+        self.state = SharedCarState([floor.name for floor in self.config.floors], num_cars=len(self.config.elevators),
+                                    ring_size=self.config.screen.ring_size)
+        self.state.write(board.snapshots())
+
+        self._bridge = threading.Thread(target=self._bridge_loop, name="screen-bridge", daemon=True)
+        self._bridge.start()
+
+        args = (self.state.name, self.config, self.display, self.temperature, self._stop_event)
+        if self.isolated:
+            self._worker = self._context.Process(target=_process_main, args=(self.target,) + args,
+                                                 name="screen", daemon=True)
+        else:
+            self._worker = threading.Thread(target=self.target, args=args, name="screen", daemon=True)
+        self._worker.start()
+
+    def _bridge_loop(self) -> None:
+        """Copia o quadro de estados para a memória compartilhada e repassa as temperaturas do anel.
+        """
+        board = self.elevator_controller.state_board
+        poll_interval = self.config.screen.poll_interval
+        version = board.version
+
+        while not self._bridge_stop.is_set():
+            snapshots = board.wait_for_version(version, timeout=poll_interval)
+            new_version = max(snapshot.version for snapshot in snapshots)
+            if new_version > version:
+                version = new_version
+                self.state.write(snapshots)
+
+            for car_idx, temperature in self.state.pop_temperatures():
+                try:
+                    self.elevator_controller.update_temperature(car_idx, temperature)
+                except (ValueError, ConnectionError) as e:
+                    print(f"Falha ao enviar a temperatura do Elevador {car_idx + 1}: {e}")
+
+    def shutdown(self, timeout=5.0) -> None:
+        """Finaliza a tela e a thread de sincronização e remove o bloco de memória compartilhada.
+
+        :param timeout: Tempo máximo de espera pelo fim da tela, em segundos, default é 5.0
+        :type timeout: float
+        """
+        if self._worker is None:
+            return
+
+        self._stop_event.set()
+        self._worker.join(timeout)
+        if self.isolated and self._worker.is_alive():
+            print("Processo da tela não finalizou, encerrando-o ...")
+            self._worker.terminate()
+            self._worker.join()
+
+        self._bridge_stop.set()
+        self._bridge.join()
+        self.state.close()
+        self._worker = None
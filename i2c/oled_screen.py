@@ -1,63 +1,130 @@
 import time
 
-import Adafruit_SSD1306
-from PIL import Image
-from PIL import ImageDraw
-from PIL import ImageFont
-
-from .temp_sensors_controller import TempSensorController
-
 class Screen():
     """Classe responsável pela exibição das informações dos elevadores na tela OLED.
-    """
-    def __init__(self, elevator_controller) -> None:
-        """Inicializa uma nova tela.
 
-        :param elevator_controller: Instnacia do controle dos elevadores
-        :type elevator_controller: class:`gpio.ElevatorController`
+    A tela e os sensores de temperatura são opcionais: as bibliotecas só são importadas quando o
+    perfil de execução os habilita, e uma falha na inicialização só desliga o periférico, sem
+    impedir os elevadores de funcionar.
+    """
+    def __init__(self, config, board, floors_display, on_temperature, display=True, temperature=True) -> None:
+        """Inicializa uma nova tela, sem acessar o hardware (ver :meth:`start`).
+
+        :param config: Configuração do sistema
+        :type config: class:`setup.config.SystemConfig`
+        :param board: Quadro de estados dos elevadores (no mesmo processo ou em memória compartilhada)
+        :type board: class:`gpio.car_state.StateBoard` ou class:`i2c.shared_state.SharedCarState`
+        :param floors_display: Nome de exibição de cada andar
+        :type floors_display: dict[str, str]
+        :param on_temperature: Função chamada com o índice do elevador e a temperatura de cada leitura
+        :type on_temperature: callable
+        :param display: Indica se a tela OLED deve ser usada, default é True
+        :type display: bool
+        :param temperature: Indica se os sensores de temperatura devem ser lidos, default é True
+        :type temperature: bool
         """
-        print("Inicializando display ...")
-        self.display = Adafruit_SSD1306.SSD1306_128_64(rst=None)
-
-        self.display.begin()
-
-        self.display.clear()
-        self.display.display()
-
-        self.width = self.display.width
-        self.height = self.display.height
-        self.image = Image.new('1', (self.width , self.height))
+        self.use_display = display
+        self.use_temperature = temperature
 
-        self.font = ImageFont.load_default()
+        self.display = None
+        self.temp_sensors_controller = None
 
-        self.elevators_info = [
-            {"temperature": -1.0, "floor": "N/A", "state": "Parado"},
-            {"temperature": -1.0, "floor": "N/A", "state": "Parado"}
-        ]
+        self.config = config
+        self.board = board
+        self.floors_display = floors_display
+        self.on_temperature = on_temperature
 
-        self.elevator_controller = elevator_controller
-        self.temp_sensors_controller = TempSensorController()
+        self.elevators_info = [{"temperature": -1.0, "floor": "N/A", "state": "Parado"}
+                               for _ in self.config.elevators]
 
-    def update_elevators_info(self) -> None:
-        """Atualiza as informações de andar e estado do elevador com os dados recebidos de :class:`gpio.ElevatorController`
-        e a temperatura com os dados de :class:`i2c.TempSensorController`.
+    @property
+    def enabled(self) -> bool:
+        """Indica se algum periférico da tela foi habilitado no perfil de execução.
         """
-        for elevator_idx in range(2):
-            floor, state = self.elevator_controller.get_elevator_info(elevator_number=elevator_idx)
-            temperature = self.temp_sensors_controller.get_temperature(elevator_number=elevator_idx)
-
-            self.elevators_info[elevator_idx]["temperature"] = temperature
-            self.elevator_controller.modbus_controller.send_temperature(elevator_id=elevator_idx, temperature=temperature)
+        return self.use_display or self.use_temperature
 
-            if floor != "N/A":
-                self.elevators_info[elevator_idx]["floor"] = floor
-            self.elevators_info[elevator_idx]["state"] = state
+    def start(self) -> None:
+        """Inicializa a tela OLED e os sensores de temperatura habilitados. Um periférico ausente
+        ou com falha é desligado com um aviso.
+        """
+        started_at = time.monotonic()
+
+        if self.use_display:
+            print("Inicializando display ...")
+            try:
+                import Adafruit_SSD1306
+                from PIL import Image, ImageDraw, ImageFont
+
+                display = Adafruit_SSD1306.SSD1306_128_64(rst=None)
+                display.begin()
+                display.clear()
+                display.display()
+            except (ImportError, OSError, RuntimeError) as e:
+                print(f"Display indisponível, seguindo sem a tela: {e}")
+            else:
+                self.display = display
+                self.image_draw = ImageDraw
+                self.width = display.width
+                self.height = display.height
+                self.image = Image.new('1', (self.width, self.height))
+                self.font = ImageFont.load_default()
+
+        if self.use_temperature:
+            try:
+                from .temp_sensors_controller import TempSensorController
+
+                self.temp_sensors_controller = TempSensorController(num_elevators=len(self.config.elevators))
+            except (ImportError, OSError, RuntimeError) as e:
+                print(f"Sensores de temperatura indisponíveis, seguindo sem a temperatura: {e}")
+
+        print(f"Tela e sensores inicializados em {(time.monotonic() - started_at) * 1000:.0f} ms")
+
+    def update_temperatures(self) -> None:
+        """Lê a temperatura de cada elevador em :class:`i2c.TempSensorController` e a repassa a `on_temperature`.
+        Uma leitura ou um envio com falha é ignorado até a próxima leitura, sem interromper a tela.
+        """
+        if self.temp_sensors_controller is None:
+            return
+
+        for elevator_idx in range(len(self.config.elevators)):
+            try:
+                temperature = self.temp_sensors_controller.get_temperature(elevator_number=elevator_idx)
+            except OSError as e:
+                print(f"Falha na leitura da temperatura do Elevador {elevator_idx + 1}: {e}")
+                continue
+            # No modo thread, `on_temperature` envia a temperatura pelo barramento, que pode falhar ou perder o prazo
+            try:
+                self.on_temperature(elevator_idx, temperature)
+            except (ValueError, ConnectionError) as e:
+                print(f"Falha ao enviar a temperatura do Elevador {elevator_idx + 1}: {e}")
+
+    def update_elevators_info(self, snapshots) -> bool:
+        """Atualiza as informações exibidas de cada elevador com os snapshots do quadro de estados.
+
+        :param snapshots: Snapshot de cada elevador
+        :type snapshots: tuple[class:`gpio.car_state.CarSnapshot`]
+        :return: Verdadeiro se alguma informação exibida mudou
+        :rtype: bool
+        """
+        changed = False
+        for info, snapshot in zip(self.elevators_info, snapshots):
+            floor = self.floors_display.get(snapshot.floor, "N/A")
+            updated = {"temperature": info["temperature"] if snapshot.temperature is None else snapshot.temperature,
+                       "floor": info["floor"] if floor == "N/A" else floor,
+                       "state": snapshot.state}
+            if updated != info:
+                info.update(updated)
+                changed = True
+        return changed
 
     def shutdown(self) -> None:
         """Limpa a tela para finalização da aplicação.
         """
+        if self.display is None:
+            return
+
         print("Limpando display ...")
-        draw = ImageDraw.Draw(self.image)
+        draw = self.image_draw.Draw(self.image)
         draw.rectangle((0, 0, self.width, self.height), outline=0, fill=0)
         self.display.image(self.image)
         self.display.display()
@@ -66,36 +133,62 @@ class Screen():
         """Loop que atualiza a tela OLED com as informações dos elevadores, finalizando
         quando `exit_event` é definido na thread principal.
 
-        :param exit_event: Evento para finalização da thread
-        :type exit_event: class:`threading.Event`
+        :param exit_event: Evento para finalização da thread (ou do processo da tela)
+        :type exit_event: class:`threading.Event` ou class:`multiprocessing.Event`
         """
+        # Inicializa os periféricos na própria thread, sem atrasar a partida dos elevadores
+        self.start()
+        if self.display is None and self.temp_sensors_controller is None:
+            return
+
+        board = self.board
+        temperature_interval = self.config.timing.temperature_interval
+        next_temperature = time.monotonic()
+        version, drawn = -1, False
+
         while not exit_event.is_set():
-            draw = ImageDraw.Draw(self.image)
+            # Espera uma mudança de estado, acordando só para a próxima leitura de temperatura
+            snapshots = board.wait_for_version(version, timeout=max(next_temperature - time.monotonic(), 0))
+            if time.monotonic() >= next_temperature:
+                self.update_temperatures()
+                next_temperature = time.monotonic() + temperature_interval
+                snapshots = board.snapshots()
+            version = max(snapshot.version for snapshot in snapshots)
+
+            if self.display is not None and (self.update_elevators_info(snapshots) or not drawn):
+                self.draw()
+                drawn = True
+
+            # Agrupa as mudanças próximas em um único redesenho
+            exit_event.wait(self.config.timing.display_interval)
+
+        self.shutdown()
 
-            draw.rectangle((0, 0, self.width, self.height), outline=0, fill=0)
+    def draw(self) -> None:
+        """Desenha na tela OLED as informações dos elevadores.
+        """
+        draw = self.image_draw.Draw(self.image)
 
-            elevator_width = self.width // len(self.elevators_info)
+        draw.rectangle((0, 0, self.width, self.height), outline=0, fill=0)
 
-            # Desenha o retangulo do outline de cada elevador
-            for i in range(2):
-                x0 = i * (self.width - 1) // 2
-                x1 = (i + 1) * elevator_width - 1
-                draw.rectangle((x0, 0, x1, 63), outline=255, fill=0)
+        elevator_width = self.width // len(self.elevators_info)
 
-            # Linha do cabeçalho
-            header_height = 15
-            draw.line((0, header_height, self.width, header_height), fill=255)
+        # Desenha o retangulo do outline de cada elevador
+        for i in range(len(self.elevators_info)):
+            x0 = i * elevator_width
+            x1 = (i + 1) * elevator_width - 1
+            draw.rectangle((x0, 0, x1, self.height - 1), outline=255, fill=0)
 
-            for i, elevator in enumerate(self.elevators_info):
-                x = i * elevator_width + 4
-                draw.text((x - 4, 2), f"Elevador {i+1}", font=self.font, fill=255)
-                draw.text((x, 16), f"{elevator['temperature']:.2f} C", font=self.font, fill=255)
-                draw.text((x, 30), f"{elevator['floor']}", font=self.font, fill=255)
-                draw.text((x, 44), elevator['state'], font=self.font, fill=255)
+        # Linha do cabeçalho
+        header_height = 15
+        draw.line((0, header_height, self.width, header_height), fill=255)
 
-            self.display.image(self.image)
-            self.display.display()
-            time.sleep(0.1)
-            self.update_elevators_info()
+        for i, elevator in enumerate(self.elevators_info):
+            x = i * elevator_width + 4
+            draw.text((x - 4, 2), f"Elevador {i+1}", font=self.font, fill=255)
+            draw.text((x, 16), f"{elevator['temperature']:.2f} C", font=self.font, fill=255)
+            draw.text((x, 30), f"{elevator['floor']}", font=self.font, fill=255)
+            draw.text((x, 44), elevator['state'], font=self.font, fill=255)
 
-        self.shutdown()
+        self.display.image(self.image)
+        self.display.display()
@@ -0,0 +1,192 @@
+import math
+import time
+import struct
+from multiprocessing import shared_memory
+
+from gpio.car_state import CarSnapshot
+
+# Cabeçalho do bloco: identificador, quantidade de elevadores e tamanho do anel de temperaturas
+SHARED_MAGIC = b"ELEV"
+HEADER = struct.Struct("<4sHH")
+
+# Contadores de 32 bits: sequência dos elevadores (ímpar durante uma escrita) e posições do anel
+COUNTER = struct.Struct("<I")
+SEQUENCE_OFFSET = 8
+RING_HEAD_OFFSET = 12
+RING_TAIL_OFFSET = 16
+CARS_OFFSET = 24
+
+# Estado de cada elevador: andar, estado e sentido (índices, -1 se desconhecido), temperatura (NaN
+# se desconhecida) e posição do encoder (-1 se desconhecida)
+CAR = struct.Struct("<bbbxfi")
+STATES = ("Parado", "Subindo", "Descendo", "Emergencia")
+DIRECTIONS = ("up", "down")
+
+# Amostra de temperatura: índice do elevador e temperatura
+SAMPLE = struct.Struct("<Hxxf")
+
+
+class SharedCarState():
+    """Bloco de memória compartilhada com layout fixo entre o processo dos elevadores e o processo
+    da tela e dos sensores de temperatura.
+
+    O estado dos elevadores tem um único escritor (o processo dos elevadores) e é protegido por um
+    contador de sequência: o escritor o deixa ímpar durante a escrita e o leitor repete a leitura se
+    o contador for ímpar ou mudar durante ela, então nenhum dos dois lados espera o outro. A versão
+    do estado é a metade do contador.
+
+    As temperaturas voltam por um anel de produtor e consumidor únicos: só o processo da tela
+    avança o início e só o processo dos elevadores avança o fim, sem lock.
+
+    A interface de leitura (:meth:`snapshots` e :meth:`wait_for_version`) é a mesma do
+    :class:`gpio.car_state.StateBoard`.
+    """
+    def __init__(self, floor_names, num_cars, ring_size=64, name=None, poll_interval=0.01) -> None:
+        """Cria um novo bloco ou se conecta a um bloco existente.
+
+        :param floor_names: Nomes dos andares, de baixo para cima
+        :type floor_names: tuple[str]
+        :param num_cars: Quantidade de elevadores
+        :type num_cars: int
+        :param ring_size: Capacidade do anel de temperaturas, default é 64
+        :type ring_size: int
+        :param name: Nome de um bloco existente, default é criar um novo
+        :type name: str
+        :param poll_interval: Intervalo em segundos entre consultas da versão em :meth:`wait_for_version`, default é 0.01
+        :type poll_interval: float
+        :raises ValueError: Se o bloco existente tiver outro layout
+        """
+        self.floor_names = tuple(floor_names)
+        self.num_cars = num_cars
+        self.ring_size = ring_size
+        self.poll_interval = poll_interval
+        self.ring_offset = CARS_OFFSET + num_cars * CAR.size
+        self.owner = name is None
+
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=self.ring_offset + ring_size * SAMPLE.size)
+            HEADER.pack_into(self.memory.buf, 0, SHARED_MAGIC, num_cars, ring_size)
+            for car_idx in range(num_cars):
+                CAR.pack_into(self.memory.buf, CARS_OFFSET + car_idx * CAR.size, -1, 0, -1, math.nan, -1)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            if HEADER.unpack_from(self.memory.buf, 0) != (SHARED_MAGIC, num_cars, ring_size):
+                self.memory.close()
+                raise ValueError(f"Bloco de memória compartilhada {name} com outro layout!")
+
+        self.name = self.memory.name
+        self._floor_index = {floor: idx for idx, floor in enumerate(self.floor_names)}
+
+    def _counter(self, offset) -> int:
+        return COUNTER.unpack_from(self.memory.buf, offset)[0]
+
+    def _set_counter(self, offset, value) -> None:
+        COUNTER.pack_into(self.memory.buf, offset, value & 0xFFFFFFFF)
+
+    @property
+    def version(self) -> int:
+        """Versão do estado dos elevadores, incrementada a cada escrita.
+        """
+        return self._counter(SEQUENCE_OFFSET) // 2
+
+    def write(self, snapshots) -> None:
+        """Escreve o estado dos elevadores (só no processo dos elevadores, por uma única thread).
+
+        :param snapshots: Snapshot de cada elevador, na ordem dos índices
+        :type snapshots: tuple[class:`gpio.car_state.CarSnapshot`]
+        """
+        sequence = self._counter(SEQUENCE_OFFSET)
+        self._set_counter(SEQUENCE_OFFSET, sequence + 1)
+
+        for car_idx, snapshot in enumerate(snapshots):
+            CAR.pack_into(self.memory.buf, CARS_OFFSET + car_idx * CAR.size,
+                          self._floor_index.get(snapshot.floor, -1),
+                          STATES.index(snapshot.state) if snapshot.state in STATES else 0,
+                          DIRECTIONS.index(snapshot.direction) if snapshot.direction in DIRECTIONS else -1,
+                          math.nan if snapshot.temperature is None else snapshot.temperature,
+                          -1 if snapshot.position is None else snapshot.position)
+
+        self._set_counter(SEQUENCE_OFFSET, sequence + 2)
+
+    def snapshots(self) -> tuple:
+        """Lê o estado consistente de todos os elevadores, repetindo a leitura se ela coincidir com uma escrita.
+
+        :return: Snapshot de cada elevador, com a versão do estado
+        :rtype: tuple[class:`gpio.car_state.CarSnapshot`]
+        """
+        while True:
+            sequence = self._counter(SEQUENCE_OFFSET)
+            if sequence % 2 == 0:
+                cars = [CAR.unpack_from(self.memory.buf, CARS_OFFSET + car_idx * CAR.size)
+                        for car_idx in range(self.num_cars)]
+                if self._counter(SEQUENCE_OFFSET) == sequence:
+                    break
+            time.sleep(0)
+
+        version = sequence // 2
+        return tuple(CarSnapshot(car=car_idx + 1,
+                                 floor=self.floor_names[floor] if floor >= 0 else None,
+                                 state=STATES[state],
+                                 direction=DIRECTIONS[direction] if direction >= 0 else None,
+                                 temperature=None if math.isnan(temperature) else temperature,
+                                 position=None if position < 0 else position,
+                                 version=version)
+                     for car_idx, (floor, state, direction, temperature, position) in enumerate(cars))
+
+    def wait_for_version(self, version, timeout=None) -> tuple:
+        """Espera o estado ter uma versão maior que `version`, consultando-a a cada `poll_interval`.
+
+        :param version: Última versão vista pelo leitor
+        :type version: int
+        :param timeout: Tempo máximo de espera em segundos, default é esperar indefinidamente
+        :type timeout: float
+        :return: Snapshot de cada elevador
+        :rtype: tuple[class:`gpio.car_state.CarSnapshot`]
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.version <= version:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+        return self.snapshots()
+
+    def push_temperature(self, car_idx, temperature) -> bool:
+        """Coloca uma temperatura no anel (só no processo da tela).
+
+        :param car_idx: Índice do elevador
+        :type car_idx: int
+        :param temperature: Temperatura medida
+        :type temperature: float
+        :return: Verdadeiro se a amostra coube no anel
+        :rtype: bool
+        """
+        head, tail = self._counter(RING_HEAD_OFFSET), self._counter(RING_TAIL_OFFSET)
+        if (head - tail) & 0xFFFFFFFF >= self.ring_size:
+            return False
+
+        SAMPLE.pack_into(self.memory.buf, self.ring_offset + (head % self.ring_size) * SAMPLE.size, car_idx, temperature)
+        # A amostra só fica visível depois de escrita por completo
+        self._set_counter(RING_HEAD_OFFSET, head + 1)
+        return True
+
+    def pop_temperatures(self) -> list:
+        """Retira todas as temperaturas do anel (só no processo dos elevadores).
+
+        :return: Índice do elevador e temperatura de cada amostra, na ordem em que foram colocadas
+        :rtype: list[tuple(int, float)]
+        """
+        head, tail = self._counter(RING_HEAD_OFFSET), self._counter(RING_TAIL_OFFSET)
+        samples = []
+        while tail != head:
+            samples.append(SAMPLE.unpack_from(self.memory.buf, self.ring_offset + (tail % self.ring_size) * SAMPLE.size))
+            tail = (tail + 1) & 0xFFFFFFFF
+        self._set_counter(RING_TAIL_OFFSET, tail)
+        return samples
+
+    def close(self) -> None:
+        """Desconecta do bloco, removendo-o se ele foi criado por esta instância.
+        """
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
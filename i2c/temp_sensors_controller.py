@@ -1,14 +1,19 @@
 from time import sleep
 
-from smbus2 import SMBus
-from bmp280 import BMP280
-
 class TempSensorController:
     """Classe que gerencia os sensores de temperatura BMP280.
     """
-    def __init__(self) -> None:
+    def __init__(self, num_elevators=2) -> None:
         """Inicializa uma nova instância do controlador de sensores de temperatura.
+
+        :param num_elevators: Quantidade de elevadores monitorados, default é 2
+        :type num_elevators: int
         """
+        # Importadas só quando os sensores são usados, para não exigi-las nos perfis sem I2C
+        from smbus2 import SMBus
+        from bmp280 import BMP280
+
+        self.num_elevators = num_elevators
         self.bus = SMBus(1)
         
         # self.sensors = [ BMP280(i2c_dev=self.bus, i2c_addr=0x76),
@@ -19,13 +24,13 @@ class TempSensorController:
     def get_temperature(self, elevator_number) -> float:
         """Obtém a temperatura de um dos sensores BMP280.
 
-        :param elevator_number: Número do elevador (0 ou 1)
+        :param elevator_number: Índice do elevador (de 0 a `num_elevators` - 1)
         :type elevator_number: int
         :return: Temperatura medida pelo sensor em graus Celsius
         :rtype: float
-        :raises ValueError: Se o número do elevador não for 0 ou 1
+        :raises ValueError: Se o índice do elevador for inválido
         """
-        if elevator_number not in [0, 1]:
+        if not 0 <= elevator_number < self.num_elevators:
             raise ValueError
 
         # return self.sensors[elevator_number].get_temperature()
@@ -1,12 +1,60 @@
 import signal
 import time
+import argparse
+from contextlib import contextmanager
 from threading import Thread, Event
 
-import RPi.GPIO as GPIO
+from setup.config import load_config, CONFIG_PATH, PROFILES
+from profiling.profiler import Profiler
+
+
+class StartupTimer():
+    """Mede a duração de cada fase da inicialização da aplicação.
+    """
+    def __init__(self) -> None:
+        """Inicializa um novo cronômetro, contando a partir de agora.
+        """
+        self.started_at = time.monotonic()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        """Mede a duração do bloco como uma fase da inicialização.
+
+        :param name: Nome da fase
+        :type name: str
+        """
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.monotonic() - started_at))
+
+    def report(self) -> None:
+        """Imprime a duração de cada fase e o tempo total da inicialização.
+        """
+        phases = ", ".join(f"{name}: {elapsed * 1000:.0f} ms" for name, elapsed in self.phases)
+        print(f"Inicialização concluída em {(time.monotonic() - self.started_at) * 1000:.0f} ms ({phases})")
+
+
+def start_simulation(config) -> tuple:
+    """Monta o prédio simulado em tempo real, instalando a GPIO simulada no lugar do `RPi.GPIO`.
+
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :return: Prédio simulado e a ESP32 simulada de cada barramento
+    :rtype: tuple(class:`sim.building.Building`, list[class:`sim.esp32.SimulatedESP32`])
+    """
+    from sim import gpio as sim_gpio
+    from sim.building import Building
+    from sim.esp32 import SimulatedESP32
+
+    building = Building(config)
+    sim_gpio.install(building)
+    building.start()
+
+    return building, [SimulatedESP32(building, bus=bus_idx) for bus_idx in range(len(config.buses))]
 
-from reset_all import reset_all
-from gpio.elevator_controller import ElevatorController
-from i2c.oled_screen import Screen
 
 def main():
     def exit_handler(sig, frame):
@@ -14,28 +62,97 @@ def main():
         exit_execution.set()
         time.sleep(0.5)
 
+    parser = argparse.ArgumentParser(description="Controle do sistema de elevadores.")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default=None,
+                        help="Perfil de execução, default é o do arquivo de configuração")
+    parser.add_argument("--config", default=CONFIG_PATH, help="Arquivo de configuração")
+    args = parser.parse_args()
+
     exit_execution = Event()
+    timer = StartupTimer()
+
+    # Carrega e valida a configuração uma única vez para todo o sistema
+    with timer.phase("configuração"):
+        config = load_config(args.config, profile=args.profile)
+    subsystems = config.subsystems
+    print(f"Perfil de execução: {config.profile}")
 
-    elevator_controller = ElevatorController()
-    screen = Screen(elevator_controller=elevator_controller)
+    building, transports = None, None
+    if subsystems.simulation:
+        with timer.phase("prédio simulado"):
+            building, transports = start_simulation(config)
+
+    # Os módulos dos elevadores importam o RPi.GPIO (ou a GPIO simulada já instalada)
+    with timer.phase("GPIO"):
+        import RPi.GPIO as GPIO
+        from reset_all import reset_all
+        from gpio.elevator_controller import ElevatorController
+
+    with timer.phase("barramentos e elevadores"):
+        elevator_controller = ElevatorController(config=config, transports=transports)
+
+    # Ligado e desligado com SIGUSR1 (kill -USR1 <pid>), sem reiniciar a aplicação
+    profiler = Profiler(elevator_controller.modbus_controllers, interval=config.profiler.interval,
+                        output_dir=config.profiler.output_dir)
+
+    screen, screen_process = None, None
+    if (subsystems.display or subsystems.temperature) and config.screen.process:
+        # Tela e sensores com interpretador próprio, lendo o estado dos elevadores da memória compartilhada
+        from i2c.display_process import DisplayProcess
+        screen_process = DisplayProcess(elevator_controller, display=subsystems.display,
+                                        temperature=subsystems.temperature)
+    elif subsystems.display or subsystems.temperature:
+        from i2c.oled_screen import Screen
+        screen = Screen(config=config, board=elevator_controller.state_board,
+                        floors_display=elevator_controller.floors_display,
+                        on_temperature=elevator_controller.update_temperature,
+                        display=subsystems.display, temperature=subsystems.temperature)
+
+    group_coordinator = None
+    if config.group.enabled:
+        with timer.phase("coordenação entre grupos"):
+            from group.coordinator import GroupCoordinator
+            group_coordinator = GroupCoordinator(elevator_controller, config.group)
+            elevator_controller.group = group_coordinator
+
+    monitor_server = None
+    if config.api.enabled:
+        with timer.phase("servidor"):
+            from api.server import MonitorServer
+            monitor_server = MonitorServer(elevator_controller=elevator_controller, host=config.api.host,
+                                           port=config.api.port, push_interval=config.api.push_interval,
+                                           send_timeout=config.api.send_timeout)
 
     try:
         # Iniciando as threads
-        screen_thread = Thread(target=screen.update, args=(exit_execution,))
         elevators_requests_thread = Thread(target=elevator_controller.handle_requests, args=(exit_execution,))
 
         # Configurando as threads como daemon
-        screen_thread.daemon = True
         elevators_requests_thread.daemon = True
 
         # Configurando o tratamento de sinais para finalizar o programa
         signal.signal(signal.SIGINT, exit_handler)
         signal.signal(signal.SIGTERM, exit_handler)
+        signal.signal(signal.SIGUSR1, lambda sig, frame: profiler.toggle())
 
-        # Iniciando as threads
-        screen_thread.start()
+        # Iniciando as threads; a tela inicializa os periféricos na própria thread
+        if group_coordinator is not None:
+            group_coordinator.start()
         elevators_requests_thread.start()
 
+        if screen is not None:
+            screen_thread = Thread(target=screen.update, args=(exit_execution,))
+            screen_thread.daemon = True
+            screen_thread.start()
+
+        if screen_process is not None:
+            screen_process.start()
+
+        if monitor_server is not None:
+            monitor_server.start()
+
+        timer.report()
+
         # Aguarda evento de termino das threads
         exit_execution.wait()
 
@@ -45,13 +162,23 @@ def main():
 
     finally:
         # Limpar configurações ao finalizar
+        profiler.stop()
+        if monitor_server is not None:
+            monitor_server.shutdown()
+        # A tela em processo separado ainda envia temperaturas pelo barramento até ser finalizada
+        if screen_process is not None:
+            screen_process.shutdown()
+        if group_coordinator is not None:
+            group_coordinator.shutdown()
         elevator_controller.shutdown_elevators()
 
-        screen.shutdown()
+        if screen is not None:
+            screen.shutdown()
         GPIO.cleanup()
-        reset_all()
+        reset_all(config)
+        if building is not None:
+            building.stop()
         print("Recursos limpos e programa encerrado com sucesso.")
 
 if __name__ == "__main__":
     main()
-    
\ No newline at end of file
@@ -0,0 +1,225 @@
+import os
+import sys
+import time
+import threading
+from collections import defaultdict, deque
+
+# Quantidade de atrasos da amostragem mantidos para o cálculo do p99
+LATENESS_WINDOW = 100000
+
+
+class LockStats():
+    """Tempos de espera e de posse do barramento Modbus por local de chamada.
+
+    A espera vai do pedido da transação até a thread de I/O assumir o barramento (tempo na fila
+    de prioridade), e a posse é o tempo da transação com o barramento ocupado.
+    """
+    def __init__(self) -> None:
+        """Inicializa as estatísticas vazias.
+        """
+        self._lock = threading.Lock()
+        # (porta, local da chamada) -> [chamadas, espera total, espera máxima, posse total, posse máxima]
+        self.sites = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+
+    def record(self, port, site, wait, hold) -> None:
+        """Registra uma transação.
+
+        :param port: Porta serial do barramento
+        :type port: str
+        :param site: Local da chamada (arquivo, linha e função fora do controlador Modbus)
+        :type site: str
+        :param wait: Espera pelo barramento em segundos
+        :type wait: float
+        :param hold: Posse do barramento em segundos
+        :type hold: float
+        """
+        with self._lock:
+            entry = self.sites[(port, site)]
+            entry[0] += 1
+            entry[1] += wait
+            entry[2] = max(entry[2], wait)
+            entry[3] += hold
+            entry[4] = max(entry[4], hold)
+
+    def table(self) -> str:
+        """Formata a tabela de espera e posse por local de chamada, da maior espera total para a menor.
+
+        :return: Tabela em texto
+        :rtype: str
+        """
+        with self._lock:
+            rows = sorted(self.sites.items(), key=lambda item: item[1][1], reverse=True)
+
+        lines = [f"{'Barramento':<14} {'Local da chamada':<58} {'Chamadas':>8} {'Espera total':>13} "
+                 f"{'Espera média':>13} {'Espera máx':>11} {'Posse média':>12} {'Posse máx':>10}"]
+        for (port, site), (calls, wait, max_wait, hold, max_hold) in rows:
+            lines.append(f"{port:<14} {site:<58} {calls:>8} {wait * 1000:>10.1f} ms {wait / calls * 1000:>10.2f} ms "
+                         f"{max_wait * 1000:>8.2f} ms {hold / calls * 1000:>9.2f} ms {max_hold * 1000:>7.2f} ms")
+        return "\n".join(lines)
+
+
+class Profiler():
+    """Profiler por amostragem ligado e desligado em tempo de execução (ex.: pelo sinal SIGUSR1).
+
+    Enquanto ligado, uma thread amostra a pilha de todas as threads a cada `interval` segundos e
+    os controladores Modbus registram a espera e a posse do barramento por local de chamada. Ao
+    desligar, grava as pilhas no formato "collapsed" (compatível com o flamegraph.pl e o speedscope)
+    e a tabela de espera do barramento.
+
+    O atraso da thread de amostragem em relação ao intervalo pedido também é medido: atrasos
+    grandes indicam threads segurando o GIL (ex.: renderização da tela) sem liberá-lo.
+    """
+    def __init__(self, modbus_controllers, interval=0.005, output_dir="./profiles") -> None:
+        """Inicializa um novo profiler desligado.
+
+        :param modbus_controllers: Controladores Modbus instrumentados enquanto o profiler está ligado
+        :type modbus_controllers: list[class:`uart.ModbusController`]
+        :param interval: Intervalo entre amostras em segundos, default é 0.005
+        :type interval: float
+        :param output_dir: Diretório dos arquivos gerados, default é "./profiles"
+        :type output_dir: str
+        """
+        self.modbus_controllers = modbus_controllers
+        self.interval = interval
+        self.output_dir = output_dir
+
+        self._toggle_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.stacks = defaultdict(int)
+        self.lock_stats = None
+        self.samples = 0
+        self.lateness = deque(maxlen=LATENESS_WINDOW)
+        self.started_at = None
+
+    @property
+    def running(self) -> bool:
+        """Indica se o profiler está ligado.
+        """
+        return self._thread is not None
+
+    def toggle(self) -> None:
+        """Liga o profiler se estiver desligado, ou desliga e grava os resultados.
+        """
+        with self._toggle_lock:
+            if self.running:
+                self._stop()
+            else:
+                self._start()
+
+    def start(self) -> None:
+        """Liga o profiler, se ainda não estiver ligado.
+        """
+        with self._toggle_lock:
+            if not self.running:
+                self._start()
+
+    def stop(self) -> tuple:
+        """Desliga o profiler, se estiver ligado, e grava os resultados.
+
+        :return: Caminhos do arquivo de pilhas e da tabela de espera do barramento, ou None se estava desligado
+        :rtype: tuple(str, str)
+        """
+        with self._toggle_lock:
+            if self.running:
+                return self._stop()
+        return None
+
+    def _start(self) -> None:
+        """Zera as amostras, instrumenta os barramentos e inicia a thread de amostragem.
+        """
+        self.stacks = defaultdict(int)
+        self.samples = 0
+        self.lateness = deque(maxlen=LATENESS_WINDOW)
+        self.lock_stats = LockStats()
+        self.started_at = time.time()
+
+        for controller in self.modbus_controllers:
+            controller.lock_stats = self.lock_stats
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        print(f"Profiler ligado (amostragem a cada {self.interval * 1000:g} ms)")
+
+    def _stop(self) -> tuple:
+        """Finaliza a thread de amostragem, remove a instrumentação dos barramentos e grava os resultados.
+        """
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+
+        for controller in self.modbus_controllers:
+            controller.lock_stats = None
+
+        paths = self.write()
+        print(f"Profiler desligado: {self.samples} amostras em {paths[0]}, espera do barramento em {paths[1]}")
+        return paths
+
+    def _sample_loop(self) -> None:
+        """Loop da thread de amostragem.
+        """
+        own_id = threading.get_ident()
+        expected = time.monotonic() + self.interval
+
+        while not self._stop_event.wait(max(expected - time.monotonic(), 0)):
+            self.lateness.append(max(time.monotonic() - expected, 0.0))
+            expected += self.interval
+            # Depois de uma pausa longa, retoma o ritmo a partir de agora em vez de amostrar em rajada
+            expected = max(expected, time.monotonic())
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _collapse(thread_name, frame) -> str:
+        """Converte a pilha de uma thread em uma linha do formato "collapsed", da raiz para a folha.
+        """
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        frames.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(frames))
+
+    def sampler_lateness(self) -> dict:
+        """Atraso da thread de amostragem em relação ao intervalo pedido, nas últimas `LATENESS_WINDOW` amostras.
+
+        :return: Atraso médio, p99 e máximo em segundos
+        :rtype: dict
+        """
+        if not self.lateness:
+            return {"mean": 0.0, "p99": 0.0, "max": 0.0}
+        ordered = sorted(self.lateness)
+        return {"mean": sum(ordered) / len(ordered),
+                "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+                "max": ordered[-1]}
+
+    def write(self) -> tuple:
+        """Grava as pilhas amostradas e a tabela de espera do barramento em `output_dir`.
+
+        :return: Caminhos do arquivo de pilhas e da tabela de espera do barramento
+        :rtype: tuple(str, str)
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at))
+        stacks_path = os.path.join(self.output_dir, f"profile-{stamp}.folded")
+        locks_path = os.path.join(self.output_dir, f"locks-{stamp}.txt")
+
+        with open(stacks_path, "w") as file:
+            for stack, count in sorted(self.stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+        lateness = self.sampler_lateness()
+        with open(locks_path, "w") as file:
+            file.write(f"Amostras: {self.samples} (intervalo de {self.interval * 1000:g} ms)\n")
+            file.write(f"Atraso da amostragem (GIL): média {lateness['mean'] * 1000:.2f} ms, "
+                       f"p99 {lateness['p99'] * 1000:.2f} ms, máximo {lateness['max'] * 1000:.2f} ms\n\n")
+            file.write(self.lock_stats.table() + "\n")
+
+        return stacks_path, locks_path
@@ -1,24 +1,23 @@
 import RPi.GPIO as GPIO
 
+from setup.config import load_config
+
 # Define o padrao de numeracao das portas como BCM
 # A outra opcap e GPIO.BOARD para usar o numero dos pinos fisicos da placa
-def reset_all():
+def reset_all(config=None):
 	GPIO.setmode(GPIO.BCM)
 	GPIO.setwarnings(False)
 
-	output_pins = [
-		20, 19,
-		21, 26,
-		12, 13,
-		18, 17,
-		23, 27,
-		24, 22,
-		25, 6,
-	]
+	if config is None:
+		config = load_config()
+
+	# Pinos de saida (motores) e dos sensores de andar de todos os elevadores
+	output_pins = [pin for elevator in config.elevators
+				   for pin in elevator.output_pins + elevator.sensors]
 
 	for pin in output_pins:
 		GPIO.setup(pin, GPIO.OUT)
 		GPIO.output(pin, GPIO.LOW)
 
 if __name__ == "__main__":
-    reset_all()
\ No newline at end of file
+    reset_all()
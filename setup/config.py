@@ -0,0 +1,639 @@
+import json
+from dataclasses import dataclass, field
+
+CONFIG_PATH = "./setup/config.json"
+
+# Tipos de botões presentes no mapa de registradores da ESP32
+HALL_UP = "hall_up"
+HALL_DOWN = "hall_down"
+CAR = "car"
+EMERGENCY = "emergency"
+
+BUTTON_KINDS = (HALL_UP, HALL_DOWN, CAR, EMERGENCY)
+
+# Código de requisição usado para o botão de emergência
+EMERGENCY_CODE = "E"
+
+# Perfis de execução: hardware completo, sem tela e sensores de temperatura, ou prédio simulado
+PROFILE_FULL = "full"
+PROFILE_HEADLESS = "headless"
+PROFILE_SIMULATION = "simulation"
+
+
+@dataclass(frozen=True)
+class FloorConfig:
+    """Configuração de um andar do prédio.
+
+    :param code: Código de requisição do andar (ex.: "G")
+    :param name: Nome interno do andar (ex.: "ground_floor")
+    :param display: Nome exibido na tela (ex.: "Terreo")
+    :param sensor_tag: Tag do sensor do andar nas entradas de cada elevador
+    """
+    code: str
+    name: str
+    display: str
+    sensor_tag: str
+
+
+@dataclass(frozen=True)
+class ButtonConfig:
+    """Botão mapeado em um registrador da ESP32.
+
+    :param offset: Deslocamento do registrador a partir da base do elevador
+    :param kind: Tipo do botão (`hall_up`, `hall_down`, `car` ou `emergency`)
+    :param floor: Código do andar do botão (None para a emergência)
+    """
+    offset: int
+    kind: str
+    floor: str = None
+
+    @property
+    def request_code(self) -> str:
+        """Código de requisição gerado pelo botão.
+        """
+        return EMERGENCY_CODE if self.kind == EMERGENCY else self.floor
+
+    @property
+    def is_hall(self) -> bool:
+        """Indica se o botão é externo (fica no andar).
+        """
+        return self.kind in (HALL_UP, HALL_DOWN)
+
+
+@dataclass(frozen=True)
+class ElevatorConfig:
+    """Configuração de um elevador: GPIOs do motor e dos sensores e mapa de registradores.
+
+    :param number: Número do elevador (a partir de 1)
+    :param engine_id: ID do motor usado nos comandos Modbus
+    :param dir_1: GPIO do pino de direção 1 do motor
+    :param dir_2: GPIO do pino de direção 2 do motor
+    :param potm: GPIO do PWM do motor
+    :param sensors: GPIO do sensor de cada andar, na ordem dos andares
+    :param register_base: Endereço do primeiro registrador de botões do elevador
+    :param buttons: Botões do elevador, ordenados pelo deslocamento
+    :param bus: Índice do barramento Modbus (ESP32) ao qual o elevador está ligado
+    """
+    number: int
+    engine_id: int
+    dir_1: int
+    dir_2: int
+    potm: int
+    sensors: tuple
+    register_base: int
+    buttons: tuple
+    bus: int = 0
+
+    @property
+    def index(self) -> int:
+        """Índice do elevador nas listas do controlador.
+        """
+        return self.number - 1
+
+    @property
+    def register_count(self) -> int:
+        """Quantidade de registradores de botões do elevador.
+        """
+        return len(self.buttons)
+
+    @property
+    def btn_addresses(self) -> tuple:
+        """Endereço de cada botão do elevador.
+        """
+        return tuple(self.register_base + button.offset for button in self.buttons)
+
+    @property
+    def requests_idx(self) -> tuple:
+        """Código de requisição de cada botão do elevador.
+        """
+        return tuple(button.request_code for button in self.buttons)
+
+    @property
+    def output_pins(self) -> tuple:
+        """GPIOs de saída do elevador.
+        """
+        return (self.dir_1, self.dir_2, self.potm)
+
+
+@dataclass(frozen=True)
+class DoorConfig:
+    """Tempos (em segundos) da máquina de estados das portas.
+    """
+    open_time: float = 1.0
+    close_time: float = 1.0
+    car_dwell: float = 2.0
+    hall_dwell: float = 4.0
+    extend_dwell: float = 3.0
+    min_dwell: float = 1.0
+
+
+@dataclass(frozen=True)
+class TimingConfig:
+    """Parâmetros de tempo do sistema.
+
+    :param poll_interval: Intervalo entre leituras dos botões, em segundos
+    :param control_period: Período de amostragem do controle PID, em segundos
+    :param bus_turnaround: Espera entre o envio e a leitura de uma resposta Modbus, em segundos
+    :param display_interval: Intervalo mínimo entre atualizações da tela, em segundos
+    :param temperature_interval: Intervalo entre leituras dos sensores de temperatura, em segundos
+    :param pwm_frequency: Frequência do PWM dos motores, em Hz
+    :param sensor_bouncetime: Debounce dos sensores de andar, em milissegundos
+    :param calibration_timeout: Tempo máximo de espera por um sensor na calibração, em milissegundos
+    :param bus_report_interval: Intervalo entre os relatórios de uso dos barramentos, em segundos
+    :param shadow_max_age: Tempo após o qual um registrador da cópia local da ESP32 é reconciliado (escrito de novo mesmo sem mudança), em segundos
+    :param bus_deadline: Tempo máximo de uma transação Modbus, da entrada na fila até a resposta, em segundos
+    :param control_deadline: Tempo máximo das transações do laço de controle (leitura do encoder e PWM); passando dele a viagem é interrompida com o motor parado, em segundos
+    :param position_interval: Intervalo mínimo entre publicações da posição de um elevador em movimento no quadro de estados, em segundos
+    """
+    poll_interval: float = 0.05
+    control_period: float = 0.2
+    bus_turnaround: float = 0.1
+    display_interval: float = 0.1
+    temperature_interval: float = 1.0
+    pwm_frequency: int = 1000
+    sensor_bouncetime: int = 200
+    calibration_timeout: int = 60000
+    bus_report_interval: float = 60.0
+    shadow_max_age: float = 5.0
+    bus_deadline: float = 2.0
+    control_deadline: float = 0.5
+    position_interval: float = 1.0
+
+
+@dataclass(frozen=True)
+class ControlConfig:
+    """Parâmetros do controle de posição dos elevadores.
+
+    :param floor_tolerance: Distância máxima (em pulsos do encoder) até a posição calibrada para considerar o elevador no andar
+    :param stop_window: Distância (em pulsos do encoder) até o andar de destino a partir da qual a viagem conta os períodos para assentar
+    :param sensor_window: Distância máxima (em pulsos do encoder) entre a posição estimada e o andar para aceitar uma borda de sensor
+    :param kp: Ganho proporcional do PID para subir (até o ensaio do relé)
+    :param ki: Ganho integral do PID para subir
+    :param kd: Ganho derivativo do PID para subir com o elevador parado
+    :param kd_fast: Ganho derivativo do PID para subir na velocidade máxima
+    :param kp_down: Ganho proporcional do PID para descer (até o ensaio do relé)
+    :param ki_down: Ganho integral do PID para descer
+    :param kd_down: Ganho derivativo do PID para descer com o elevador parado
+    :param kd_fast_down: Ganho derivativo do PID para descer na velocidade máxima
+    :param short_kp_scale: Escala do ganho proporcional nas viagens de um andar
+    :param short_kd_scale: Escala do ganho derivativo com o elevador parado nas viagens de um andar
+    :param short_kd_fast_scale: Escala do ganho derivativo na velocidade máxima nas viagens de um andar
+    :param max_speed: Velocidade máxima, em pulsos por período de controle, para interpolar o ganho derivativo
+    :param settle_ticks: Períodos de controle dentro de `stop_window` após os quais a viagem termina mesmo sem assentar no andar
+    :param autotune: Indica se o ensaio do relé deve ajustar os ganhos na calibração
+    :param relay_amplitude: Potência do relé no ensaio, em %
+    :param relay_cycles: Ciclos de oscilação medidos no ensaio
+    :param relay_limit: Distância máxima do andar durante o ensaio, em pulsos do encoder, além da qual ele é interrompido
+    """
+    floor_tolerance: int = 5
+    stop_window: int = 200
+    sensor_window: int = 600
+    kp: float = 0.015
+    ki: float = 0.0
+    kd: float = 0.0006
+    kd_fast: float = 0.0025
+    kp_down: float = 0.015
+    ki_down: float = 0.0
+    kd_down: float = 0.0006
+    kd_fast_down: float = 0.0025
+    short_kp_scale: float = 0.85
+    short_kd_scale: float = 2.0
+    short_kd_fast_scale: float = 1.3
+    max_speed: float = 3200.0
+    settle_ticks: int = 15
+    autotune: bool = True
+    relay_amplitude: float = 20.0
+    relay_cycles: int = 4
+    relay_limit: int = 1500
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    """Parâmetros do estágio de saída dos motores e do espelho do PWM na ESP32.
+
+    :param slew_rate: Aumento máximo da potência do motor, em % por segundo (0 desliga o limite)
+    :param reversal_dead_time: Tempo com o motor livre antes de inverter o sentido, em segundos
+    :param mirror_threshold: Variação mínima do PWM (em %) para enviá-lo de novo à ESP32 durante uma viagem
+    :param mirror_heartbeat: Intervalo máximo entre os envios do PWM à ESP32 durante uma viagem, em segundos
+    """
+    slew_rate: float = 250.0
+    reversal_dead_time: float = 0.1
+    mirror_threshold: int = 5
+    mirror_heartbeat: float = 1.0
+
+
+@dataclass(frozen=True)
+class ParkingConfig:
+    """Parâmetros do estacionamento dos elevadores ociosos pela demanda aprendida.
+
+    :param enabled: Indica se os elevadores ociosos devem ser reposicionados
+    :param path: Arquivo do histograma de demanda (vazio para manter só em memória)
+    :param slot_minutes: Duração de cada faixa do dia do histograma, em minutos
+    :param idle_delay: Tempo ocioso (parado, de porta fechada e sem requisições) antes de reposicionar, em segundos
+    :param save_interval: Intervalo entre gravações do histograma, em segundos
+    """
+    enabled: bool = True
+    path: str = "./setup/demand.bin"
+    slot_minutes: int = 60
+    idle_delay: float = 5.0
+    save_interval: float = 300.0
+
+
+@dataclass(frozen=True)
+class ProfilerConfig:
+    """Parâmetros do profiler por amostragem, ligado e desligado com o sinal SIGUSR1.
+
+    :param interval: Intervalo entre amostras das pilhas das threads, em segundos
+    :param output_dir: Diretório das pilhas ("collapsed") e das tabelas de espera do barramento
+    """
+    interval: float = 0.005
+    output_dir: str = "./profiles"
+
+
+@dataclass(frozen=True)
+class ScreenConfig:
+    """Parâmetros da execução da tela e dos sensores de temperatura.
+
+    :param process: Indica se a tela e os sensores rodam em um processo separado, com o estado dos elevadores em memória compartilhada
+    :param ring_size: Capacidade do anel de temperaturas enviadas pelo processo da tela
+    :param poll_interval: Intervalo máximo entre consultas do anel de temperaturas e da versão do estado, em segundos
+    :param nice: Redução da prioridade de escalonamento do processo da tela (0 mantém a dos elevadores)
+    """
+    process: bool = False
+    ring_size: int = 64
+    poll_interval: float = 0.05
+    nice: int = 10
+
+
+@dataclass(frozen=True)
+class CallConfig:
+    """Parâmetros do registro de chamadas.
+
+    :param wait_sla: Espera máxima de uma chamada, em segundos, antes de ela passar para a frente das filas
+    :param history: Quantidade de chamadas atendidas mantidas para as métricas de espera
+    """
+    wait_sla: float = 60.0
+    history: int = 1000
+
+
+@dataclass(frozen=True)
+class WatchdogConfig:
+    """Parâmetros do watchdog dos barramentos e das threads de controle.
+
+    :param enabled: Indica se o watchdog deve ser iniciado
+    :param interval: Intervalo entre as verificações, em segundos
+    :param stall_timeout: Duração de uma transação a partir da qual o barramento é considerado travado, em segundos
+    :param heartbeat_timeout: Tempo sem progresso da leitura dos botões ou de um laço de controle a partir do qual a thread é considerada travada, em segundos
+    :param recovery_grace: Espera pela thread de I/O depois de reabrir a porta, antes de substituí-la, em segundos
+    :param history: Quantidade de eventos de recuperação mantidos para as métricas
+    """
+    enabled: bool = True
+    interval: float = 0.25
+    stall_timeout: float = 1.0
+    heartbeat_timeout: float = 5.0
+    recovery_grace: float = 0.5
+    history: int = 100
+
+
+@dataclass(frozen=True)
+class GroupConfig:
+    """Parâmetros da coordenação pela rede local entre grupos de elevadores (um processo por grupo).
+
+    :param enabled: Indica se a coordenação deve ser iniciada
+    :param node_id: Identificador deste grupo, único na rede
+    :param host: Endereço de escuta (e interface do multicast)
+    :param port: Porta UDP
+    :param multicast: Endereço multicast dos grupos (vazio para enviar por unicast aos `peers`)
+    :param peers: Endereços ("host:porta") dos outros grupos no modo unicast
+    :param announce_interval: Intervalo máximo entre os anúncios do estado, que também servem de heartbeat, em segundos
+    :param min_announce_interval: Intervalo mínimo entre anúncios feitos por mudança de estado, em segundos
+    :param node_timeout: Tempo sem anúncios após o qual um grupo é considerado fora do ar, em segundos
+    :param bid_window: Tempo de espera pelos lances de uma chamada de andar, em segundos
+    :param award_timeout: Tempo de espera pela confirmação de uma chamada atribuída antes de reenviá-la, em segundos
+    :param floor_time: Tempo estimado de viagem por andar usado nos lances, em segundos
+    :param history: Quantidade de chamadas atendidas mantidas para as métricas
+    """
+    enabled: bool = False
+    node_id: int = 1
+    host: str = "0.0.0.0"
+    port: int = 47800
+    multicast: str = "239.255.42.99"
+    peers: tuple = ()
+    announce_interval: float = 0.5
+    min_announce_interval: float = 0.1
+    node_timeout: float = 2.0
+    bid_window: float = 0.2
+    award_timeout: float = 1.0
+    floor_time: float = 4.0
+    history: int = 1000
+
+
+@dataclass(frozen=True)
+class ProfileConfig:
+    """Subsistemas habilitados em um perfil de execução.
+
+    :param display: Indica se a tela OLED deve ser inicializada
+    :param temperature: Indica se os sensores de temperatura devem ser lidos
+    :param simulation: Indica se os elevadores rodam sobre o prédio simulado no lugar da GPIO e das ESP32
+    """
+    display: bool = True
+    temperature: bool = True
+    simulation: bool = False
+
+
+PROFILES = {
+    PROFILE_FULL: ProfileConfig(),
+    PROFILE_HEADLESS: ProfileConfig(display=False, temperature=False),
+    PROFILE_SIMULATION: ProfileConfig(display=False, temperature=False, simulation=True),
+}
+
+
+@dataclass(frozen=True)
+class ModbusConfig:
+    """Parâmetros de um barramento Modbus com uma ESP32 (porta serial própria).
+
+    :param capture_path: Arquivo em que o tráfego da UART é gravado para reprodução (vazio para não gravar)
+    :param timeout: Tempo máximo de uma leitura ou escrita na porta serial, em segundos
+    """
+    port: str = "/dev/serial0"
+    baudrate: int = 115200
+    device_id: int = 0x01
+    student_id: tuple = (9, 6, 2, 0)
+    capture_path: str = ""
+    timeout: float = 0.5
+
+
+@dataclass(frozen=True)
+class ApiConfig:
+    """Parâmetros do servidor local de monitoramento e controle.
+
+    :param enabled: Indica se o servidor deve ser iniciado
+    :param host: Endereço de escuta
+    :param port: Porta de escuta
+    :param push_interval: Intervalo mínimo entre envios de mudanças de estado, em segundos
+    :param send_timeout: Tempo máximo para um cliente WebSocket receber um envio antes de ser desconectado, em segundos
+    """
+    enabled: bool = True
+    host: str = "127.0.0.1"
+    port: int = 8080
+    push_interval: float = 0.1
+    send_timeout: float = 1.0
+
+
+@dataclass(frozen=True)
+class SystemConfig:
+    """Configuração completa e validada do sistema de elevadores.
+    """
+    floors: tuple
+    elevators: tuple
+    door: DoorConfig = field(default_factory=DoorConfig)
+    timing: TimingConfig = field(default_factory=TimingConfig)
+    control: ControlConfig = field(default_factory=ControlConfig)
+    engine: EngineConfig = field(default_factory=EngineConfig)
+    parking: ParkingConfig = field(default_factory=ParkingConfig)
+    buses: tuple = (ModbusConfig(),)
+    api: ApiConfig = field(default_factory=ApiConfig)
+    profiler: ProfilerConfig = field(default_factory=ProfilerConfig)
+    screen: ScreenConfig = field(default_factory=ScreenConfig)
+    calls: CallConfig = field(default_factory=CallConfig)
+    watchdog: WatchdogConfig = field(default_factory=WatchdogConfig)
+    group: GroupConfig = field(default_factory=GroupConfig)
+    profile: str = PROFILE_FULL
+
+    @property
+    def subsystems(self) -> ProfileConfig:
+        """Subsistemas habilitados no perfil de execução.
+        """
+        return PROFILES[self.profile]
+
+    @property
+    def floor_codes(self) -> tuple:
+        """Códigos de requisição dos andares, de baixo para cima.
+        """
+        return tuple(floor.code for floor in self.floors)
+
+    def floor_by_code(self, code) -> FloorConfig:
+        """Busca um andar pelo seu código de requisição.
+
+        :param code: Código do andar
+        :type code: str
+        :return: Configuração do andar
+        :rtype: class:`FloorConfig`
+        :raises KeyError: Se o código não existir
+        """
+        for floor in self.floors:
+            if floor.code == code:
+                return floor
+        raise KeyError(code)
+
+
+DEFAULT_FLOORS = (
+    {"code": "G", "name": "ground_floor", "display": "Terreo", "sensor_tag": "SENSOR_TERREO"},
+    {"code": "F", "name": "first_floor", "display": "1º Andar", "sensor_tag": "SENSOR_1_ANDAR"},
+    {"code": "S", "name": "second_floor", "display": "2º Andar", "sensor_tag": "SENSOR_2_ANDAR"},
+    {"code": "T", "name": "third_floor", "display": "3º Andar", "sensor_tag": "SENSOR_3_ANDAR"},
+)
+
+
+def default_buttons(floors) -> tuple:
+    """Gera o mapa de botões padrão da ESP32 para os andares dados: botões externos
+    (térreo só sobe, último andar só desce, intermediários descem e sobem), emergência
+    e, por fim, os botões internos de cada andar.
+
+    :param floors: Andares do prédio, de baixo para cima
+    :type floors: tuple[class:`FloorConfig`]
+    :return: Botões do elevador
+    :rtype: tuple[class:`ButtonConfig`]
+    """
+    layout = []
+    for idx, floor in enumerate(floors):
+        if idx > 0:
+            layout.append((HALL_DOWN, floor.code))
+        if idx < len(floors) - 1:
+            layout.append((HALL_UP, floor.code))
+    layout.append((EMERGENCY, None))
+    layout += [(CAR, floor.code) for floor in floors]
+
+    return tuple(ButtonConfig(offset=offset, kind=kind, floor=code) for offset, (kind, code) in enumerate(layout))
+
+
+def _parse_floors(raw_floors) -> tuple:
+    """Converte e valida a lista de andares do arquivo de configuração.
+    """
+    floors = tuple(FloorConfig(**raw) for raw in raw_floors)
+
+    if len(floors) < 2:
+        raise ValueError("A configuração deve ter pelo menos 2 andares!")
+
+    for attr in ("code", "name", "sensor_tag"):
+        values = [getattr(floor, attr) for floor in floors]
+        if len(set(values)) != len(values):
+            raise ValueError(f"Valores repetidos no campo '{attr}' dos andares!")
+
+    if EMERGENCY_CODE in [floor.code for floor in floors]:
+        raise ValueError(f"O código '{EMERGENCY_CODE}' é reservado para a emergência!")
+
+    return floors
+
+
+def _parse_buttons(raw_buttons, floors) -> tuple:
+    """Converte e valida o mapa de registradores de um elevador.
+    """
+    if raw_buttons is None:
+        return default_buttons(floors)
+
+    buttons = tuple(sorted((ButtonConfig(**raw) for raw in raw_buttons), key=lambda button: button.offset))
+    codes = [floor.code for floor in floors]
+
+    if [button.offset for button in buttons] != list(range(len(buttons))):
+        raise ValueError("Os registradores dos botões devem ser contíguos a partir do deslocamento 0!")
+
+    for button in buttons:
+        if button.kind not in BUTTON_KINDS:
+            raise ValueError(f"Tipo de botão desconhecido: {button.kind}!")
+        if button.kind != EMERGENCY and button.floor not in codes:
+            raise ValueError(f"Botão no deslocamento {button.offset} aponta para andar inexistente: {button.floor}!")
+
+    if len([button for button in buttons if button.kind == EMERGENCY]) > 1:
+        raise ValueError("Cada elevador deve ter no máximo um botão de emergência!")
+
+    return buttons
+
+
+def _parse_elevator(number, raw, floors) -> ElevatorConfig:
+    """Converte e valida a configuração de um elevador.
+    """
+    outputs = {out["tag"]: out["gpio"] for out in raw["outputs"]}
+    inputs = {inp["tag"]: inp["gpio"] for inp in raw["inputs"]}
+
+    for tag in ("DIR1", "DIR2", "POTM"):
+        if tag not in outputs:
+            raise ValueError(f"Elevador {number}: saída {tag} não configurada!")
+
+    missing = [floor.sensor_tag for floor in floors if floor.sensor_tag not in inputs]
+    if missing:
+        raise ValueError(f"Elevador {number}: sensores não configurados: {', '.join(missing)}!")
+
+    buttons = _parse_buttons(raw.get("registers"), floors)
+    register_base = raw.get("register_base", 0xA0 * (number - 1))
+    bus = raw.get("bus", 0)
+
+    if register_base < 0 or register_base + len(buttons) - 1 > 0xFF:
+        raise ValueError(f"Elevador {number}: registradores fora do intervalo 0x00-0xFF!")
+
+    return ElevatorConfig(number=number,
+                          engine_id=raw.get("engine_id", number - 1),
+                          dir_1=outputs["DIR1"],
+                          dir_2=outputs["DIR2"],
+                          potm=outputs["POTM"],
+                          sensors=tuple(inputs[floor.sensor_tag] for floor in floors),
+                          register_base=register_base,
+                          buttons=buttons,
+                          bus=bus)
+
+
+def _validate(config) -> None:
+    """Valida restrições que envolvem mais de um elevador.
+    """
+    pins = [pin for elevator in config.elevators for pin in elevator.output_pins + elevator.sensors]
+    repeated = sorted({pin for pin in pins if pins.count(pin) > 1})
+    if repeated:
+        raise ValueError(f"GPIOs usadas mais de uma vez: {repeated}!")
+
+    ports = [bus.port for bus in config.buses]
+    if len(set(ports)) != len(ports):
+        raise ValueError("Barramentos diferentes configurados na mesma porta serial!")
+
+    for bus_idx in range(len(config.buses)):
+        elevators = [elevator for elevator in config.elevators if elevator.bus == bus_idx]
+
+        registers = [addr for elevator in elevators for addr in elevator.btn_addresses]
+        if len(set(registers)) != len(registers):
+            raise ValueError(f"Os registradores de botões de elevadores do barramento {bus_idx} se sobrepõem!")
+
+        engine_ids = [elevator.engine_id for elevator in elevators]
+        if len(set(engine_ids)) != len(engine_ids):
+            raise ValueError(f"IDs de motor repetidos entre os elevadores do barramento {bus_idx}!")
+
+    for elevator in config.elevators:
+        if not 0 <= elevator.bus < len(config.buses):
+            raise ValueError(f"Elevador {elevator.number}: barramento {elevator.bus} não configurado!")
+
+
+def parse_config(raw) -> SystemConfig:
+    """Converte o conteúdo do arquivo de configuração em objetos imutáveis e validados.
+
+    :param raw: Conteúdo do arquivo de configuração
+    :type raw: dict
+    :return: Configuração do sistema
+    :rtype: class:`SystemConfig`
+    :raises ValueError: Se a configuração for inválida
+    """
+    floors = _parse_floors(raw.get("floors", DEFAULT_FLOORS))
+
+    profile = raw.get("profile", PROFILE_FULL)
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil de execução desconhecido: {profile} (use {', '.join(PROFILES)})!")
+
+    elevator_keys = sorted((key for key in raw if key.startswith("elevador_")), key=lambda key: int(key.split("_")[1]))
+    if not elevator_keys:
+        raise ValueError("Nenhum elevador configurado!")
+
+    numbers = [int(key.split("_")[1]) for key in elevator_keys]
+    if numbers != list(range(1, len(numbers) + 1)):
+        raise ValueError("Os elevadores devem ser numerados em sequência a partir de 1!")
+
+    # Aceita um único barramento em "modbus" ou vários em "buses"
+    raw_buses = raw.get("buses", [raw.get("modbus", {})])
+    if not raw_buses:
+        raise ValueError("Nenhum barramento Modbus configurado!")
+
+    buses = []
+    for raw_bus in raw_buses:
+        raw_bus = dict(raw_bus)
+        if "student_id" in raw_bus:
+            raw_bus["student_id"] = tuple(raw_bus["student_id"])
+        buses.append(ModbusConfig(**raw_bus))
+
+    raw_group = dict(raw.get("group", {}))
+    if "peers" in raw_group:
+        raw_group["peers"] = tuple(raw_group["peers"])
+
+    config = SystemConfig(floors=floors,
+                          elevators=tuple(_parse_elevator(number, raw[key], floors)
+                                          for number, key in zip(numbers, elevator_keys)),
+                          door=DoorConfig(**raw.get("door", {})),
+                          timing=TimingConfig(**raw.get("timing", {})),
+                          control=ControlConfig(**raw.get("control", {})),
+                          engine=EngineConfig(**raw.get("engine", {})),
+                          parking=ParkingConfig(**raw.get("parking", {})),
+                          buses=tuple(buses),
+                          api=ApiConfig(**raw.get("api", {})),
+                          profiler=ProfilerConfig(**raw.get("profiler", {})),
+                          screen=ScreenConfig(**raw.get("screen", {})),
+                          calls=CallConfig(**raw.get("calls", {})),
+                          watchdog=WatchdogConfig(**raw.get("watchdog", {})),
+                          group=GroupConfig(**raw_group),
+                          profile=profile)
+    _validate(config)
+
+    return config
+
+
+def load_config(path=CONFIG_PATH, profile=None) -> SystemConfig:
+    """Carrega e valida o arquivo de configuração do sistema.
+
+    :param path: Caminho do arquivo de configuração
+    :type path: str
+    :param profile: Perfil de execução no lugar do definido no arquivo, opcional
+    :type profile: str
+    :return: Configuração do sistema
+    :rtype: class:`SystemConfig`
+    :raises ValueError: Se a configuração for inválida
+    """
+    with open(path, "r") as f:
+        raw = json.load(f)
+
+    if profile is not None:
+        raw["profile"] = profile
+    return parse_config(raw)
@@ -0,0 +1,411 @@
+"""Benchmark de despacho: roda o sistema completo contra o prédio simulado em tempo acelerado,
+com passageiros gerados por :class:`sim.traffic.TrafficGenerator`, e mede os indicadores de desempenho.
+
+Uso::
+
+    python3 -m sim.benchmark --pattern up_peak --intensity 120 --duration 1800 --speed 10
+"""
+import time
+import argparse
+import statistics
+import threading
+import dataclasses
+
+from setup.config import load_config, CAR, HALL_DOWN, HALL_UP
+from sim import gpio as sim_gpio
+from sim.building import Building
+from sim.esp32 import SimulatedESP32
+from sim.traffic import TrafficGenerator, PATTERNS, POISSON
+
+
+def scale_config(config, speed) -> object:
+    """Divide os tempos da configuração por `speed`, para rodar o sistema em tempo acelerado
+    junto com a física do :class:`sim.building.Building`.
+
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :param speed: Fator de aceleração do tempo
+    :type speed: float
+    :return: Configuração com os tempos acelerados, o servidor de monitoramento desligado e o
+        histograma de demanda só em memória
+    :rtype: class:`setup.config.SystemConfig`
+    """
+    timing = config.timing
+    control = config.control
+    door = config.door
+    parking = config.parking
+
+    # O prazo das transações, o watchdog e os prazos da coordenação entre grupos não são acelerados:
+    # eles dependem do tempo real das threads, da porta e da rede, e não da física simulada. O prazo
+    # das transações do laço de controle é acelerado, porque limita o quanto o elevador anda sem
+    # leitura do encoder
+    return dataclasses.replace(
+        config,
+        timing=dataclasses.replace(timing,
+                                   poll_interval=timing.poll_interval / speed,
+                                   control_period=timing.control_period / speed,
+                                   bus_turnaround=timing.bus_turnaround / speed,
+                                   display_interval=timing.display_interval / speed,
+                                   temperature_interval=timing.temperature_interval / speed,
+                                   sensor_bouncetime=max(int(timing.sensor_bouncetime / speed), 1),
+                                   calibration_timeout=max(int(timing.calibration_timeout / speed), 1),
+                                   bus_report_interval=timing.bus_report_interval / speed,
+                                   shadow_max_age=timing.shadow_max_age / speed,
+                                   position_interval=timing.position_interval / speed,
+                                   control_deadline=timing.control_deadline / speed),
+        # O PID usa o período de controle acelerado: os ganhos derivativos (divididos pelo período) e
+        # integrais (multiplicados por ele) são compensados para manter o mesmo sinal por período
+        control=dataclasses.replace(control, kd=control.kd / speed, kd_fast=control.kd_fast / speed,
+                                    kd_down=control.kd_down / speed, kd_fast_down=control.kd_fast_down / speed,
+                                    ki=control.ki * speed, ki_down=control.ki_down * speed),
+        door=dataclasses.replace(door, **{name: value / speed for name, value in dataclasses.asdict(door).items()}),
+        engine=dataclasses.replace(config.engine, slew_rate=config.engine.slew_rate * speed,
+                                   reversal_dead_time=config.engine.reversal_dead_time / speed,
+                                   mirror_heartbeat=config.engine.mirror_heartbeat / speed),
+        parking=dataclasses.replace(parking, path="", idle_delay=parking.idle_delay / speed,
+                                    save_interval=parking.save_interval / speed),
+        screen=dataclasses.replace(config.screen, poll_interval=config.screen.poll_interval / speed),
+        calls=dataclasses.replace(config.calls, wait_sla=config.calls.wait_sla / speed),
+        group=dataclasses.replace(config.group, floor_time=config.group.floor_time / speed),
+        api=dataclasses.replace(config.api, enabled=False))
+
+
+class SimulatedSystem():
+    """Sistema completo (controlador, elevadores, portas e barramentos) rodando sobre o prédio simulado.
+    """
+    def __init__(self, config, speed=10.0, demand_path=None, **building_args) -> None:
+        """Monta o prédio simulado, instala a GPIO simulada e cria o controlador dos elevadores.
+
+        :param config: Configuração do sistema (com os tempos reais)
+        :type config: class:`setup.config.SystemConfig`
+        :param speed: Fator de aceleração do tempo, default é 10
+        :type speed: float
+        :param demand_path: Arquivo do histograma de demanda, default é manter só em memória
+        :type demand_path: str
+        :param building_args: Parâmetros físicos repassados para :class:`sim.building.Building`
+        """
+        self.speed = speed
+        self.config = scale_config(config, speed)
+        if demand_path:
+            self.config = dataclasses.replace(self.config,
+                                              parking=dataclasses.replace(self.config.parking, path=demand_path))
+        self.building = Building(self.config, speed=speed, **building_args)
+        sim_gpio.install(self.building)
+
+        # Importado só depois da GPIO simulada estar instalada
+        from gpio.elevator_controller import ElevatorController
+
+        self.esp32s = [SimulatedESP32(self.building, bus=bus_idx) for bus_idx in range(len(self.config.buses))]
+        self.controller = ElevatorController(config=self.config, transports=self.esp32s)
+        self.exit_event = threading.Event()
+        self._requests_thread = None
+
+    def now(self) -> float:
+        """Tempo simulado atual, em segundos.
+        """
+        with self.building.lock:
+            return self.building.sim_time
+
+    def sleep(self, seconds) -> None:
+        """Espera um intervalo de tempo simulado.
+
+        :param seconds: Intervalo em segundos de tempo simulado
+        :type seconds: float
+        """
+        time.sleep(seconds / self.speed)
+
+    def press(self, elevator_idx, kind, floor) -> bool:
+        """Pressiona um botão no painel de um elevador da ESP32 simulada.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        :param kind: Tipo do botão
+        :type kind: str
+        :param floor: Código do andar do botão
+        :type floor: str
+        :return: Verdadeiro se o botão existe no painel do elevador
+        :rtype: bool
+        """
+        btn_index = self.controller.buttons_idx[elevator_idx].get((kind, floor))
+        if btn_index is None:
+            return False
+
+        esp32 = self.esp32s[self.config.elevators[elevator_idx].bus]
+        esp32.press(self.controller.btn_addresses[elevator_idx][btn_index])
+        return True
+
+    def release(self, elevator_idx, kind, floor) -> bool:
+        """Solta um botão no painel de um elevador da ESP32 simulada.
+
+        :param elevator_idx: Índice do elevador
+        :type elevator_idx: int
+        :param kind: Tipo do botão
+        :type kind: str
+        :param floor: Código do andar do botão
+        :type floor: str
+        :return: Verdadeiro se o botão existe no painel do elevador
+        :rtype: bool
+        """
+        btn_index = self.controller.buttons_idx[elevator_idx].get((kind, floor))
+        if btn_index is None:
+            return False
+
+        esp32 = self.esp32s[self.config.elevators[elevator_idx].bus]
+        esp32.release(self.controller.btn_addresses[elevator_idx][btn_index])
+        return True
+
+    def is_idle(self) -> bool:
+        """Indica se todos os elevadores estão parados, de porta fechada e sem requisições.
+        """
+        return all(elevator.state == "Parado" and elevator.door.is_closed() and self.controller.is_queue_empty(idx)
+                   for idx, elevator in enumerate(self.controller.elevators))
+
+    def wait_idle(self, timeout) -> bool:
+        """Espera todos os elevadores ficarem ociosos.
+
+        :param timeout: Tempo máximo de espera em segundos de tempo simulado
+        :type timeout: float
+        :return: Verdadeiro se os elevadores ficaram ociosos dentro do tempo
+        :rtype: bool
+        """
+        deadline = self.now() + timeout
+        while self.now() < deadline:
+            if self.is_idle():
+                return True
+            self.sleep(0.5)
+        return False
+
+    def start(self, calibration_timeout=600.0) -> None:
+        """Inicia a física e o controlador e espera a calibração dos elevadores terminar.
+
+        :param calibration_timeout: Tempo máximo da calibração em segundos de tempo simulado
+        :type calibration_timeout: float
+        :raises TimeoutError: Se a calibração não terminar dentro do tempo
+        """
+        self.building.start()
+        self._requests_thread = threading.Thread(target=self.controller.handle_requests, args=(self.exit_event,),
+                                                 daemon=True)
+        self._requests_thread.start()
+
+        deadline = self.now() + calibration_timeout
+        while self.now() < deadline:
+            calibrated = all(-1 not in elevator.floors_positions.values() for elevator in self.controller.elevators)
+            if calibrated and self.wait_idle(timeout=deadline - self.now()):
+                return
+            self.sleep(0.5)
+
+        raise TimeoutError("A calibração dos elevadores simulados não terminou!")
+
+    def shutdown(self, drain_timeout=300.0) -> None:
+        """Espera os elevadores terminarem as viagens pendentes e finaliza o sistema.
+
+        :param drain_timeout: Tempo máximo de espera pelas viagens em segundos de tempo simulado
+        :type drain_timeout: float
+        """
+        self.wait_idle(timeout=drain_timeout)
+        self.exit_event.set()
+        if self._requests_thread is not None:
+            self._requests_thread.join()
+        self.controller.shutdown_elevators()
+        self.building.stop()
+
+
+class Benchmark():
+    """Mede os indicadores de desempenho do despacho para um padrão de tráfego.
+    """
+    def __init__(self, system, traffic, duration) -> None:
+        """Inicializa um novo benchmark.
+
+        :param system: Sistema simulado já iniciado
+        :type system: class:`SimulatedSystem`
+        :param traffic: Gerador de passageiros
+        :type traffic: class:`sim.traffic.TrafficGenerator`
+        :param duration: Duração do tráfego em segundos de tempo simulado
+        :type duration: float
+        """
+        self.system = system
+        self.traffic = traffic
+        self.duration = duration
+
+        self.passengers = []
+        self.waiting = {code: [] for code in system.config.floor_codes}
+        self.riding = [[] for _ in system.controller.elevators]
+        self.stops = 0
+
+        self._floor_codes = {floor.name: floor.code for floor in system.config.floors}
+        self._lock = threading.Lock()
+        self._start = None
+
+        for elevator in system.controller.elevators:
+            elevator.door.add_listener(self._handle_door_event)
+
+    def _handle_door_event(self, elevator_num, event) -> None:
+        """Embarca e desembarca passageiros sempre que uma porta abre (ou tem o tempo estendido).
+
+        :param elevator_num: Número do elevador
+        :type elevator_num: int
+        :param event: Evento da porta
+        :type event: str
+        """
+        if self._start is None:
+            return
+
+        elevator_idx = elevator_num - 1
+        elevator = self.system.controller.elevators[elevator_idx]
+
+        if event == "Abrindo":
+            self.stops += 1
+        if event not in ("Aberta", "Estendida"):
+            return
+
+        floor = self._floor_codes.get(elevator.current_floor)
+        if floor is None:
+            return
+        now = self.system.now() - self._start
+
+        with self._lock:
+            for passenger in [p for p in self.riding[elevator_idx] if p.destination == floor]:
+                passenger.alighting = now
+                self.riding[elevator_idx].remove(passenger)
+
+            boarding, self.waiting[floor] = self.waiting[floor], []
+            for passenger in boarding:
+                passenger.boarding = now
+                passenger.car = elevator_num
+                self.riding[elevator_idx].append(passenger)
+
+        for destination in {passenger.destination for passenger in boarding}:
+            self.system.press(elevator_idx, CAR, destination)
+
+    def _call(self, passenger) -> None:
+        """Coloca o passageiro na fila do andar e pressiona o botão externo no sentido da viagem.
+        """
+        with self._lock:
+            self.waiting[passenger.origin].append(passenger)
+
+        kind = HALL_UP if passenger.direction == "up" else HALL_DOWN
+        elevators = len(self.system.controller.elevators)
+        self.system.press(passenger.id % elevators, kind, passenger.origin)
+
+    def run(self, tick=0.5) -> dict:
+        """Gera o tráfego durante `duration`, espera os passageiros restantes e calcula os indicadores.
+
+        :param tick: Intervalo entre gerações de chegadas em segundos de tempo simulado, default é 0.5
+        :type tick: float
+        :return: Indicadores de desempenho
+        :rtype: dict
+        """
+        energy_start = sum(car.energy for car in self.system.building.cars)
+        self._start = self.system.now()
+
+        while self.system.now() - self._start < self.duration:
+            for passenger in self.traffic.arrivals_until(self.system.now() - self._start):
+                self.passengers.append(passenger)
+                self._call(passenger)
+            self.system.sleep(tick)
+
+        self.system.wait_idle(timeout=self.duration)
+        elapsed = self.system.now() - self._start
+        energy = sum(car.energy for car in self.system.building.cars) - energy_start
+
+        return self.report(elapsed, energy)
+
+    def report(self, elapsed, energy) -> dict:
+        """Calcula os indicadores de desempenho.
+
+        :param elapsed: Tempo simulado total da medição, em segundos
+        :type elapsed: float
+        :param energy: Integral do PWM dos motores no período (% x s)
+        :type energy: float
+        :return: Indicadores de desempenho
+        :rtype: dict
+        """
+        waits = [p.wait_time for p in self.passengers if p.wait_time is not None]
+        # O registro de chamadas mede em tempo real; converte para o tempo simulado
+        call_waits = self.system.controller.calls.wait_stats()
+        call_waits.update({key: call_waits[key] * self.system.speed for key in ("mean", "p95", "max")})
+        rides = [p.ride_time for p in self.passengers if p.ride_time is not None]
+        served = len(rides)
+
+        return {"pattern": self.traffic.pattern,
+                "intensity": self.traffic.intensity,
+                "passengers": len(self.passengers),
+                "served": served,
+                "avg_wait": statistics.mean(waits) if waits else None,
+                "p95_wait": _percentile(waits, 95),
+                "avg_ride": statistics.mean(rides) if rides else None,
+                "p95_ride": _percentile(rides, 95),
+                "trips": self.stops,
+                "energy": energy,
+                "call_waits": call_waits,
+                "served_per_hour": served / (elapsed / 3600) if elapsed > 0 else 0.0}
+
+
+def _percentile(values, percent) -> float:
+    """Percentil `percent` dos valores pelo método do vizinho mais próximo.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))]
+
+
+def print_report(report) -> None:
+    """Mostra os indicadores de desempenho de um benchmark.
+
+    :param report: Indicadores retornados por :meth:`Benchmark.run`
+    :type report: dict
+    """
+    def fmt(value, unit="s"):
+        return "N/A" if value is None else f"{value:.1f} {unit}"
+
+    print(f"Padrão: {report['pattern']} ({report['intensity']:.0f} passageiros/h)")
+    print(f"Passageiros: {report['served']} atendidos de {report['passengers']}")
+    print(f"Espera: média {fmt(report['avg_wait'])}, p95 {fmt(report['p95_wait'])}")
+    print(f"Viagem: média {fmt(report['avg_ride'])}, p95 {fmt(report['p95_ride'])}")
+    print(f"Viagens dos elevadores: {report['trips']}")
+    print(f"Energia (integral do PWM): {report['energy']:.0f} %.s")
+    print(f"Chamadas atendidas por hora: {report['served_per_hour']:.1f}")
+    call_waits = report["call_waits"]
+    print(f"Espera das chamadas no registro: média {fmt(call_waits['mean'])}, p95 {fmt(call_waits['p95'])}, "
+          f"máxima {fmt(call_waits['max'])}, {call_waits['overdue']} de {call_waits['calls']} acima do limite")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do despacho dos elevadores em um prédio simulado.")
+    parser.add_argument("--pattern", choices=PATTERNS, default=POISSON, help="Padrão de tráfego")
+    parser.add_argument("--intensity", type=float, default=60.0, help="Chegadas de passageiros por hora")
+    parser.add_argument("--duration", type=float, default=1800.0, help="Duração do tráfego em segundos simulados")
+    parser.add_argument("--speed", type=float, default=10.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do gerador de tráfego")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    parser.add_argument("--no-parking", action="store_true", help="Desliga o estacionamento dos elevadores ociosos")
+    parser.add_argument("--demand-file", default=None,
+                        help="Histograma de demanda carregado e gravado entre execuções (default: só em memória)")
+    parser.add_argument("--capture", default=None,
+                        help="Grava o tráfego da UART para o sim.replay (com vários barramentos, um arquivo por barramento)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.no_parking:
+        config = dataclasses.replace(config, parking=dataclasses.replace(config.parking, enabled=False))
+    if args.capture:
+        paths = [args.capture] if len(config.buses) == 1 else [f"{args.capture}.{idx}" for idx in range(len(config.buses))]
+        config = dataclasses.replace(config, buses=tuple(dataclasses.replace(bus, capture_path=path)
+                                                         for bus, path in zip(config.buses, paths)))
+    system = SimulatedSystem(config, speed=args.speed, demand_path=args.demand_file)
+    traffic = TrafficGenerator(config.floor_codes, pattern=args.pattern, intensity=args.intensity, seed=args.seed)
+
+    print("Calibrando elevadores simulados ...")
+    system.start()
+
+    try:
+        report = Benchmark(system, traffic, duration=args.duration).run()
+    finally:
+        system.shutdown()
+
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
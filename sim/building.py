@@ -0,0 +1,247 @@
+import time
+import math
+import threading
+
+
+class SimulatedCar():
+    """Modelo físico simplificado de um elevador: motor de primeira ordem acionado pelos pinos
+    de direção e pelo PWM, encoder de posição e sensores de andar.
+    """
+    def __init__(self, elevator_config, floors_positions, max_speed, sensor_half_width, time_constant) -> None:
+        """Inicializa um novo elevador simulado, parado na posição 0 (abaixo do térreo).
+
+        :param elevator_config: Configuração do elevador
+        :type elevator_config: class:`setup.config.ElevatorConfig`
+        :param floors_positions: Posição (em pulsos do encoder) do centro de cada andar
+        :type floors_positions: list[int]
+        :param max_speed: Velocidade com PWM em 100%, em pulsos por segundo
+        :type max_speed: float
+        :param sensor_half_width: Meia largura da faixa em que o sensor de andar fica ativo, em pulsos
+        :type sensor_half_width: float
+        :param time_constant: Constante de tempo do motor, em segundos
+        :type time_constant: float
+        """
+        self.config = elevator_config
+        self.floors_positions = floors_positions
+        self.max_speed = max_speed
+        self.sensor_half_width = sensor_half_width
+        self.time_constant = time_constant
+
+        self.position = 0.0
+        self.velocity = 0.0
+        self.dir_1 = False
+        self.dir_2 = False
+        self.duty = 0.0
+
+        # Integral do PWM aplicado (% x s), usada como aproximação da energia consumida
+        self.energy = 0.0
+
+    def is_braking(self) -> bool:
+        """Indica se o motor está freado (ambos os pinos de direção em nível alto).
+        """
+        return self.dir_1 and self.dir_2
+
+    def target_velocity(self) -> float:
+        """Velocidade de regime para o acionamento atual do motor.
+        """
+        if self.dir_1 and not self.dir_2:
+            return self.duty / 100 * self.max_speed
+        if self.dir_2 and not self.dir_1:
+            return -self.duty / 100 * self.max_speed
+        return 0.0
+
+    def sensors(self, position=None) -> list:
+        """Estado dos sensores de andar em uma posição.
+
+        :param position: Posição do elevador, default é a posição atual
+        :type position: float
+        :return: Estado (ativo ou não) do sensor de cada andar
+        :rtype: list[bool]
+        """
+        position = self.position if position is None else position
+        return [abs(position - floor_position) <= self.sensor_half_width for floor_position in self.floors_positions]
+
+    def step(self, dt) -> list:
+        """Avança a simulação do elevador e retorna as bordas geradas nos sensores.
+
+        :param dt: Intervalo de tempo simulado, em segundos
+        :type dt: float
+        :return: Bordas dos sensores como `(gpio, subida)`, na ordem em que ocorreram
+        :rtype: list[tuple(int, bool)]
+        """
+        old_position = self.position
+
+        if self.is_braking():
+            self.velocity = 0.0
+        else:
+            alpha = 1 - math.exp(-dt / self.time_constant)
+            self.velocity += (self.target_velocity() - self.velocity) * alpha
+
+        self.position += self.velocity * dt
+        self.energy += self.duty * dt if (self.dir_1 != self.dir_2) else 0.0
+
+        # Bordas de cada sensor cruzado no intervalo, mesmo que o elevador passe por ele em um único passo
+        edges = []
+        low, high = sorted((old_position, self.position))
+        for gpio, floor_position in sorted(zip(self.config.sensors, self.floors_positions),
+                                           key=lambda item: item[1], reverse=self.position < old_position):
+            start, end = floor_position - self.sensor_half_width, floor_position + self.sensor_half_width
+            was_active = start <= old_position <= end
+            is_active = start <= self.position <= end
+
+            if was_active and not is_active:
+                edges.append((gpio, False))
+            elif is_active and not was_active:
+                edges.append((gpio, True))
+            elif not was_active and low < start and end < high:
+                edges += [(gpio, True), (gpio, False)]
+
+        return edges
+
+
+class Building():
+    """Prédio simulado: elevadores, pinos da GPIO e física executada em tempo acelerado.
+
+    Toda a temporização da simulação é feita em tempo real (de parede); a aceleração é obtida
+    multiplicando o tempo simulado por `speed` na física e dividindo os tempos da configuração
+    pelo mesmo fator (ver :func:`sim.benchmark.scale_config`).
+    """
+    def __init__(self, config, speed=1.0, first_floor=1000, floor_spacing=5000, max_speed=8000,
+                 sensor_half_width=200, time_constant=0.15, step=0.002) -> None:
+        """Inicializa o prédio simulado a partir da configuração do sistema.
+
+        :param config: Configuração do sistema
+        :type config: class:`setup.config.SystemConfig`
+        :param speed: Fator de aceleração do tempo, default é 1.0
+        :type speed: float
+        :param first_floor: Posição do térreo em pulsos do encoder, default é 1000
+        :type first_floor: int
+        :param floor_spacing: Distância entre andares em pulsos do encoder, default é 5000
+        :type floor_spacing: int
+        :param max_speed: Velocidade com PWM em 100%, em pulsos por segundo, default é 8000
+        :type max_speed: float
+        :param sensor_half_width: Meia largura da faixa ativa dos sensores, em pulsos, default é 200
+        :type sensor_half_width: float
+        :param time_constant: Constante de tempo dos motores, em segundos, default é 0.15
+        :type time_constant: float
+        :param step: Passo da física em segundos de tempo real, default é 0.002
+        :type step: float
+        """
+        self.config = config
+        self.speed = speed
+        self.step_interval = step
+
+        floors_positions = [first_floor + idx * floor_spacing for idx in range(len(config.floors))]
+        self.cars = [SimulatedCar(elevator_config, floors_positions, max_speed, sensor_half_width, time_constant)
+                     for elevator_config in config.elevators]
+
+        # Papel de cada pino de saída: (elevador, "dir_1" | "dir_2" | "potm")
+        self.outputs = {}
+        for car in self.cars:
+            self.outputs[car.config.dir_1] = (car, "dir_1")
+            self.outputs[car.config.dir_2] = (car, "dir_2")
+            self.outputs[car.config.potm] = (car, "potm")
+
+        self.inputs = {gpio: (car, floor_idx) for car in self.cars for floor_idx, gpio in enumerate(car.config.sensors)}
+
+        self.edge_listeners = []
+        self.sim_time = 0.0
+        self.lock = threading.RLock()
+
+        self._running = False
+        self._thread = None
+
+    def car_by_engine(self, bus, engine_id) -> SimulatedCar:
+        """Busca o elevador simulado pelo barramento e ID do motor.
+
+        :param bus: Índice do barramento
+        :type bus: int
+        :param engine_id: ID do motor no barramento
+        :type engine_id: int
+        :return: Elevador simulado
+        :rtype: class:`SimulatedCar`
+        :raises KeyError: Se não houver motor com esse ID
+        """
+        for car in self.cars:
+            if car.config.bus == bus and car.config.engine_id == engine_id:
+                return car
+        raise KeyError(engine_id)
+
+    def input(self, gpio) -> int:
+        """Lê o nível de um pino de entrada (sensor de andar).
+
+        :param gpio: Número do pino
+        :type gpio: int
+        :return: 1 se o sensor estiver ativo, 0 caso contrário
+        :rtype: int
+        """
+        with self.lock:
+            if gpio not in self.inputs:
+                return 0
+            car, floor_idx = self.inputs[gpio]
+            return int(car.sensors()[floor_idx])
+
+    def output(self, gpio, value) -> None:
+        """Escreve o nível de um pino de direção de um motor.
+
+        :param gpio: Número do pino
+        :type gpio: int
+        :param value: Nível lógico
+        :type value: int
+        """
+        with self.lock:
+            if gpio in self.outputs:
+                car, role = self.outputs[gpio]
+                if role != "potm":
+                    setattr(car, role, bool(value))
+
+    def set_duty_cycle(self, gpio, duty) -> None:
+        """Define o ciclo de trabalho do PWM de um motor.
+
+        :param gpio: Número do pino do PWM
+        :type gpio: int
+        :param duty: Ciclo de trabalho de 0 a 100
+        :type duty: float
+        """
+        with self.lock:
+            if gpio in self.outputs:
+                self.outputs[gpio][0].duty = float(duty)
+
+    def step(self, dt_real) -> None:
+        """Avança a física do prédio e repassa as bordas dos sensores aos ouvintes.
+
+        :param dt_real: Intervalo de tempo real desde o último passo, em segundos
+        :type dt_real: float
+        """
+        dt = dt_real * self.speed
+        with self.lock:
+            self.sim_time += dt
+            edges = [edge for car in self.cars for edge in car.step(dt)]
+
+        for gpio, rising in edges:
+            for listener in self.edge_listeners:
+                listener(gpio, rising)
+
+    def _run(self) -> None:
+        """Loop da thread de física.
+        """
+        last = time.monotonic()
+        while self._running:
+            time.sleep(self.step_interval)
+            now = time.monotonic()
+            self.step(now - last)
+            last = now
+
+    def start(self) -> None:
+        """Inicia a thread de física.
+        """
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="sim-physics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Finaliza a thread de física.
+        """
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
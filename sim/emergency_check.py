@@ -0,0 +1,157 @@
+"""Verificação da parada de emergência: aciona a emergência de elevadores em movimento, com os dois
+elevadores disputando o barramento, e confere se as latências medidas ficam dentro do pior caso
+calculado a partir da configuração.
+
+O pior caso considera que a fila de controle do barramento é atendida em ordem de chegada e que
+cada laço de movimento tem no máximo uma transação pendente:
+
+* uma leitura de registradores espera a transação em andamento e uma transação de cada elevador
+  do barramento: ``(elevadores + 2) * transação``;
+* um ciclo de leitura dos botões lê os registradores e espera `poll_interval` para cada elevador;
+* o botão pode ser pressionado logo depois da leitura do seu registrador, então a detecção leva
+  até dois ciclos;
+* o freio é acionado pela GPIO logo após a detecção, sem passar pelo barramento;
+* o comando de emergência passa na frente da fila e espera só a transação em andamento.
+
+Uso::
+
+    python3 -m sim.emergency_check --trials 10 --speed 5
+"""
+import sys
+import time
+import random
+import argparse
+
+from setup.config import load_config, CAR, EMERGENCY
+from sim.benchmark import SimulatedSystem
+
+# Folga (em segundos reais) para o escalonamento das threads do Python e o processamento das mensagens
+SCHEDULING_MARGIN = 0.005
+
+
+def latency_bounds(config) -> dict:
+    """Calcula o pior caso das latências da emergência para a configuração (já acelerada) do sistema.
+
+    :param config: Configuração do sistema em execução
+    :type config: class:`setup.config.SystemConfig`
+    :return: Limites, em segundos, de pressionamento até o freio, detecção até o freio e detecção até o comando
+    :rtype: dict
+    """
+    timing = config.timing
+    transaction = timing.bus_turnaround + SCHEDULING_MARGIN
+    cars_per_bus = max(sum(1 for elevator in config.elevators if elevator.bus == bus)
+                       for bus in range(len(config.buses)))
+
+    register_read = (cars_per_bus + 2) * transaction
+    cycle = len(config.elevators) * (register_read + timing.poll_interval)
+
+    return {"press_to_brake": 2 * cycle + SCHEDULING_MARGIN,
+            "brake": SCHEDULING_MARGIN,
+            "command": 2 * transaction + SCHEDULING_MARGIN}
+
+
+def _wait_for(condition, timeout, interval=0.0005) -> float:
+    """Espera `condition` ficar verdadeira, retornando o instante em que isso aconteceu ou None.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return time.monotonic()
+        time.sleep(interval)
+    return None
+
+
+def run_trial(system, rng) -> dict:
+    """Põe os elevadores em movimento e aciona a emergência de um deles em um instante aleatório.
+
+    :param system: Sistema simulado já iniciado
+    :type system: class:`sim.benchmark.SimulatedSystem`
+    :param rng: Gerador aleatório
+    :type rng: class:`random.Random`
+    :return: Elevador, latências medidas e se o freio se manteve travado
+    :rtype: dict
+    """
+    controller = system.controller
+    codes = system.config.floor_codes
+
+    # Manda cada elevador para o andar mais distante de onde está
+    for idx, elevator in enumerate(controller.elevators):
+        current = next(floor.code for floor in system.config.floors if floor.name == elevator.current_floor)
+        target = codes[-1] if codes.index(current) < len(codes) / 2 else codes[0]
+        system.press(idx, CAR, target)
+
+    car_idx = rng.randrange(len(controller.elevators))
+    elevator = controller.elevators[car_idx]
+    car = system.building.cars[car_idx]
+
+    _wait_for(lambda: elevator.state in ("Subindo", "Descendo"), timeout=10.0)
+    system.sleep(rng.uniform(0.5, 3.0))
+
+    recorded = len(controller.emergencies)
+    system.press(car_idx, EMERGENCY, None)
+    pressed_at = time.monotonic()
+
+    braked_at = _wait_for(car.is_braking, timeout=5.0)
+    _wait_for(lambda: len(controller.emergencies) > recorded, timeout=5.0)
+    record = controller.emergencies[-1] if len(controller.emergencies) > recorded else None
+
+    # O freio deve continuar travado mesmo com o laço de movimento e o despacho rodando
+    hold_until = time.monotonic() + 2.0 / system.speed
+    held = braked_at is not None
+    while held and time.monotonic() < hold_until:
+        held = car.is_braking()
+        time.sleep(0.001)
+
+    system.release(car_idx, EMERGENCY, None)
+    _wait_for(lambda: elevator.state == "Parado", timeout=5.0)
+    system.wait_idle(timeout=120.0)
+
+    return {"car": elevator.elevator_num,
+            "press_to_brake": None if braked_at is None else braked_at - pressed_at,
+            "brake": None if record is None else record["brake_latency"],
+            "command": None if record is None else record["command_latency"],
+            "held": held}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica o pior caso da latência da parada de emergência.")
+    parser.add_argument("--trials", type=int, default=10, help="Quantidade de emergências acionadas")
+    parser.add_argument("--speed", type=float, default=5.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--seed", type=int, default=None, help="Semente dos instantes das emergências")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    args = parser.parse_args()
+
+    system = SimulatedSystem(load_config(args.config), speed=args.speed)
+    bounds = latency_bounds(system.config)
+    rng = random.Random(args.seed)
+
+    print("Calibrando elevadores simulados ...")
+    system.start()
+
+    try:
+        trials = [run_trial(system, rng) for _ in range(args.trials)]
+    finally:
+        system.shutdown()
+
+    failures = 0
+    print(f"{'Elevador':>8} {'Botão-freio':>12} {'Detecção-freio':>15} {'Detecção-comando':>17} {'Freio travado':>14}")
+    for trial in trials:
+        values = [trial[name] for name in bounds]
+        ok = trial["held"] and all(value is not None and value <= bounds[name]
+                                   for name, value in zip(bounds, values))
+        failures += not ok
+        cells = ["N/A" if value is None else f"{value * 1000:.1f} ms" for value in values]
+        print(f"{trial['car']:>8} {cells[0]:>12} {cells[1]:>15} {cells[2]:>17} {'sim' if trial['held'] else 'não':>14}"
+              f"{'' if ok else '  <- fora do limite'}")
+
+    for name, bound in bounds.items():
+        worst = max((trial[name] for trial in trials if trial[name] is not None), default=None)
+        worst = "N/A" if worst is None else f"{worst * 1000:.1f} ms"
+        print(f"Pior caso {name}: medido {worst}, limite {bound * 1000:.1f} ms (tempo real, aceleração {args.speed:g}x)")
+
+    print("OK" if failures == 0 else f"FALHA: {failures} de {len(trials)} emergências fora do limite")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import time
+import struct
+import threading
+
+from uart.crc_utils import compute_crc
+
+
+class SimulatedESP32():
+    """ESP32 simulada: mapa de registradores dos botões, encoders dos motores e os valores
+    de PWM e temperatura recebidos pelo Modbus.
+
+    Também serve de transporte para o :class:`uart.ModbusController`, com a mesma interface de
+    :class:`uart.Uart`: cada mensagem enviada é respondida como a placa real responderia.
+    """
+    def __init__(self, building, bus=0) -> None:
+        """Inicializa uma nova ESP32 simulada.
+
+        :param building: Prédio simulado com os motores ligados a esta placa
+        :type building: class:`sim.building.Building`
+        :param bus: Índice do barramento da placa na configuração, default é 0
+        :type bus: int
+        """
+        self.building = building
+        self.bus = bus
+        self.registers = bytearray(256)
+        self.control_signals = {}
+        self.temperatures = {}
+
+        self._response = b''
+        self._lock = threading.Lock()
+
+        # Falhas injetadas: respostas perdidas e leitura travada até a porta ser reaberta
+        self._dropped_replies = 0
+        self._hang_duration = None
+        self._unhang = threading.Event()
+        self._unhang.set()
+        # Incrementada a cada reabertura: uma leitura iniciada antes dela termina sem dados
+        self._port_generation = 0
+
+    def drop_replies(self, count=1) -> None:
+        """Perde as próximas `count` respostas, como uma ESP32 que não respondeu a tempo.
+
+        :param count: Quantidade de respostas perdidas, default é 1
+        :type count: int
+        """
+        with self._lock:
+            self._dropped_replies += count
+
+    def hang(self, duration=None) -> None:
+        """Trava a próxima leitura até a porta ser reaberta ou, com `duration`, por `duration` segundos
+        mesmo que a porta seja reaberta (como um driver serial travado).
+
+        :param duration: Duração do travamento em segundos de tempo real, default é até a porta ser reaberta
+        :type duration: float
+        """
+        self._hang_duration = duration
+        self._unhang.clear()
+
+    def press(self, address) -> None:
+        """Pressiona o botão do registrador `address`.
+
+        :param address: Endereço do registrador do botão
+        :type address: int
+        """
+        self.registers[address] = 1
+
+    def release(self, address) -> None:
+        """Solta o botão do registrador `address` (ex.: desarma a emergência).
+
+        :param address: Endereço do registrador do botão
+        :type address: int
+        """
+        self.registers[address] = 0
+
+    def connect(self) -> None:
+        """Sem efeito: a placa simulada está sempre conectada.
+        """
+
+    def disconnect(self) -> None:
+        """Sem efeito: a placa simulada está sempre conectada.
+        """
+
+    def reset(self) -> None:
+        """Descarta a resposta pendente e libera uma leitura travada.
+        """
+        with self._lock:
+            self._response = b''
+        self._unhang.set()
+
+    def reopen(self) -> "SimulatedESP32":
+        """Reabre a porta da placa simulada: uma leitura travada iniciada antes da reabertura
+        termina sem dados, sem consumir as respostas das transações seguintes.
+
+        :return: A própria placa simulada
+        :rtype: class:`SimulatedESP32`
+        """
+        with self._lock:
+            self._port_generation += 1
+            self._response = b''
+        return self
+
+    def send_data(self, data) -> None:
+        """Recebe uma mensagem Modbus e prepara a resposta correspondente.
+
+        :param data: Mensagem Modbus
+        :type data: bytes
+        """
+        with self._lock:
+            self._response = self._handle(bytes(data))
+            if self._dropped_replies:
+                self._dropped_replies -= 1
+                self._response = b''
+
+    def receive_data(self, size) -> bytes:
+        """Retorna a resposta preparada para a última mensagem.
+
+        :param size: Tamanho dos dados a serem recebidos
+        :type size: int
+        :return: Dados recebidos
+        :rtype: bytes
+        """
+        generation = self._port_generation
+        if not self._unhang.is_set():
+            if self._hang_duration is None:
+                self._unhang.wait()
+            else:
+                time.sleep(self._hang_duration)
+                self._unhang.set()
+        with self._lock:
+            if generation != self._port_generation:
+                return b''
+            response, self._response = self._response[:size], self._response[size:]
+        return response
+
+    def _reply(self, payload) -> bytes:
+        """Monta uma resposta com o endereço do mestre (0x00) e o CRC.
+        """
+        message = b'\x00' + payload
+        return message + struct.pack('<H', compute_crc(message, len(message)))
+
+    def _handle(self, message) -> bytes:
+        """Interpreta uma mensagem Modbus e executa o comando na placa simulada.
+
+        :param message: Mensagem Modbus recebida
+        :type message: bytes
+        :return: Resposta da placa
+        :rtype: bytes
+        """
+        function_code, sub_code = message[1], message[2]
+
+        # Leitura de registradores: endereço inicial + quantidade
+        if function_code == 0x03:
+            quantity = message[3]
+            return self._reply(bytes([0x03]) + bytes(self.registers[sub_code:sub_code + quantity]))
+
+        # Escrita de registradores: endereço inicial + quantidade + valores
+        if function_code == 0x06:
+            quantity = message[3]
+            values = message[4:4 + quantity]
+            self.registers[sub_code:sub_code + quantity] = values
+            return self._reply(bytes([0x06]) + values)
+
+        # Leitura do encoder
+        if function_code == 0x23 and sub_code == 0xC1:
+            car = self.building.car_by_engine(self.bus, message[3])
+            with self.building.lock:
+                position = max(int(round(car.position)), 0)
+            return self._reply(bytes([0x23, 0xC1]) + struct.pack('<I', position))
+
+        # Sinal de controle (PWM) e temperatura
+        if function_code == 0x16 and sub_code == 0xC2:
+            self.control_signals[message[3]] = struct.unpack('<i', message[4:8])[0]
+            return self._reply(bytes([0x16, 0xC2]))
+
+        if function_code == 0x16 and sub_code == 0xD1:
+            self.temperatures[message[3]] = struct.unpack('<f', message[4:8])[0]
+            return self._reply(bytes([0x16, 0xD1]))
+
+        return b''
@@ -0,0 +1,156 @@
+"""Substituto do módulo `RPi.GPIO` ligado a um :class:`sim.building.Building`.
+
+Implementa apenas a parte da API usada pelo projeto. Deve ser instalado com :func:`install`
+antes de importar os módulos que fazem `import RPi.GPIO as GPIO`.
+"""
+import sys
+import time
+import types
+import threading
+from collections import deque
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+LOW = 0
+HIGH = 1
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+_building = None
+_condition = threading.Condition()
+_detections = {}
+_last_edges = {}
+
+
+def install(building) -> None:
+    """Liga o módulo ao prédio simulado e o registra como `RPi.GPIO` em `sys.modules`.
+
+    :param building: Prédio simulado
+    :type building: class:`sim.building.Building`
+    """
+    global _building
+    _building = building
+    building.edge_listeners.append(_on_edge)
+
+    module = sys.modules[__name__]
+    package = sys.modules.get("RPi") or types.ModuleType("RPi")
+    package.GPIO = module
+    sys.modules["RPi"] = package
+    sys.modules["RPi.GPIO"] = module
+
+
+def _on_edge(gpio, rising) -> None:
+    """Recebe uma borda de sensor do prédio, acorda quem espera por ela e chama os callbacks.
+    """
+    now = time.monotonic()
+    with _condition:
+        _last_edges.setdefault(gpio, deque(maxlen=8)).append((now, rising))
+        _condition.notify_all()
+        detection = _detections.get(gpio)
+
+    if detection is None:
+        return
+
+    edge, callback, bouncetime, last_call = detection
+    if edge != BOTH and (edge == RISING) != rising:
+        return
+    if bouncetime and last_call is not None and (now - last_call) * 1000 < bouncetime:
+        return
+
+    _detections[gpio] = (edge, callback, bouncetime, now)
+    if callback is not None:
+        callback(gpio)
+
+
+def setmode(mode) -> None:
+    """Sem efeito na simulação.
+    """
+
+
+def setwarnings(flag) -> None:
+    """Sem efeito na simulação.
+    """
+
+
+def setup(channel, direction, **kwargs) -> None:
+    """Sem efeito na simulação: o papel de cada pino vem da configuração do prédio.
+    """
+
+
+def cleanup(*args) -> None:
+    """Remove todas as detecções de borda.
+    """
+    with _condition:
+        _detections.clear()
+
+
+def input(channel) -> int:
+    """Lê o nível de um sensor de andar simulado.
+    """
+    return _building.input(channel)
+
+
+def output(channel, value) -> None:
+    """Escreve o nível de um pino de direção de motor simulado.
+    """
+    _building.output(channel, value)
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None) -> None:
+    """Registra um callback para as bordas do canal, com debounce em ms.
+    """
+    with _condition:
+        _detections[channel] = (edge, callback, bouncetime, None)
+
+
+def remove_event_detect(channel) -> None:
+    """Remove a detecção de bordas do canal.
+    """
+    with _condition:
+        _detections.pop(channel, None)
+
+
+def wait_for_edge(channel, edge, timeout=None):
+    """Espera uma borda no canal, retornando o canal ou None em caso de timeout (em ms).
+    """
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout / 1000
+
+    with _condition:
+        while True:
+            for edge_time, rising in _last_edges.get(channel, ()):
+                if edge_time > start and (edge == BOTH or (edge == RISING) == rising):
+                    return channel
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            _condition.wait(remaining)
+
+
+class PWM():
+    """PWM simulado de um pino de motor.
+    """
+    def __init__(self, channel, frequency) -> None:
+        """Cria o PWM do canal (a frequência é ignorada na simulação).
+        """
+        self.channel = channel
+        self.frequency = frequency
+
+    def start(self, duty) -> None:
+        """Inicia o PWM com o ciclo de trabalho dado.
+        """
+        _building.set_duty_cycle(self.channel, duty)
+
+    def ChangeDutyCycle(self, duty) -> None:
+        """Altera o ciclo de trabalho do PWM.
+        """
+        _building.set_duty_cycle(self.channel, duty)
+
+    def stop(self) -> None:
+        """Para o PWM.
+        """
+        _building.set_duty_cycle(self.channel, 0)
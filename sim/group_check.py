@@ -0,0 +1,226 @@
+"""Verificação da coordenação entre grupos: inicia vários grupos de elevadores simulados, cada um em
+um processo com o seu prédio, ligados por UDP unicast em 127.0.0.1, e faz chamadas de andar nos
+painéis de grupos sorteados.
+
+Depois das chamadas sorteadas, leva os elevadores de todos os grupos para o último andar e faz uma
+chamada no térreo pelo último grupo; com os lances empatados, ela é atribuída ao primeiro grupo,
+cujo processo é finalizado logo em seguida. A verificação passa se todas as chamadas forem atendidas
+e a chamada do grupo finalizado for reatribuída e atendida por outro.
+
+Uso::
+
+    python3 -m sim.group_check --nodes 3 --speed 5
+"""
+import sys
+import time
+import random
+import argparse
+import multiprocessing
+from dataclasses import replace
+
+from setup.config import load_config, CAR, HALL_UP, HALL_DOWN
+
+BASE_PORT = 47810
+
+# Espera pela leitura dos botões pressionados, em segundos simulados
+POLL_GRACE = 2.0
+
+
+def run_node(config_path, node_id, nodes, speed, connection) -> None:
+    """Processo de um grupo: sistema simulado com a coordenação ligada, comandado pelo processo principal.
+
+    Comandos recebidos por `connection`: ("press", tipo, andar), ("stats",) e ("stop",).
+
+    :param config_path: Arquivo de configuração
+    :type config_path: str
+    :param node_id: Identificador do grupo (a partir de 1)
+    :type node_id: int
+    :param nodes: Quantidade de grupos
+    :type nodes: int
+    :param speed: Fator de aceleração do tempo
+    :type speed: float
+    :param connection: Ponta do pipe com o processo principal
+    :type connection: class:`multiprocessing.connection.Connection`
+    """
+    # Importados no processo filho, que instala a GPIO simulada
+    from sim.benchmark import SimulatedSystem
+    from group.coordinator import GroupCoordinator
+
+    config = load_config(config_path)
+    peers = tuple(f"127.0.0.1:{BASE_PORT + other}" for other in range(1, nodes + 1) if other != node_id)
+    config = replace(config, parking=replace(config.parking, enabled=False),
+                     group=replace(config.group, enabled=True, node_id=node_id, host="127.0.0.1",
+                                   port=BASE_PORT + node_id, multicast="", peers=peers))
+
+    system = SimulatedSystem(config, speed=speed)
+    coordinator = GroupCoordinator(system.controller, system.config.group)
+    system.controller.group = coordinator
+    coordinator.start()
+    system.start()
+    connection.send("pronto")
+
+    while True:
+        command = connection.recv()
+        if command[0] == "press":
+            # Pressiona o botão no painel de todos os elevadores que o têm
+            connection.send([system.press(car_idx, command[1], command[2])
+                             for car_idx in range(len(system.controller.elevators))])
+        elif command[0] == "stats":
+            stats = coordinator.get_stats()
+            stats["idle"] = system.is_idle()
+            connection.send(stats)
+        else:
+            break
+
+    coordinator.shutdown()
+    system.shutdown(drain_timeout=60.0)
+    connection.send("finalizado")
+
+
+class Node():
+    """Processo de um grupo visto pelo processo principal.
+    """
+    def __init__(self, context, config_path, node_id, nodes, speed) -> None:
+        self.node_id = node_id
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=run_node, args=(config_path, node_id, nodes, speed, child_connection),
+                                       daemon=True)
+        self.process.start()
+
+    def request(self, *command):
+        self.connection.send(command)
+        return self.connection.recv()
+
+
+def wait_until(condition, timeout, interval=0.1) -> bool:
+    """Espera uma condição ficar verdadeira.
+
+    :param condition: Função verificada a cada `interval` segundos
+    :type condition: function
+    :param timeout: Tempo máximo de espera em segundos
+    :type timeout: float
+    :return: Verdadeiro se a condição ficou verdadeira dentro do tempo
+    :rtype: bool
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def settled(nodes) -> bool:
+    """Indica se todos os grupos atenderam as suas chamadas e estão com os elevadores ociosos.
+    """
+    for node in nodes:
+        stats = node.request("stats")
+        if stats["auctions"] or stats["pending"] or stats["held"] or not stats["idle"]:
+            return False
+    return True
+
+
+def run(config_path, nodes_count, speed, calls, seed, timeout) -> dict:
+    """Faz as chamadas sorteadas e a verificação da falha de um grupo.
+
+    :return: Chamadas atendidas por cada grupo de origem, reatribuições e se a chamada do grupo finalizado foi atendida
+    :rtype: dict
+    """
+    context = multiprocessing.get_context("spawn")
+    nodes = [Node(context, config_path, node_id, nodes_count, speed) for node_id in range(1, nodes_count + 1)]
+    rng = random.Random(seed)
+    floors = load_config(config_path).floor_codes
+    hall_buttons = [(HALL_UP, floor) for floor in floors[:-1]] + [(HALL_DOWN, floor) for floor in floors[1:]]
+    result = {"settled": False, "reassigned": False}
+
+    try:
+        for node in nodes:
+            if node.connection.recv() != "pronto":
+                raise RuntimeError(f"Grupo {node.node_id} não iniciou!")
+        print(f"{nodes_count} grupos calibrados")
+
+        # Chamadas sorteadas, em painéis de grupos sorteados
+        for _ in range(calls):
+            kind, floor = rng.choice(hall_buttons)
+            rng.choice(nodes).request("press", kind, floor)
+            time.sleep(rng.uniform(0.5, 3.0) / speed)
+        # Dá tempo para a leitura dos últimos botões antes de esperar os elevadores ficarem ociosos
+        time.sleep(POLL_GRACE / speed)
+        result["settled"] = wait_until(lambda: settled(nodes), timeout)
+        if not result["settled"]:
+            print("As chamadas sorteadas não foram atendidas!")
+        result["served"] = {node.node_id: node.request("stats")["served"] for node in nodes}
+
+        # Todos os elevadores no último andar: os lances para o térreo empatam e o primeiro grupo vence
+        for node in nodes:
+            node.request("press", CAR, floors[-1])
+        time.sleep(POLL_GRACE / speed)
+        wait_until(lambda: settled(nodes), timeout)
+        origin, victim = nodes[-1], nodes[0]
+        origin.request("press", HALL_UP, floors[0])
+
+        awarded = wait_until(lambda: any(entry["winner"] == victim.node_id
+                                         for entry in origin.request("stats")["pending"]), timeout)
+        if not awarded:
+            print(f"A chamada não foi atribuída ao grupo {victim.node_id}!")
+            return result
+
+        victim.process.kill()
+        victim.process.join()
+        print(f"Grupo {victim.node_id} finalizado com a chamada para {floors[0]} atribuída a ele")
+
+        alive = nodes[1:]
+        result["reassigned"] = wait_until(lambda: settled(alive), timeout)
+        stats = origin.request("stats")
+        result["failures"] = stats["failures"]
+        result["reassignments"] = stats["reassignments"]
+        result["last_call"] = stats["served"][-1] if stats["served"] else None
+        nodes = alive
+    finally:
+        for node in nodes:
+            if node.process.is_alive():
+                node.connection.send(("stop",))
+        for node in nodes:
+            node.process.join(timeout=timeout)
+            if node.process.is_alive():
+                node.process.kill()
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica a coordenação entre grupos de elevadores simulados.")
+    parser.add_argument("--nodes", type=int, default=3, help="Quantidade de grupos (processos)")
+    parser.add_argument("--speed", type=float, default=5.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--calls", type=int, default=12, help="Chamadas de andar sorteadas")
+    parser.add_argument("--seed", type=int, default=1, help="Semente do sorteio das chamadas")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Tempo máximo de cada espera, em segundos")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    args = parser.parse_args()
+
+    if args.nodes < 3:
+        parser.error("A verificação da falha precisa de pelo menos 3 grupos")
+
+    result = run(args.config, args.nodes, args.speed, args.calls, args.seed, args.timeout)
+
+    for node_id, served in result.get("served", {}).items():
+        waits = [call["wait"] * args.speed for call in served]
+        winners = {}
+        for call in served:
+            winners[call["winner"]] = winners.get(call["winner"], 0) + 1
+        mean = sum(waits) / len(waits) if waits else 0.0
+        print(f"Grupo {node_id}: {len(served)} chamadas, atendidas pelos grupos {dict(sorted(winners.items()))}, "
+              f"espera média {mean:.1f} s, máxima {max(waits, default=0.0):.1f} s simulados")
+
+    last_call = result.get("last_call")
+    if result["reassigned"] and last_call is not None:
+        print(f"Falhas detectadas: {result['failures']}, reatribuições: {result['reassignments']}, "
+              f"chamada atendida pelo grupo {last_call['winner']} em {last_call['wait'] * args.speed:.1f} s simulados")
+
+    ok = result["settled"] and result["reassigned"] and last_call is not None and last_call["winner"] != 1
+    print("Coordenação entre grupos: OK" if ok else "Coordenação entre grupos: FALHOU")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
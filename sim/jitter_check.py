@@ -0,0 +1,125 @@
+"""Verificação do isolamento da tela: mede o jitter dos laços de controle (intervalo entre as leituras
+do encoder) durante uma sequência de viagens, sem tela, com uma carga de renderização em uma thread
+do processo dos elevadores e com a mesma carga em um processo separado.
+
+A carga lê o estado dos elevadores da memória compartilhada, gasta `--render-ms` de CPU em Python
+puro por quadro (como o desenho com o PIL, sem liberar o GIL) e devolve temperaturas pelo anel,
+então os dois modos passam pelo mesmo caminho do :class:`i2c.display_process.DisplayProcess`.
+
+Uso::
+
+    python3 -m sim.jitter_check --speed 2 --render-ms 15
+"""
+import time
+import argparse
+import functools
+from dataclasses import replace
+
+from setup.config import load_config, CAR
+from sim.benchmark import SimulatedSystem
+from i2c.display_process import DisplayProcess, attach_state
+
+# Viagens feitas em cada modo, partindo do térreo
+TRIPS = ("T", "G", "S", "F", "T", "S", "G", "F", "T", "G")
+
+MODES = ("nenhuma", "thread", "processo")
+
+
+def render_load(state_name, config, display, temperature, stop_event, render_ms=15.0, frame_interval=0.02) -> None:
+    """Carga de renderização: a cada quadro lê o estado dos elevadores e ocupa a CPU por `render_ms`
+    milissegundos, devolvendo uma temperatura de cada elevador a cada 10 quadros.
+    """
+    state = attach_state(state_name, config)
+    framebuffer = bytearray(128 * 64 // 8)
+    frames = 0
+    try:
+        while not stop_event.is_set():
+            snapshots = state.snapshots()
+            deadline = time.perf_counter() + render_ms / 1000
+            while time.perf_counter() < deadline:
+                for idx in range(len(framebuffer)):
+                    framebuffer[idx] ^= len(snapshots) & 0xFF
+
+            frames += 1
+            if frames % 10 == 0:
+                for car_idx in range(len(snapshots)):
+                    state.push_temperature(car_idx, 25.0 + car_idx)
+            stop_event.wait(frame_interval)
+    finally:
+        state.close()
+
+
+def run_mode(config, speed, mode, render_ms) -> dict:
+    """Faz a sequência de viagens com uma das cargas de tela.
+
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :param speed: Fator de aceleração do tempo
+    :type speed: float
+    :param mode: Carga de tela ("nenhuma", "thread" ou "processo")
+    :type mode: str
+    :param render_ms: CPU gasta por quadro, em milissegundos
+    :type render_ms: float
+    :return: Jitter dos laços de controle (ver :meth:`gpio.ElevatorController.control_jitter`) e
+        se as temperaturas do anel chegaram aos elevadores
+    :rtype: dict
+    """
+    system = SimulatedSystem(config, speed=speed)
+    system.start()
+    controller = system.controller
+
+    screen = None
+    if mode != "nenhuma":
+        screen = DisplayProcess(controller, display=False, temperature=False, isolated=mode == "processo",
+                                target=functools.partial(render_load, render_ms=render_ms))
+        screen.start()
+
+    # Descarta os intervalos da calibração
+    for elevator in controller.elevators:
+        elevator.control_intervals.clear()
+
+    try:
+        for trip_idx in range(len(TRIPS)):
+            # Os elevadores fazem a sequência defasados, disputando o barramento
+            for car_idx in range(len(controller.elevators)):
+                system.press(car_idx, CAR, TRIPS[(trip_idx + 3 * car_idx) % len(TRIPS)])
+            system.sleep(1.0)
+            system.wait_idle(timeout=120.0)
+
+        jitter = controller.control_jitter()
+        jitter["temperatures"] = all(snapshot.temperature is not None for snapshot in controller.state_board.snapshots())
+    finally:
+        if screen is not None:
+            screen.shutdown()
+        system.shutdown()
+
+    return jitter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o jitter dos laços de controle com a tela na mesma thread, em thread ou em processo separado.")
+    parser.add_argument("--speed", type=float, default=2.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--render-ms", type=float, default=15.0, help="CPU gasta por quadro da tela, em milissegundos")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES, help="Cargas de tela comparadas")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    config = replace(config, parking=replace(config.parking, enabled=False))
+
+    results = {}
+    for mode in args.modes:
+        print(f"Viagens com a carga de tela: {mode} ...")
+        results[mode] = run_mode(config, args.speed, mode, args.render_ms)
+
+    print(f"{'Tela':>10} {'Amostras':>9} {'Mediana':>10} {'p99':>10} {'Máximo':>10} {'Desvio':>10} {'Jitter':>10} {'Temperaturas':>13}")
+    for mode, jitter in results.items():
+        temperatures = "-" if mode == "nenhuma" else ("sim" if jitter["temperatures"] else "não")
+        print(f"{mode:>10} {jitter['samples']:>9} {jitter['p50'] * 1000:>7.1f} ms {jitter['p99'] * 1000:>7.1f} ms "
+              f"{jitter['max'] * 1000:>7.1f} ms {jitter['stdev'] * 1000:>7.2f} ms {jitter['jitter'] * 1000:>7.1f} ms "
+              f"{temperatures:>13}")
+    print("Intervalos em tempo real; o período nominal inclui as duas transações do barramento.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Reprodução de uma captura da UART: refaz, pelo :class:`uart.ModbusController`, cada transação
+gravada com ``buses[].capture_path`` (ou ``--capture`` no benchmark), respondendo com os quadros
+recebidos da ESP32 gravada. As transações cujas respostas o controlador rejeita são listadas, para
+reproduzir problemas de campo sem a placa.
+
+No ritmo gravado, cada quadro é liberado no mesmo instante relativo da captura. Com ``--full-speed``,
+a captura é reproduzida o mais rápido possível, medindo quantos quadros por segundo o controlador
+Modbus consegue montar, conferir e interpretar.
+
+Uso::
+
+    python3 -m sim.replay captura.bin --full-speed --repeat 20
+"""
+import sys
+import time
+import struct
+import argparse
+
+from uart.capture import ReplayTransport
+from uart.modbus_controller import ModbusController
+
+# Quantidade máxima de transações com erro listadas individualmente
+MAX_LISTED_ERRORS = 20
+
+
+def decode_request(frame) -> tuple:
+    """Converte um quadro enviado na chamada do :class:`uart.ModbusController` que o gerou.
+
+    :param frame: Quadro enviado (endereço, função, subcódigo, dados, matrícula e CRC)
+    :type frame: bytes
+    :return: Nome do método e os seus argumentos, ou None se o quadro não for reconhecido
+    :rtype: tuple(str, dict)
+    """
+    function_code, sub_code = frame[1], frame[2]
+
+    if function_code == 0x23 and sub_code == 0xC1:
+        return "read_encoder", {"engine_id": frame[3]}
+    if function_code == 0x16 and sub_code == 0xC2:
+        return "send_control_signal", {"engine_id": frame[3], "value": struct.unpack('<i', frame[4:8])[0]}
+    if function_code == 0x16 and sub_code == 0xD1:
+        return "send_temperature", {"elevator_id": frame[3], "temperature": struct.unpack('<f', frame[4:8])[0]}
+    if function_code == 0x03:
+        return "read_registers", {"initial_address": sub_code, "quantity": frame[3]}
+    if function_code == 0x06:
+        quantity = frame[3]
+        # Reenvia mesmo as escritas que a cópia local suprimiria, já que elas estão na captura
+        return "write_registers", {"initial_address": sub_code, "quantity": quantity,
+                                   "values": frame[4:4 + quantity], "force": True}
+    return None
+
+
+def replay(path, realtime=True) -> dict:
+    """Reproduz uma captura uma vez.
+
+    :param path: Arquivo da captura
+    :type path: str
+    :param realtime: Reproduz no ritmo gravado, default é True
+    :type realtime: bool
+    :return: Transações, quadros, erros (índice, método e mensagem), quadros enviados diferentes
+        dos gravados e duração em segundos
+    :rtype: dict
+    """
+    transport = ReplayTransport(path, realtime=realtime)
+    requests = transport.requests()
+    if not requests:
+        raise ValueError(f"Captura {path} sem quadros enviados!")
+
+    # O endereço e a matrícula vêm dos próprios quadros: 1 (endereço) ... 4 (matrícula) + 2 (CRC)
+    first = requests[0]
+    controller = ModbusController(device_id=first[0], student_id=first[-6:-2], port=path, turnaround=0.0,
+                                  transport=transport)
+
+    errors, unknown = [], 0
+    started_at = time.perf_counter()
+    try:
+        for idx, frame in enumerate(requests):
+            request = decode_request(frame) if len(frame) >= 8 else None
+            if request is None:
+                unknown += 1
+                continue
+
+            method, kwargs = request
+            try:
+                getattr(controller, method)(**kwargs)
+            except (ValueError, ConnectionError) as e:
+                errors.append((idx, method, str(e)))
+    finally:
+        elapsed = time.perf_counter() - started_at
+        controller.disconnect()
+
+    return {"transactions": len(requests) - unknown,
+            "frames": len(transport.frames),
+            "unknown": unknown,
+            "errors": errors,
+            "mismatches": transport.mismatches,
+            "elapsed": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz uma captura do tráfego da UART pelo controlador Modbus.")
+    parser.add_argument("capture", help="Arquivo da captura")
+    parser.add_argument("--full-speed", action="store_true", help="Reproduz o mais rápido possível em vez do ritmo gravado")
+    parser.add_argument("--repeat", type=int, default=1, help="Quantidade de reproduções da captura")
+    args = parser.parse_args()
+
+    results = [replay(args.capture, realtime=not args.full_speed) for _ in range(args.repeat)]
+    first = results[0]
+
+    for idx, method, message in first["errors"][:MAX_LISTED_ERRORS]:
+        print(f"Transação {idx} ({method}): {message}")
+    if len(first["errors"]) > MAX_LISTED_ERRORS:
+        print(f"... e mais {len(first['errors']) - MAX_LISTED_ERRORS} transações com erro")
+
+    frames = sum(result["frames"] for result in results)
+    elapsed = sum(result["elapsed"] for result in results)
+    print(f"Transações: {first['transactions']} ({first['unknown']} quadros não reconhecidos), "
+          f"{len(first['errors'])} com erro, {first['mismatches']} quadros enviados diferentes da captura")
+    print(f"Reprodução {'sem espera' if args.full_speed else 'no ritmo gravado'}: {frames} quadros em {elapsed:.2f} s "
+          f"({frames / elapsed:.0f} quadros/s, {args.repeat} reproduções)")
+
+    # Quadros diferentes indicam que a captura não corresponde a esta versão do controlador
+    sys.exit(1 if first["mismatches"] else 0)
+
+
+if __name__ == "__main__":
+    main()
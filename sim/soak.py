@@ -0,0 +1,263 @@
+"""Teste de longa duração (soak): roda o sistema completo sobre o prédio e o barramento simulados,
+em tempo acelerado, com tráfego contínuo pelo equivalente a dias de operação, e acompanha a memória
+e as threads do processo.
+
+A cada `--sample-interval` segundos simulados são registrados a memória alocada pelo controlador
+(snapshot do `tracemalloc`, sem as alocações do próprio teste e da simulação), a quantidade de threads
+e o RSS do processo. Depois do aquecimento (calibração e históricos limitados enchendo), a tendência de
+cada série é estimada por mínimos quadrados; o teste falha se algum crescimento por hora simulada
+passar do limite, mostrando os pontos do código que mais alocaram desde o fim do aquecimento.
+
+Uso::
+
+    python3 -m sim.soak --hours 48 --speed 50
+"""
+import gc
+import os
+import sys
+import time
+import argparse
+import threading
+import tracemalloc
+import dataclasses
+
+from setup.config import load_config
+from sim.benchmark import SimulatedSystem, Benchmark
+from sim.traffic import TrafficGenerator, PATTERNS, POISSON
+
+# Alocações que não contam para a tendência: o próprio teste, a simulação e o tracemalloc
+SOAK_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+                tracemalloc.Filter(False, os.path.join("*", "sim", "*")))
+
+# Séries acompanhadas: nome, descrição, unidade e divisor para mostrar
+SERIES = (("traced", "memória alocada", "KiB", 1024),
+          ("rss", "RSS", "KiB", 1024),
+          ("threads", "threads", "threads", 1))
+
+
+def read_rss() -> int:
+    """Memória residente (RSS) do processo, lida de `/proc/self/statm`.
+
+    :return: RSS em bytes, ou None fora do Linux
+    :rtype: int
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def slope(points) -> float:
+    """Inclinação da reta de mínimos quadrados pelos pontos.
+
+    :param points: Pontos (x, y)
+    :type points: list[tuple(float, float)]
+    :return: Inclinação, ou 0 com menos de dois valores de x distintos
+    :rtype: float
+    """
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+class SoakRun(Benchmark):
+    """Tráfego contínuo do benchmark com amostras periódicas da memória e das threads. Os passageiros
+    já atendidos são descartados, para que o próprio teste não cresça com a duração.
+    """
+    def __init__(self, system, traffic, duration, sample_interval, warmup, frames=1) -> None:
+        """Inicializa o teste, sem iniciar o `tracemalloc`.
+
+        :param system: Sistema simulado já iniciado
+        :type system: class:`sim.benchmark.SimulatedSystem`
+        :param traffic: Gerador de passageiros
+        :type traffic: class:`sim.traffic.TrafficGenerator`
+        :param duration: Duração do tráfego em segundos de tempo simulado
+        :type duration: float
+        :param sample_interval: Intervalo entre as amostras em segundos de tempo simulado
+        :type sample_interval: float
+        :param warmup: Duração do aquecimento em segundos de tempo simulado, fora das tendências
+        :type warmup: float
+        :param frames: Quadros da pilha guardados por alocação no `tracemalloc`
+        :type frames: int
+        """
+        super().__init__(system, traffic, duration)
+        self.sample_interval = sample_interval
+        self.warmup = warmup
+        self.frames = frames
+        self.samples = []
+        self.served_count = 0
+        self.baseline = None
+        self.final = None
+
+    def sample(self, elapsed) -> dict:
+        """Registra uma amostra da memória e das threads.
+
+        :param elapsed: Tempo simulado desde o início do tráfego, em segundos
+        :type elapsed: float
+        :return: Amostra registrada
+        :rtype: dict
+        """
+        # Só o que continua referenciado depois de uma coleta completa conta como crescimento
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(SOAK_FILTERS)
+        sample = {"hours": elapsed / 3600,
+                  "traced": sum(stat.size for stat in snapshot.statistics("filename")),
+                  "rss": read_rss(),
+                  "threads": threading.active_count(),
+                  "served": self.served_count}
+        self.samples.append(sample)
+
+        if self.baseline is None and elapsed >= self.warmup:
+            self.baseline = snapshot
+        self.final = snapshot
+
+        rss = "N/A" if sample["rss"] is None else f"{sample['rss'] / 1024:.0f} KiB"
+        print(f"Soak {sample['hours']:.1f} h: {sample['traced'] / 1024:.0f} KiB alocados, RSS {rss}, "
+              f"{sample['threads']} threads, {sample['served']} passageiros atendidos")
+        return sample
+
+    def _prune(self) -> None:
+        """Descarta os passageiros que já desembarcaram, contando-os.
+        """
+        with self._lock:
+            remaining = [passenger for passenger in self.passengers if passenger.alighting is None]
+            self.served_count += len(self.passengers) - len(remaining)
+            self.passengers = remaining
+
+    def run(self, tick=0.5) -> list:
+        """Gera o tráfego durante `duration`, registrando uma amostra a cada `sample_interval`.
+
+        :param tick: Intervalo entre gerações de chegadas em segundos de tempo simulado, default é 0.5
+        :type tick: float
+        :return: Amostras registradas
+        :rtype: list[dict]
+        """
+        tracemalloc.start(self.frames)
+        try:
+            self._start = self.system.now()
+            next_sample = 0.0
+            while True:
+                elapsed = self.system.now() - self._start
+                if elapsed >= next_sample:
+                    self._prune()
+                    self.sample(elapsed)
+                    next_sample += self.sample_interval
+                if elapsed >= self.duration:
+                    break
+
+                for passenger in self.traffic.arrivals_until(elapsed):
+                    self.passengers.append(passenger)
+                    self._call(passenger)
+                self.system.sleep(tick)
+        finally:
+            tracemalloc.stop()
+
+        return self.samples
+
+    def trends(self) -> dict:
+        """Crescimento por hora simulada de cada série depois do aquecimento.
+
+        :return: Inclinação de cada série (por hora simulada), ou None se a série não foi medida
+        :rtype: dict
+        """
+        warm = [sample for sample in self.samples if sample["hours"] * 3600 >= self.warmup]
+        return {name: (slope([(sample["hours"], sample[name]) for sample in warm])
+                       if all(sample[name] is not None for sample in warm) else None)
+                for name, *_ in SERIES}
+
+    def top_allocations(self, limit) -> list:
+        """Pontos do código cuja memória alocada mais cresceu desde o fim do aquecimento.
+
+        :param limit: Quantidade de pontos
+        :type limit: int
+        :return: Diferenças por linha, da maior para a menor
+        :rtype: list[class:`tracemalloc.StatisticDiff`]
+        """
+        if self.baseline is None or self.final is None:
+            return []
+        return [diff for diff in self.final.compare_to(self.baseline, "lineno") if diff.size_diff > 0][:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de longa duração com acompanhamento da memória e das threads.")
+    parser.add_argument("--hours", type=float, default=48.0, help="Duração do tráfego em horas simuladas")
+    parser.add_argument("--speed", type=float, default=50.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--pattern", choices=PATTERNS, default=POISSON, help="Padrão de tráfego")
+    parser.add_argument("--intensity", type=float, default=120.0, help="Chegadas de passageiros por hora")
+    parser.add_argument("--seed", type=int, default=1, help="Semente do gerador de tráfego")
+    parser.add_argument("--sample-interval", type=float, default=900.0, help="Intervalo entre amostras, em segundos simulados")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Aquecimento fora das tendências, em horas simuladas")
+    parser.add_argument("--max-memory-growth", type=float, default=64.0,
+                        help="Crescimento máximo da memória alocada, em KiB por hora simulada")
+    parser.add_argument("--max-rss-growth", type=float, default=512.0,
+                        help="Crescimento máximo do RSS, em KiB por hora simulada")
+    parser.add_argument("--max-thread-growth", type=float, default=0.25,
+                        help="Crescimento máximo da quantidade de threads, por hora simulada")
+    parser.add_argument("--frames", type=int, default=1, help="Quadros da pilha guardados por alocação")
+    parser.add_argument("--top", type=int, default=10, help="Pontos de alocação mostrados no relatório")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    args = parser.parse_args()
+
+    if args.hours <= args.warmup:
+        parser.error("A duração precisa ser maior que o aquecimento")
+
+    # Históricos das chamadas menores, para que encham durante o aquecimento
+    config = load_config(args.config)
+    config = dataclasses.replace(config, calls=dataclasses.replace(config.calls, history=100),
+                                 group=dataclasses.replace(config.group, enabled=False))
+    system = SimulatedSystem(config, speed=args.speed)
+    traffic = TrafficGenerator(config.floor_codes, pattern=args.pattern, intensity=args.intensity, seed=args.seed)
+
+    print("Calibrando elevadores simulados ...")
+    system.start()
+
+    started_at = time.monotonic()
+    soak = SoakRun(system, traffic, duration=args.hours * 3600, sample_interval=args.sample_interval,
+                   warmup=args.warmup * 3600, frames=args.frames)
+    try:
+        soak.run()
+    finally:
+        system.shutdown()
+
+    limits = {"traced": args.max_memory_growth * 1024, "rss": args.max_rss_growth * 1024,
+              "threads": args.max_thread_growth}
+    trends = soak.trends()
+    failed = []
+
+    print(f"Soak: {args.hours:.1f} h simuladas em {(time.monotonic() - started_at) / 60:.1f} min, "
+          f"{soak.served_count} passageiros atendidos, {len(soak.samples)} amostras")
+    for name, description, unit, divisor in SERIES:
+        trend = trends[name]
+        if trend is None:
+            print(f"Tendência de {description}: não medida")
+            continue
+        status = "OK" if trend <= limits[name] else "ACIMA DO LIMITE"
+        if trend > limits[name]:
+            failed.append(description)
+        print(f"Tendência de {description}: {trend / divisor:+.2f} {unit}/h "
+              f"(limite {limits[name] / divisor:.2f} {unit}/h) {status}")
+
+    top = soak.top_allocations(args.top)
+    if top:
+        print("Pontos que mais alocaram desde o fim do aquecimento:")
+        for diff in top:
+            frame = diff.traceback[0]
+            print(f"  {frame.filename}:{frame.lineno}: {diff.size_diff / 1024:+.1f} KiB em {diff.count_diff:+d} blocos "
+                  f"({diff.size / 1024:.1f} KiB no total)")
+
+    if failed:
+        print(f"Soak: crescimento acima do limite em {', '.join(failed)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Verificação da recuperação do barramento: faz uma sequência de viagens injetando falhas na ESP32
+simulada durante cada viagem e mede se todas terminam, a maior espera do laço de controle por uma
+leitura do encoder e os travamentos detectados e recuperados pelo watchdog.
+
+Durante as viagens, a posição de cada elevador simulado é amostrada e o PWM escrito em cada motor é
+observado. A verificação falha se algum elevador sair da faixa dos andares calibrados mais
+`--margem` pulsos, ou se algum motor receber PWM não nulo depois de uma parada segura e antes de a
+viagem ser despachada de novo.
+
+Falhas injetadas (em rodízio, uma por viagem):
+
+- ``perda``: a ESP32 perde três respostas seguidas;
+- ``travamento``: a leitura da porta trava até a porta ser reaberta;
+- ``driver``: a leitura trava por alguns segundos mesmo com a porta reaberta, o que exige uma nova thread de I/O.
+
+Sem o watchdog (``--sem-watchdog``), um travamento só termina com o prazo das transações e a
+leitura travada continua segurando a thread de I/O.
+
+Uso::
+
+    python3 -m sim.stall_check --speed 5
+"""
+import sys
+import time
+import argparse
+import threading
+from dataclasses import replace
+
+from setup.config import load_config, CAR
+from sim.benchmark import SimulatedSystem
+
+# Viagens feitas em sequência, partindo do térreo
+TRIPS = ("T", "G", "S", "F", "T", "S", "G", "F", "T")
+
+FAULTS = ("perda", "travamento", "driver")
+
+
+def inject(esp32s, fault, stall_timeout) -> None:
+    """Injeta uma falha em todas as ESP32 simuladas.
+
+    :param esp32s: ESP32 simuladas
+    :type esp32s: list[class:`sim.esp32.SimulatedESP32`]
+    :param fault: Falha injetada (ver `FAULTS`)
+    :type fault: str
+    :param stall_timeout: Duração de uma transação a partir da qual o barramento é considerado travado, em segundos
+    :type stall_timeout: float
+    """
+    for esp32 in esp32s:
+        if fault == "perda":
+            esp32.drop_replies(3)
+        elif fault == "travamento":
+            esp32.hang()
+        elif fault == "driver":
+            esp32.hang(duration=4 * stall_timeout)
+
+
+class MotionMonitor():
+    """Observa os elevadores durante as viagens: faixa das posições amostradas no prédio simulado e
+    PWM não nulo escrito em um motor entre uma parada segura e o próximo despacho do elevador.
+    """
+    def __init__(self, system, interval=0.002) -> None:
+        """Passa a observar as paradas seguras, os despachos e as escritas do PWM de cada elevador.
+
+        :param system: Sistema simulado já calibrado
+        :type system: class:`sim.benchmark.SimulatedSystem`
+        :param interval: Intervalo entre as amostras das posições em segundos de tempo real, default é 0.002
+        :type interval: float
+        """
+        self.system = system
+        self.interval = interval
+        self.lowest = [car.position for car in system.building.cars]
+        self.highest = list(self.lowest)
+        self.violations = []
+
+        self._stopped_at = {}
+        self._stop = threading.Event()
+        self._thread = None
+        for elevator in system.controller.elevators:
+            self._watch(elevator)
+
+    def _watch(self, elevator) -> None:
+        """Envolve a parada segura, o movimento e a escrita do PWM de um elevador.
+        """
+        safe_stop, move_to_floor = elevator.safe_stop, elevator.move_to_floor
+        set_duty_cycle = elevator.engine.set_duty_cycle
+        number = elevator.elevator_num
+
+        def watched_safe_stop(reason):
+            safe_stop(reason)
+            self._stopped_at[number] = time.monotonic()
+
+        def watched_move_to_floor(target_floor_request, parking=False):
+            self._stopped_at.pop(number, None)
+            move_to_floor(target_floor_request, parking=parking)
+
+        def watched_set_duty_cycle(power):
+            stopped_at = self._stopped_at.get(number)
+            if power and stopped_at is not None:
+                self.violations.append({"car": number, "power": power, "after": time.monotonic() - stopped_at})
+            set_duty_cycle(power)
+
+        elevator.safe_stop = watched_safe_stop
+        elevator.move_to_floor = watched_move_to_floor
+        elevator.engine.set_duty_cycle = watched_set_duty_cycle
+
+    def start(self) -> None:
+        """Inicia a amostragem das posições.
+        """
+        self._thread = threading.Thread(target=self._sample, name="motion-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Finaliza a amostragem das posições.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self) -> None:
+        """Amostra as posições dos elevadores simulados até a observação ser finalizada.
+        """
+        building = self.system.building
+        while not self._stop.wait(self.interval):
+            with building.lock:
+                positions = [car.position for car in building.cars]
+            self.lowest = [min(low, position) for low, position in zip(self.lowest, positions)]
+            self.highest = [max(high, position) for high, position in zip(self.highest, positions)]
+
+
+def run(config, speed, faults, trip_timeout) -> dict:
+    """Faz a sequência de viagens com as falhas injetadas.
+
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :param speed: Fator de aceleração do tempo
+    :type speed: float
+    :param faults: Falhas injetadas, em rodízio
+    :type faults: list[str]
+    :param trip_timeout: Tempo máximo de cada viagem em segundos de tempo simulado
+    :type trip_timeout: float
+    :return: Viagens concluídas, maior intervalo do laço de controle, estatísticas dos barramentos e do
+        watchdog, faixa das posições de cada elevador (amostrada e calibrada) e PWM aplicado depois das paradas seguras
+    :rtype: dict
+    """
+    system = SimulatedSystem(config, speed=speed)
+    system.start()
+    controller = system.controller
+
+    # Descarta os intervalos da calibração
+    for elevator in controller.elevators:
+        elevator.control_intervals.clear()
+
+    monitor = MotionMonitor(system)
+    monitor.start()
+    completed = 0
+    try:
+        for trip_idx in range(len(TRIPS)):
+            for car_idx in range(len(controller.elevators)):
+                system.press(car_idx, CAR, TRIPS[(trip_idx + 2 * car_idx) % len(TRIPS)])
+
+            # A falha chega com as viagens em andamento
+            system.sleep(1.0)
+            inject(system.esp32s, faults[trip_idx % len(faults)], config.watchdog.stall_timeout)
+
+            if not system.wait_idle(timeout=trip_timeout):
+                print(f"Viagem {trip_idx + 1} não terminou em {trip_timeout:.0f} s!")
+                break
+            completed += 1
+
+        intervals = [interval for elevator in controller.elevators for interval in list(elevator.control_intervals)]
+        result = {"completed": completed,
+                  "max_interval": max(intervals, default=0.0) * speed,
+                  "buses": [modbus_controller.get_stats() for modbus_controller in controller.modbus_controllers],
+                  "watchdog": controller.watchdog.get_stats()}
+    finally:
+        monitor.stop()
+        # Libera as leituras que ainda estiverem travadas para o encerramento
+        for esp32 in system.esp32s:
+            esp32.reset()
+        system.shutdown(drain_timeout=trip_timeout)
+
+    result["ranges"] = [{"car": elevator.elevator_num, "lowest": lowest, "highest": highest,
+                         "floors": (min(elevator.floors_positions.values()), max(elevator.floors_positions.values()))}
+                        for elevator, lowest, highest in zip(controller.elevators, monitor.lowest, monitor.highest)]
+    result["violations"] = monitor.violations
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Injeta falhas no barramento simulado e mede a recuperação.")
+    parser.add_argument("--speed", type=float, default=5.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--faults", nargs="+", default=list(FAULTS), choices=FAULTS, help="Falhas injetadas, em rodízio")
+    parser.add_argument("--trip-timeout", type=float, default=120.0, help="Tempo máximo de cada viagem, em segundos simulados")
+    parser.add_argument("--margem", type=float, default=1000.0,
+                        help="Distância máxima além do primeiro e do último andar calibrados, em pulsos do encoder")
+    parser.add_argument("--sem-watchdog", action="store_true", help="Desliga o watchdog")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    config = replace(config, parking=replace(config.parking, enabled=False),
+                     watchdog=replace(config.watchdog, enabled=not args.sem_watchdog))
+
+    result = run(config, args.speed, args.faults, args.trip_timeout)
+
+    watchdog = result["watchdog"]
+    print(f"Viagens concluídas: {result['completed']} de {len(TRIPS)}")
+    print(f"Maior intervalo do laço de controle: {result['max_interval']:.2f} s simulados")
+    for stats in result["buses"]:
+        print(f"Barramento {stats['port']}: {stats['errors']} erros, {stats['timeouts']} fora do prazo, "
+              f"{stats['stalls']} travamentos, {stats['replaced_threads']} threads de I/O substituídas")
+    print(f"Watchdog: {watchdog['bus_stalls']} travamentos de barramento, {watchdog['hung_threads']} threads travadas, "
+          f"recuperação média {watchdog['recovery_mean'] * 1000:.0f} ms, máxima {watchdog['recovery_max'] * 1000:.0f} ms")
+
+    outside = 0
+    for entry in result["ranges"]:
+        bottom, top = entry["floors"]
+        inside = bottom - args.margem <= entry["lowest"] and entry["highest"] <= top + args.margem
+        outside += not inside
+        print(f"Elevador {entry['car']}: posições de {entry['lowest']:.0f} a {entry['highest']:.0f} "
+              f"(andares de {bottom} a {top}, margem {args.margem:.0f})" + ("" if inside else "  <- fora do poço"))
+
+    for violation in result["violations"]:
+        print(f"Elevador {violation['car']}: PWM {violation['power']:.0f}% aplicado "
+              f"{violation['after'] * 1000:.0f} ms depois da parada segura")
+    print(f"PWM aplicado depois das paradas seguras: {len(result['violations'])} vezes")
+
+    ok = result["completed"] == len(TRIPS) and not outside and not result["violations"]
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import random
+from dataclasses import dataclass
+
+UP_PEAK = "up_peak"
+DOWN_PEAK = "down_peak"
+INTER_FLOOR = "inter_floor"
+POISSON = "poisson"
+
+PATTERNS = (UP_PEAK, DOWN_PEAK, INTER_FLOOR, POISSON)
+
+
+@dataclass
+class Passenger:
+    """Passageiro gerado pelo tráfego, com os instantes (em tempo simulado) de cada etapa da viagem.
+    """
+    id: int
+    origin: str
+    destination: str
+    direction: str
+    arrival: float
+    boarding: float = None
+    alighting: float = None
+    car: int = None
+
+    @property
+    def wait_time(self) -> float:
+        """Tempo entre a chegada ao andar e o embarque.
+        """
+        return None if self.boarding is None else self.boarding - self.arrival
+
+    @property
+    def ride_time(self) -> float:
+        """Tempo entre o embarque e o desembarque.
+        """
+        return None if self.alighting is None else self.alighting - self.boarding
+
+
+class TrafficGenerator():
+    """Gera chegadas de passageiros em processo de Poisson para os padrões de tráfego:
+
+    * `up_peak`: manhã, quase todos saem do térreo para os andares superiores;
+    * `down_peak`: fim do dia, quase todos descem dos andares superiores para o térreo;
+    * `inter_floor`: viagens entre andares superiores, sem passar pelo térreo;
+    * `poisson`: origem e destino uniformes entre todos os andares.
+    """
+    def __init__(self, floor_codes, pattern=POISSON, intensity=60.0, seed=None, lobby_share=0.9) -> None:
+        """Inicializa um novo gerador de tráfego.
+
+        :param floor_codes: Códigos dos andares, de baixo para cima (o primeiro é o térreo)
+        :type floor_codes: tuple[str]
+        :param pattern: Padrão de tráfego, default é `poisson`
+        :type pattern: str
+        :param intensity: Taxa média de chegadas em passageiros por hora, default é 60
+        :type intensity: float
+        :param seed: Semente do gerador aleatório, para execuções reprodutíveis
+        :type seed: int
+        :param lobby_share: Fração das viagens com origem (up_peak) ou destino (down_peak) no térreo
+        :type lobby_share: float
+        :raises ValueError: Se o padrão for desconhecido ou a intensidade não for positiva
+        """
+        if pattern not in PATTERNS:
+            raise ValueError(f"Padrão de tráfego desconhecido: {pattern}!")
+        if intensity <= 0:
+            raise ValueError("A intensidade do tráfego deve ser positiva!")
+        if pattern == INTER_FLOOR and len(floor_codes) < 3:
+            raise ValueError("O padrão inter_floor precisa de pelo menos 2 andares acima do térreo!")
+
+        self.floor_codes = tuple(floor_codes)
+        self.pattern = pattern
+        self.intensity = intensity
+        self.lobby_share = lobby_share
+        self.random = random.Random(seed)
+
+        self._next_id = 0
+        self._next_arrival = self.random.expovariate(intensity / 3600)
+
+    def _trip(self) -> tuple:
+        """Sorteia origem e destino de uma viagem de acordo com o padrão.
+
+        :return: Códigos dos andares de origem e destino
+        :rtype: tuple(str, str)
+        """
+        lobby, upper = self.floor_codes[0], self.floor_codes[1:]
+
+        if self.pattern == UP_PEAK:
+            if self.random.random() < self.lobby_share:
+                return lobby, self.random.choice(upper)
+        elif self.pattern == DOWN_PEAK:
+            if self.random.random() < self.lobby_share:
+                return self.random.choice(upper), lobby
+        elif self.pattern == INTER_FLOOR:
+            return tuple(self.random.sample(upper, 2))
+
+        return tuple(self.random.sample(self.floor_codes, 2))
+
+    def arrivals_until(self, sim_time) -> list:
+        """Gera os passageiros que chegam até o instante `sim_time`.
+
+        :param sim_time: Instante limite, em segundos de tempo simulado
+        :type sim_time: float
+        :return: Passageiros que chegaram desde a última chamada
+        :rtype: list[class:`Passenger`]
+        """
+        passengers = []
+        while self._next_arrival <= sim_time:
+            origin, destination = self._trip()
+            direction = "up" if self.floor_codes.index(destination) > self.floor_codes.index(origin) else "down"
+            passengers.append(Passenger(id=self._next_id, origin=origin, destination=destination,
+                                        direction=direction, arrival=self._next_arrival))
+
+            self._next_id += 1
+            self._next_arrival += self.random.expovariate(self.intensity / 3600)
+
+        return passengers
@@ -0,0 +1,135 @@
+"""Verificação das viagens: faz uma sequência de viagens com o primeiro elevador e mede, para cada
+uma, os períodos de controle até o elevador assentar no andar, os sinais de PWM enviados à ESP32,
+o tempo de deslocamento e o erro final em relação à posição calibrada do andar.
+
+A mesma sequência é repetida com cada conjunto de ganhos do PID:
+
+* ``fixo``: os ganhos originais do PID, sem escalonamento e sem o tempo morto na inversão do motor,
+  como no estágio de saída original (com o tempo morto, a oscilação desses ganhos não sai do lugar);
+* ``config``: o escalonamento com os ganhos da configuração;
+* ``rele``: o escalonamento com os ganhos do ensaio do relé feito na calibração.
+
+Uso::
+
+    python3 -m sim.trip_check --speed 10
+"""
+import sys
+import time
+import argparse
+from dataclasses import replace
+
+from setup.config import load_config, CAR
+from sim.benchmark import SimulatedSystem
+
+# Ganhos originais do PID (kp, ki, kd), usados nos dois sentidos e em qualquer velocidade
+FIXED_GAINS = (0.009, 0.04, 0.011)
+
+# Viagens de um, dois e três andares nos dois sentidos, partindo do térreo
+TRIPS = ("F", "S", "T", "G", "T", "S", "F", "G", "S", "G", "T", "F", "T", "G")
+
+
+def gains_config(config, mode) -> object:
+    """Configuração do sistema com os ganhos de um dos modos, sem estacionamento dos elevadores ociosos.
+
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :param mode: Modo dos ganhos ("fixo", "config" ou "rele")
+    :type mode: str
+    :return: Configuração do sistema para o modo
+    :rtype: class:`setup.config.SystemConfig`
+    """
+    control, engine = replace(config.control, autotune=mode == "rele"), config.engine
+    if mode == "fixo":
+        kp, ki, kd = FIXED_GAINS
+        control = replace(control, kp=kp, ki=ki, kd=kd, kd_fast=kd, kp_down=kp, ki_down=ki, kd_down=kd, kd_fast_down=kd)
+        engine = replace(engine, reversal_dead_time=0.0)
+    return replace(config, control=control, engine=engine, parking=replace(config.parking, enabled=False))
+
+
+def _wait_for(condition, timeout, interval=0.001) -> bool:
+    """Espera `condition` ficar verdadeira por até `timeout` segundos reais.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def run_trips(config, speed) -> list:
+    """Faz a sequência de viagens com o primeiro elevador.
+
+    :param config: Configuração do sistema
+    :type config: class:`setup.config.SystemConfig`
+    :param speed: Fator de aceleração do tempo
+    :type speed: float
+    :return: Destino, períodos de controle, sinais de PWM enviados, tempo de deslocamento (simulado)
+        e erro final de cada viagem
+    :rtype: list[dict]
+    """
+    system = SimulatedSystem(config, speed=speed)
+    system.start()
+
+    controller = system.controller
+    elevator, car = controller.elevators[0], system.building.cars[0]
+
+    trips = []
+    try:
+        for code in TRIPS:
+            # Um intervalo a menos que os períodos do laço de movimento
+            elevator.control_intervals.clear()
+            mirror_sent = elevator.mirror_sent
+            system.press(0, CAR, code)
+
+            _wait_for(lambda: elevator.state in ("Subindo", "Descendo"), timeout=10.0)
+            started_at = system.now()
+            _wait_for(lambda: elevator.state not in ("Subindo", "Descendo"), timeout=120.0)
+            moved = system.now() - started_at
+            system.wait_idle(timeout=120.0)
+
+            target = elevator.floors_positions[elevator.requests_floor_table[code]]
+            trips.append({"floor": code, "ticks": len(elevator.control_intervals) + 1,
+                          "signals": elevator.mirror_sent - mirror_sent, "time": moved, "error": car.position - target})
+    finally:
+        system.shutdown()
+
+    return trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede a precisão e a duração das viagens com cada conjunto de ganhos do PID.")
+    parser.add_argument("--speed", type=float, default=10.0, help="Fator de aceleração do tempo")
+    parser.add_argument("--modes", nargs="+", default=["fixo", "config", "rele"], choices=["fixo", "config", "rele"],
+                        help="Conjuntos de ganhos comparados")
+    parser.add_argument("--config", default="./setup/config.json", help="Arquivo de configuração")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    tolerance = config.control.floor_tolerance
+
+    failures = 0
+    for mode in args.modes:
+        print(f"Viagens com os ganhos {mode} ...")
+        trips = run_trips(gains_config(config, mode), args.speed)
+        errors = [abs(trip["error"]) for trip in trips]
+        outside = sum(error > tolerance for error in errors)
+        if mode != "fixo":
+            failures += outside
+
+        print(f"{'Destino':>8} {'Períodos':>9} {'Sinais':>7} {'Deslocamento':>13} {'Erro final':>11}")
+        for trip in trips:
+            mark = "" if abs(trip["error"]) <= tolerance else "  <- fora da tolerância"
+            print(f"{trip['floor']:>8} {trip['ticks']:>9} {trip['signals']:>7} {trip['time']:>11.1f} s "
+                  f"{trip['error']:>+11.0f}{mark}")
+        print(f"Ganhos {mode}: {sum(trip['ticks'] for trip in trips) / len(trips):.1f} períodos e "
+              f"{sum(trip['signals'] for trip in trips) / len(trips):.1f} sinais de PWM por viagem, "
+              f"{sum(trip['time'] for trip in trips) / len(trips):.1f} s por viagem, erro máximo {max(errors):.0f} "
+              f"(tolerância {tolerance}), {outside} de {len(trips)} fora da tolerância\n")
+
+    print("OK" if failures == 0 else f"FALHA: {failures} viagens com ganhos escalonados fora da tolerância")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import copy
+import time
+import struct
+import threading
+
+# Cabeçalho do arquivo de captura: identificador, versão e instante (monotônico) do início da captura
+CAPTURE_MAGIC = b"UCAP"
+CAPTURE_VERSION = 1
+CAPTURE_HEADER = struct.Struct("<4sBd")
+
+# Cabeçalho de cada quadro: sentido, instante (monotônico) e tamanho dos dados
+FRAME_HEADER = struct.Struct("<BdH")
+
+# Sentido dos quadros, do ponto de vista da Raspberry Pi
+TX = 0
+RX = 1
+
+
+class CaptureWriter():
+    """Grava quadros enviados e recebidos pela UART em um arquivo binário compacto.
+
+    Cada quadro ocupa 11 bytes de cabeçalho (sentido, instante monotônico e tamanho) mais os dados.
+    Quadros recebidos vazios ou incompletos também são gravados, já que costumam ser a causa dos
+    problemas a reproduzir.
+    """
+    def __init__(self, path, clock=time.monotonic) -> None:
+        """Cria o arquivo de captura, substituindo um existente.
+
+        :param path: Arquivo da captura
+        :type path: str
+        :param clock: Função que retorna o instante atual em segundos, default é `time.monotonic`
+        :type clock: callable
+        """
+        self.path = path
+        self.clock = clock
+        self.frames = 0
+
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, clock()))
+
+    def record(self, direction, data) -> None:
+        """Grava um quadro.
+
+        :param direction: Sentido do quadro (`TX` ou `RX`)
+        :type direction: int
+        :param data: Dados do quadro
+        :type data: bytes
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(FRAME_HEADER.pack(direction, self.clock(), len(data)) + bytes(data))
+            self.frames += 1
+            # Grava a transação inteira no disco a cada resposta, para não perdê-la se o programa cair
+            if direction == RX:
+                self._file.flush()
+
+    def close(self) -> None:
+        """Fecha o arquivo de captura.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path) -> tuple:
+    """Lê um arquivo de captura.
+
+    :param path: Arquivo da captura
+    :type path: str
+    :return: Instante do início da captura e os quadros (sentido, instante, dados), em ordem
+    :rtype: tuple(float, list[tuple(int, float, bytes)])
+    :raises ValueError: Se o arquivo não for uma captura compatível
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    if len(data) < CAPTURE_HEADER.size:
+        raise ValueError(f"Captura {path} vazia ou truncada!")
+    magic, version, started_at = CAPTURE_HEADER.unpack_from(data)
+    if (magic, version) != (CAPTURE_MAGIC, CAPTURE_VERSION):
+        raise ValueError(f"Arquivo {path} não é uma captura UART compatível!")
+
+    frames, offset = [], CAPTURE_HEADER.size
+    while offset + FRAME_HEADER.size <= len(data):
+        direction, timestamp, size = FRAME_HEADER.unpack_from(data, offset)
+        offset += FRAME_HEADER.size
+        # Um quadro cortado no fim do arquivo (programa interrompido durante a gravação) é descartado
+        if offset + size > len(data):
+            break
+        frames.append((direction, timestamp, data[offset:offset + size]))
+        offset += size
+
+    return started_at, frames
+
+
+class CaptureTransport():
+    """Transporte que repassa as chamadas a outro transporte (UART ou ESP32 simulada) gravando os
+    quadros enviados e recebidos.
+    """
+    def __init__(self, transport, path) -> None:
+        """Inicializa a captura sobre um transporte.
+
+        :param transport: Transporte capturado
+        :type transport: objeto com a mesma interface de :class:`uart.Uart`
+        :param path: Arquivo da captura
+        :type path: str
+        """
+        self.transport = transport
+        self.writer = CaptureWriter(path)
+
+    def connect(self) -> None:
+        """Conecta o transporte capturado.
+        """
+        self.transport.connect()
+
+    def disconnect(self) -> None:
+        """Desconecta o transporte capturado.
+        """
+        self.transport.disconnect()
+
+    def reset(self) -> None:
+        """Reabre o transporte capturado, descartando os dados pendentes.
+        """
+        self.transport.reset()
+
+    def reopen(self) -> "CaptureTransport":
+        """Reabre o transporte capturado em uma conexão nova, gravando no mesmo arquivo.
+
+        :return: Captura sobre a conexão nova
+        :rtype: class:`CaptureTransport`
+        """
+        reopened = copy.copy(self)
+        reopened.transport = self.transport.reopen()
+        return reopened
+
+    def send_data(self, data) -> None:
+        """Grava e envia um quadro.
+
+        :param data: Dados a serem enviados
+        :type data: bytes
+        """
+        self.writer.record(TX, data)
+        self.transport.send_data(data)
+
+    def receive_data(self, size) -> bytes:
+        """Recebe e grava um quadro.
+
+        :param size: Tamanho dos dados a serem recebidos
+        :type size: int
+        :return: Dados recebidos
+        :rtype: bytes
+        """
+        data = self.transport.receive_data(size)
+        self.writer.record(RX, data)
+        return data
+
+    def close(self) -> None:
+        """Fecha o arquivo de captura.
+        """
+        self.writer.close()
+
+
+class ReplayTransport():
+    """Transporte que responde com os quadros de uma captura, na ordem gravada.
+
+    Cada quadro enviado é comparado com o próximo quadro enviado da captura, e cada leitura devolve
+    o próximo quadro recebido, então o controlador Modbus vê exatamente as respostas da ESP32
+    gravada. Em tempo real, cada quadro é liberado no mesmo instante relativo da captura; caso
+    contrário, a reprodução é feita o mais rápido possível.
+    """
+    def __init__(self, path, realtime=True, clock=time.monotonic, sleep=time.sleep) -> None:
+        """Carrega a captura a ser reproduzida.
+
+        :param path: Arquivo da captura
+        :type path: str
+        :param realtime: Reproduz no ritmo gravado, default é True
+        :type realtime: bool
+        :param clock: Função que retorna o instante atual em segundos, default é `time.monotonic`
+        :type clock: callable
+        :param sleep: Função de espera em segundos, default é `time.sleep`
+        :type sleep: callable
+        """
+        self.started_at, self.frames = read_capture(path)
+        self.realtime = realtime
+        self.clock = clock
+        self.sleep = sleep
+
+        self.position = 0
+        self.mismatches = 0
+        self._replay_start = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        """Indica se todos os quadros da captura foram reproduzidos.
+        """
+        return self.position >= len(self.frames)
+
+    def requests(self) -> list:
+        """Quadros enviados da captura, na ordem gravada.
+
+        :return: Dados de cada quadro enviado
+        :rtype: list[bytes]
+        """
+        return [data for direction, _, data in self.frames if direction == TX]
+
+    def _next(self, direction) -> bytes:
+        """Avança até o próximo quadro do sentido dado, esperando o seu instante em tempo real.
+        """
+        while not self.finished and self.frames[self.position][0] != direction:
+            self.position += 1
+        if self.finished:
+            raise ConnectionError("Fim da captura reproduzida!")
+
+        _, timestamp, data = self.frames[self.position]
+        self.position += 1
+
+        if self.realtime:
+            if self._replay_start is None:
+                self._replay_start = self.clock() - (timestamp - self.started_at)
+            delay = self._replay_start + (timestamp - self.started_at) - self.clock()
+            if delay > 0:
+                self.sleep(delay)
+        return data
+
+    def connect(self) -> None:
+        """Sem efeito: a captura está sempre disponível.
+        """
+
+    def disconnect(self) -> None:
+        """Sem efeito: a captura está sempre disponível.
+        """
+
+    def reset(self) -> None:
+        """Sem efeito: a captura segue na ordem gravada.
+        """
+
+    def reopen(self) -> "ReplayTransport":
+        """Sem efeito: a captura segue na ordem gravada.
+
+        :return: O próprio transporte
+        :rtype: class:`ReplayTransport`
+        """
+        return self
+
+    def send_data(self, data) -> None:
+        """Confere o quadro enviado com o gravado.
+
+        :param data: Dados enviados
+        :type data: bytes
+        """
+        with self._lock:
+            if self._next(TX) != bytes(data):
+                self.mismatches += 1
+
+    def receive_data(self, size) -> bytes:
+        """Devolve o próximo quadro recebido da captura.
+
+        :param size: Tamanho dos dados a serem recebidos
+        :type size: int
+        :return: Dados gravados, limitados a `size` bytes
+        :rtype: bytes
+        """
+        with self._lock:
+            return self._next(RX)[:size]
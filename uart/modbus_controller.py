@@ -1,28 +1,308 @@
+import os
+import sys
 import struct
 import time
+import queue
 import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 
 from .crc_utils import compute_crc, check_crc
-from .uart import Uart
+from .register_shadow import RegisterShadow
+from .capture import CaptureTransport
+
+# Prioridades das transações na fila do barramento (menor valor é atendido primeiro)
+PRIORITY_EMERGENCY = 0
+PRIORITY_CONTROL = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
 
 
 class ModbusController:
     """Classe responsável por controlar a comunicação via protocolo Modbus com dispositivos UART.
     """
-    def __init__(self, device_id, student_id) -> None:
+    def __init__(self, device_id, student_id, port='/dev/serial0', baudrate=115200, turnaround=0.1,
+                 transport=None, shadow_max_age=5.0, capture_path=None, timeout=0.5, deadline=None) -> None:
         """Inicializa uma nova instância do controlador Modbus.
 
         :param device_id: ID do dispositivo Modbus
         :type device_id: int
         :param student_id: Matrícula do aluno
         :type student_id: list[int]
+        :param port: Porta serial da UART, default é '/dev/serial0'
+        :type port: str
+        :param baudrate: Taxa de transmissão da UART, default é 115200
+        :type baudrate: int
+        :param turnaround: Espera em segundos entre o envio e a leitura da resposta, default é 0.1
+        :type turnaround: float
+        :param transport: Transporte usado no lugar da UART (ex.: ESP32 simulada), opcional
+        :type transport: objeto com a mesma interface de :class:`uart.Uart`
+        :param shadow_max_age: Tempo em segundos após o qual um registrador da cópia local volta a ser desconhecido, default é 5.0
+        :type shadow_max_age: float
+        :param capture_path: Arquivo em que os quadros enviados e recebidos são gravados, default é não gravar
+        :type capture_path: str
+        :param timeout: Tempo máximo de uma leitura ou escrita na porta serial, em segundos, default é 0.5
+        :type timeout: float
+        :param deadline: Tempo máximo de uma transação, da entrada na fila até a resposta, em segundos,
+            default é esperar indefinidamente
+        :type deadline: float
         """
         self.device_id = device_id
         self.student_id = bytes(student_id)
-        self.lock = threading.Lock()
-        self.uart = Uart()
+        self.port = port
+        self.turnaround = turnaround
+        self.deadline = deadline
+        if transport is None:
+            # Importada só para a porta serial real (o pyserial não é necessário na simulação)
+            from .uart import Uart
+            transport = Uart(port=port, baudrate=baudrate, timeout=timeout)
+        if capture_path:
+            transport = CaptureTransport(transport, capture_path)
+            print(f"Capturando o tráfego do barramento {port} em {capture_path}")
+        self.uart = transport
         self.uart.connect()
 
+        # Fila de transações atendida pela thread de I/O exclusiva deste barramento
+        self._requests = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._closed = False
+
+        # Cópia local dos registradores da ESP32, usada para suprimir escritas redundantes
+        self.shadow = RegisterShadow(max_age=shadow_max_age)
+        self.suppressed_writes = 0
+
+        # Estatísticas de espera e posse do barramento, definidas só enquanto o profiler está ligado
+        self.lock_stats = None
+
+        # Estatísticas de uso do barramento
+        self.transactions = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self._started_at = time.monotonic()
+        self._last_report = (self._started_at, 0.0, 0, 0)
+
+        # Transações que passaram do prazo, travamentos detectados pelo watchdog, threads de I/O
+        # substituídas e tempos de recuperação (do travamento até a primeira transação bem-sucedida)
+        self.timeouts = 0
+        self.stalls = 0
+        self.replaced_threads = 0
+        self.recovery_times = deque(maxlen=100)
+        self._recovering_since = None
+
+        # Transação em execução (início e futuro) e geração da thread de I/O, trocada quando ela trava.
+        # Cada thread de I/O usa só o transporte com o qual foi iniciada (em `_io_local`), que é o
+        # único acesso à porta: uma thread substituída fica com o transporte antigo, já fechado
+        self._current = None
+        self._generation = 0
+        self._io_state = threading.Lock()
+        self._io_local = threading.local()
+        self._io_thread = None
+        self._start_io_thread()
+
+    def _start_io_thread(self) -> None:
+        """Inicia uma thread de I/O para a geração e o transporte atuais do barramento.
+        """
+        self._io_thread = threading.Thread(target=self._io_loop, args=(self._generation, self.uart),
+                                           name=f"modbus-io-{self.port}", daemon=True)
+        self._io_thread.start()
+
+    def _io_loop(self, generation, uart) -> None:
+        """Loop da thread de I/O do barramento: executa as transações em ordem de prioridade,
+        uma de cada vez, e contabiliza o tempo de barramento ocupado.
+
+        :param generation: Geração da thread; uma thread substituída pelo watchdog termina ao voltar da transação travada
+        :type generation: int
+        :param uart: Transporte usado pelas transações desta thread
+        :type uart: objeto com a mesma interface de :class:`uart.Uart`
+        """
+        self._io_local.uart = uart
+        while True:
+            _, _, transaction, args, future, site, submitted_at = self._requests.get()
+            if transaction is None:
+                # Cancela as transações que chegaram depois do pedido de encerramento
+                while not self._requests.empty():
+                    pending = self._requests.get()[4]
+                    if pending.set_running_or_notify_cancel():
+                        pending.set_exception(ConnectionError(f"Barramento {self.port} encerrado!"))
+                future.set_result(None)
+                break
+
+            # Quem enviou a transação já desistiu dela pelo prazo
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            start = time.monotonic()
+            self._current = (start, future)
+            try:
+                result, error = transaction(*args), None
+            except Exception as e:
+                result, error = None, e
+            end = time.monotonic()
+
+            with self._io_state:
+                # O watchdog já deu a transação como perdida e outra thread atende o barramento
+                if generation != self._generation:
+                    return
+
+                self._current = None
+                self.busy_time += end - start
+                self.transactions += 1
+                if error is None:
+                    future.set_result(result)
+                    if self._recovering_since is not None:
+                        self.recovery_times.append(end - self._recovering_since)
+                        self._recovering_since = None
+                else:
+                    self.errors += 1
+                    future.set_exception(error)
+
+            lock_stats = self.lock_stats
+            if lock_stats is not None and site is not None:
+                lock_stats.record(self.port, site, start - submitted_at, end - start)
+
+    def stalled_for(self, now=None) -> float:
+        """Tempo desde o início da transação em execução, ou zero se o barramento estiver livre.
+
+        :param now: Instante (monotônico) da verificação, default é agora
+        :type now: float
+        :return: Duração da transação em execução, em segundos
+        :rtype: float
+        """
+        current = self._current
+        if current is None:
+            return 0.0
+        return (time.monotonic() if now is None else now) - current[0]
+
+    def recover(self, grace=1.0) -> bool:
+        """Recupera o barramento de uma transação travada: descarta os buffers e reabre a porta, o que
+        interrompe a leitura em andamento, e, se a thread de I/O não voltar em `grace` segundos, dá a
+        transação como perdida, fecha o transporte da thread travada e inicia outra thread de I/O com
+        um transporte novo. A thread travada é abandonada: quando voltar, ela só encontra o transporte
+        fechado, sem acesso às respostas da nova thread, e termina. A cópia local dos registradores é
+        descartada, para que as próximas escritas ressincronizem a ESP32.
+
+        :param grace: Tempo de espera pela thread de I/O depois de reabrir a porta, em segundos, default é 1.0
+        :type grace: float
+        :return: Verdadeiro se a thread de I/O precisou ser substituída
+        :rtype: bool
+        """
+        stuck = self._current
+        with self._io_state:
+            self.stalls += 1
+            if self._recovering_since is None:
+                self._recovering_since = time.monotonic()
+
+        self.uart.reset()
+
+        deadline = time.monotonic() + grace
+        while stuck is not None and self._current is stuck and time.monotonic() < deadline:
+            time.sleep(min(0.01, grace))
+
+        replaced = False
+        with self._io_state:
+            if stuck is not None and self._current is stuck:
+                self._generation += 1
+                self._current = None
+                self.errors += 1
+                self.replaced_threads += 1
+                stuck[1].set_exception(ConnectionError(f"Barramento {self.port} travado, transação descartada!"))
+                replaced = True
+
+        if replaced:
+            # A thread travada fica com o transporte antigo; só a nova thread usa o reaberto
+            self.uart = self.uart.reopen()
+            self._start_io_thread()
+
+        self.shadow.invalidate()
+        return replaced
+
+    def _submit(self, priority, transaction, *args, deadline=None):
+        """Enfileira uma transação para a thread de I/O do barramento e espera o seu resultado.
+
+        :param priority: Prioridade da transação na fila
+        :type priority: int
+        :param transaction: Função que executa a transação
+        :type transaction: callable
+        :param deadline: Tempo máximo de espera pela transação em segundos, default é o prazo do barramento
+        :type deadline: float
+        :return: Resultado da transação
+        :raises ValueError: Se houver inconsistências na resposta
+        """
+        # Chamadas feitas pela própria thread de I/O são executadas diretamente
+        if threading.current_thread() is self._io_thread:
+            return transaction(*args)
+
+        if self._closed:
+            raise ConnectionError(f"Barramento {self.port} encerrado!")
+
+        site = self._call_site() if self.lock_stats is not None else None
+
+        deadline = self.deadline if deadline is None else deadline
+        future = Future()
+        self._requests.put((priority, next(self._sequence), transaction, args, future, site, time.monotonic()))
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeoutError:
+            # Se ainda estiver na fila, a transação não chega a ser enviada
+            future.cancel()
+            self.timeouts += 1
+            raise ConnectionError(f"Barramento {self.port}: transação sem resposta em {deadline:.2f} s!") from None
+
+    @staticmethod
+    def _call_site() -> str:
+        """Local (arquivo, linha e função) da primeira chamada fora deste módulo na pilha atual.
+
+        :return: Local da chamada
+        :rtype: str
+        """
+        frame = sys._getframe(1)
+        while frame.f_back is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+    def get_stats(self) -> dict:
+        """Retorna as estatísticas acumuladas do barramento, sem alterar o período dos relatórios.
+
+        :return: Porta, transações, erros, transações fora do prazo, escritas suprimidas, tamanho da
+            fila, uso (de 0 a 1) do barramento desde o início, travamentos, threads de I/O substituídas
+            e tempo máximo de recuperação
+        :rtype: dict
+        """
+        elapsed = time.monotonic() - self._started_at
+        recovery_times = list(self.recovery_times)
+        return {"port": self.port,
+                "transactions": self.transactions,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "suppressed_writes": self.suppressed_writes,
+                "queue_depth": self._requests.qsize(),
+                "utilization": self.busy_time / elapsed if elapsed > 0 else 0.0,
+                "stalls": self.stalls,
+                "replaced_threads": self.replaced_threads,
+                "recovery_max": max(recovery_times, default=0.0)}
+
+    def get_utilization(self) -> dict:
+        """Calcula o uso do barramento desde o último relatório.
+
+        :return: Porta, transações, erros, transações fora do prazo, escritas suprimidas, tamanho da
+            fila e uso (de 0 a 1) do barramento no período
+        :rtype: dict
+        """
+        now = time.monotonic()
+        last_time, last_busy, last_transactions, last_suppressed = self._last_report
+        busy_time, transactions, suppressed = self.busy_time, self.transactions, self.suppressed_writes
+        self._last_report = (now, busy_time, transactions, suppressed)
+
+        elapsed = now - last_time
+        return {"port": self.port,
+                "transactions": transactions - last_transactions,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+                "suppressed_writes": suppressed - last_suppressed,
+                "queue_depth": self._requests.qsize(),
+                "utilization": (busy_time - last_busy) / elapsed if elapsed > 0 else 0.0}
+
     def _build_message(self, function_code, sub_code, data) -> bytes:
         """Constrói a mensagem Modbus com os parâmetros fornecidos.
 
@@ -82,7 +362,32 @@ class ModbusController:
 
         raise ValueError("Código de função desconhecido ou não suportado!")
 
-    def _send_and_receive(self, function_code, sub_code, data, expected_length, expected_quantity=None) -> tuple:
+    def _send_and_receive(self, function_code, sub_code, data, expected_length, expected_quantity=None,
+                          priority=PRIORITY_NORMAL, deadline=None) -> tuple:
+        """Enfileira no barramento o envio de uma mensagem Modbus e espera a resposta.
+
+        :param function_code: Código da função Modbus
+        :type function_code: int
+        :param sub_code: Subcódigo específico da função
+        :type sub_code: int
+        :param data: Dados a serem enviados
+        :type data: bytes
+        :param expected_length: Comprimento esperado da resposta
+        :type expected_length: int
+        :param expected_quantity: Quantidade esperada de dados na resposta, se aplicável
+        :type expected_quantity: int, opcional
+        :param priority: Prioridade da transação na fila do barramento
+        :type priority: int, opcional
+        :param deadline: Tempo máximo de espera pela resposta em segundos, default é o prazo do barramento
+        :type deadline: float, opcional
+        :return: Elementos extraídos da resposta Modbus
+        :rtype: tuple
+        :raises ValueError: Se houver inconsistências na resposta
+        """
+        return self._submit(priority, self._transaction, function_code, sub_code, data,
+                            expected_length, expected_quantity, deadline=deadline)
+
+    def _transaction(self, function_code, sub_code, data, expected_length, expected_quantity=None) -> tuple:
         """Envia uma mensagem Modbus e recebe a resposta.
 
         :param function_code: Código da função Modbus
@@ -99,34 +404,37 @@ class ModbusController:
         :rtype: tuple
         :raises ValueError: Se houver inconsistências na resposta
         """
-        with self.lock:
-            message = self._build_message(function_code, sub_code, data)
-            self.uart.connect()
-            self.uart.send_data(message)
-            time.sleep(0.1)
+        # Só a thread de I/O executa transações, cada uma com o transporte da sua geração
+        uart = self._io_local.uart
+        message = self._build_message(function_code, sub_code, data)
+        uart.connect()
+        uart.send_data(message)
+        time.sleep(self.turnaround)
 
-            response = self.uart.receive_data(expected_length)
-            parsed_response = self._parse_response(response, expected_length)
+        response = uart.receive_data(expected_length)
+        parsed_response = self._parse_response(response, expected_length)
 
-            if parsed_response[0] != 0x00:
-                raise ValueError(f"Esperado device_id 0x00, mas recebeu 0x{function_code:X}!")
-            if parsed_response[1] != function_code:
-                raise ValueError(f"Esperado function_code 0x{function_code:X}, mas recebeu 0x{parsed_response[1]:X}")
+        if parsed_response[0] != 0x00:
+            raise ValueError(f"Esperado device_id 0x00, mas recebeu 0x{function_code:X}!")
+        if parsed_response[1] != function_code:
+            raise ValueError(f"Esperado function_code 0x{function_code:X}, mas recebeu 0x{parsed_response[1]:X}")
 
-            if expected_quantity is None:
-                sub_code_response = parsed_response[2]
-                if sub_code_response != sub_code:
-                    raise ValueError(f"Esperado sub_code 0x{sub_code:X}, mas recebeu 0x{sub_code_response:X}!")
+        if expected_quantity is None:
+            sub_code_response = parsed_response[2]
+            if sub_code_response != sub_code:
+                raise ValueError(f"Esperado sub_code 0x{sub_code:X}, mas recebeu 0x{sub_code_response:X}!")
 
-            self.uart.disconnect()
+        uart.disconnect()
 
-            return parsed_response
+        return parsed_response
 
-    def read_encoder(self, engine_id) -> int:
+    def read_encoder(self, engine_id, deadline=None) -> int:
         """Lê o valor do encoder de um motor específico.
 
         :param engine_id: ID do motor
         :type engine_id: int
+        :param deadline: Tempo máximo de espera pela leitura em segundos, default é o prazo do barramento
+        :type deadline: float, opcional
         :return: Valor lido do encoder
         :rtype: int
         """
@@ -134,25 +442,31 @@ class ModbusController:
 
         # 1 (device_id) + 1 (function_code) + 1 (sub_code) + 4 (int) + 2 (CRC) == 9
         parsed_response = self._send_and_receive(function_code=0x23, sub_code=0xC1,
-                                                data=packed_data, expected_length=9)
+                                                data=packed_data, expected_length=9, priority=PRIORITY_CONTROL,
+                                                deadline=deadline)
 
         data = parsed_response[3]
 
         return struct.unpack('<I', data)[0]
 
-    def send_control_signal(self, engine_id: int, value: int) -> None:
+    def send_control_signal(self, engine_id: int, value: int, priority=PRIORITY_CONTROL, deadline=None) -> None:
         """Envia um sinal de controle PWM para um motor específico.
 
         :param engine_id: ID do motor
         :type engine_id: int
         :param value: Valor do sinal de controle
         :type value: int
+        :param priority: Prioridade da transação na fila do barramento, default é `PRIORITY_CONTROL`
+        :type priority: int, opcional
+        :param deadline: Tempo máximo de espera pela resposta em segundos, default é o prazo do barramento
+        :type deadline: float, opcional
         """
         packed_data = struct.pack('B', engine_id) + struct.pack('<i', value)
 
         # 1 (device_id) + 1 (function_code) + 1 (sub_code) + 2 (CRC) == 5
         _ = self._send_and_receive(function_code=0x16, sub_code=0xC2,
-                                                data=packed_data, expected_length=5)
+                                                data=packed_data, expected_length=5, priority=priority,
+                                                deadline=deadline)
 
     def send_temperature(self, elevator_id: int, temperature: float) -> None:
         """Envia a temperatura de um elevador específico.
@@ -166,30 +480,33 @@ class ModbusController:
 
         # 1 (device_id) + 1 (function_code) + 1 (sub_code) + 2 (CRC) == 5
         _ = self._send_and_receive(function_code=0x16, sub_code=0xD1,
-                                                data=packed_data, expected_length=5)
+                                                data=packed_data, expected_length=5, priority=PRIORITY_LOW)
 
 
-    def read_registers(self, initial_address, quantity) -> bytes:
+    def read_registers(self, initial_address, quantity, priority=PRIORITY_NORMAL) -> bytes:
         """Lê registradores Modbus a partir de um endereço inicial.
 
         :param initial_address: Endereço inicial dos registradores
         :type initial_address: int
         :param quantity: Quantidade de registradores a serem lidos
         :type quantity: int
+        :param priority: Prioridade da transação na fila do barramento, default é `PRIORITY_NORMAL`
+        :type priority: int, opcional
         :return: Valores lidos dos registradores
         :rtype: bytes
         """
         packed_data = struct.pack('B', quantity)
 
         ## 1 (device_id) + 1 (function_code)  + 2 (CRC) + x (número de bytes) == y
-        parsed_response = self._send_and_receive(function_code=0x03, sub_code=initial_address, data=packed_data,
-                                                 expected_length=4 + quantity, expected_quantity=quantity)
+        parsed_response = self._submit(priority, self._shadowed_transaction, initial_address, None, 0x03,
+                                       packed_data, 4 + quantity, quantity)
 
         return parsed_response[2]
 
 
-    def write_registers(self, initial_address, quantity, values: bytes) -> None:
-        """Escreve valores nos registradores Modbus a partir de um endereço inicial.
+    def write_registers(self, initial_address, quantity, values: bytes, priority=PRIORITY_NORMAL, force=False) -> bool:
+        """Escreve valores nos registradores Modbus a partir de um endereço inicial. A escrita é
+        suprimida se a cópia local já confirma os mesmos valores em todos os registradores.
 
         :param initial_address: Endereço inicial dos registradores
         :type initial_address: int
@@ -197,15 +514,59 @@ class ModbusController:
         :type quantity: int
         :param values: Valores a serem escritos nos registradores
         :type values: bytes
+        :param priority: Prioridade da transação na fila do barramento, default é `PRIORITY_NORMAL`
+        :type priority: int, opcional
+        :param force: Escreve mesmo que a cópia local já tenha os valores, default é False
+        :type force: bool, opcional
+        :return: Verdadeiro se a escrita foi enviada ao barramento
+        :rtype: bool
         """
+        if not force and self.shadow.matches(initial_address, values[:quantity]):
+            self.suppressed_writes += 1
+            return False
+
         packed_data = struct.pack('B', quantity) + values
 
         # 1 (device_id) + 1 (function_code)  + 2 (CRC) + x (número de bytes) == y
-        _ = self._send_and_receive(function_code=0x06, sub_code=initial_address, data=packed_data,
-                                   expected_length=4 + quantity, expected_quantity=quantity)
+        _ = self._submit(priority, self._shadowed_transaction, initial_address, values[:quantity], 0x06,
+                         packed_data, 4 + quantity, quantity)
+        return True
+
+    def _shadowed_transaction(self, initial_address, written, function_code, data, expected_length,
+                              quantity) -> tuple:
+        """Executa uma leitura ou escrita de registradores e atualiza a cópia local ainda na thread
+        de I/O, na mesma ordem das transações no barramento.
+
+        :param initial_address: Endereço inicial dos registradores
+        :type initial_address: int
+        :param written: Valores escritos, ou None para uma leitura
+        :type written: bytes
+        :return: Elementos extraídos da resposta Modbus
+        :rtype: tuple
+        :raises ValueError: Se houver inconsistências na resposta
+        """
+        try:
+            parsed_response = self._transaction(function_code, initial_address, data, expected_length, quantity)
+        except Exception:
+            # Não se sabe se a ESP32 aplicou a escrita
+            if written is not None:
+                self.shadow.invalidate(initial_address, quantity)
+            raise
+
+        self.shadow.update(initial_address, parsed_response[2] if written is None else written)
+        return parsed_response
 
     def disconnect(self) -> None:
-        """Desconecta a comunicação UART.
+        """Finaliza a thread de I/O do barramento e desconecta a comunicação UART.
         """
+        self._closed = True
+        future = Future()
+        self._requests.put((PRIORITY_LOW, next(self._sequence), None, (), future, None, time.monotonic()))
+        try:
+            future.result(timeout=self.deadline)
+        except FutureTimeoutError:
+            print(f"Thread de I/O do barramento {self.port} não finalizou!")
         self.uart.disconnect()
+        if isinstance(self.uart, CaptureTransport):
+            self.uart.close()
         print("Conexão UART encerrada.")
@@ -0,0 +1,100 @@
+import time
+import threading
+
+
+class RegisterShadow():
+    """Cópia local dos registradores de uma ESP32, atualizada a cada leitura e escrita no barramento.
+
+    Cada registrador guarda o último valor confirmado e o instante da confirmação. Um registrador
+    nunca lido nem escrito, invalidado ou confirmado há mais de `max_age` segundos é desconhecido,
+    então uma escrita nele sempre vai para o barramento: assim a cópia é reconciliada com a ESP32
+    periodicamente, mesmo que algo mude o registrador sem passar por este controlador.
+    """
+    def __init__(self, size=256, max_age=5.0, clock=time.monotonic) -> None:
+        """Inicializa uma nova cópia com todos os registradores desconhecidos.
+
+        :param size: Quantidade de registradores do espaço de endereços, default é 256 (0x00-0xFF)
+        :type size: int
+        :param max_age: Tempo em segundos após o qual um valor confirmado volta a ser desconhecido, default é 5.0
+        :type max_age: float
+        :param clock: Função que retorna o instante atual em segundos, default é `time.monotonic`
+        :type clock: callable
+        """
+        self.size = size
+        self.max_age = max_age
+        self.clock = clock
+
+        self._values = bytearray(size)
+        self._confirmed_at = [None] * size
+        self._lock = threading.Lock()
+
+    def _check_range(self, initial_address, quantity) -> None:
+        """Valida um intervalo de registradores.
+
+        :raises ValueError: Se o intervalo estiver fora do espaço de endereços
+        """
+        if initial_address < 0 or quantity < 0 or initial_address + quantity > self.size:
+            raise ValueError(f"Registradores 0x{initial_address:02X}+{quantity} fora do intervalo 0x00-0x{self.size - 1:02X}!")
+
+    def update(self, initial_address, values) -> None:
+        """Registra os valores confirmados (lidos ou escritos com sucesso) a partir de um endereço.
+
+        :param initial_address: Endereço do primeiro registrador
+        :type initial_address: int
+        :param values: Valores dos registradores
+        :type values: bytes
+        """
+        self._check_range(initial_address, len(values))
+        now = self.clock()
+        with self._lock:
+            self._values[initial_address:initial_address + len(values)] = values
+            for address in range(initial_address, initial_address + len(values)):
+                self._confirmed_at[address] = now
+
+    def matches(self, initial_address, values) -> bool:
+        """Verifica se todos os registradores já têm, confirmadamente, os valores dados.
+
+        :param initial_address: Endereço do primeiro registrador
+        :type initial_address: int
+        :param values: Valores esperados
+        :type values: bytes
+        :return: Verdadeiro se a escrita dos valores seria redundante
+        :rtype: bool
+        """
+        self._check_range(initial_address, len(values))
+        oldest = self.clock() - self.max_age
+        with self._lock:
+            for offset, value in enumerate(values):
+                confirmed_at = self._confirmed_at[initial_address + offset]
+                if confirmed_at is None or confirmed_at < oldest or self._values[initial_address + offset] != value:
+                    return False
+        return True
+
+    def get(self, address) -> int:
+        """Valor conhecido de um registrador.
+
+        :param address: Endereço do registrador
+        :type address: int
+        :return: Valor do registrador, ou None se ele for desconhecido
+        :rtype: int
+        """
+        self._check_range(address, 1)
+        with self._lock:
+            confirmed_at = self._confirmed_at[address]
+            if confirmed_at is None or confirmed_at < self.clock() - self.max_age:
+                return None
+            return self._values[address]
+
+    def invalidate(self, initial_address=0, quantity=None) -> None:
+        """Marca registradores como desconhecidos, forçando a próxima escrita neles.
+
+        :param initial_address: Endereço do primeiro registrador, default é 0
+        :type initial_address: int
+        :param quantity: Quantidade de registradores, default é até o fim do espaço de endereços
+        :type quantity: int
+        """
+        quantity = self.size - initial_address if quantity is None else quantity
+        self._check_range(initial_address, quantity)
+        with self._lock:
+            for address in range(initial_address, initial_address + quantity):
+                self._confirmed_at[address] = None
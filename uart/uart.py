@@ -3,15 +3,30 @@ import serial
 class Uart:
     """Classe responsável pela comunicação UART entre a Raspberry Pi e a ESP32.
     """
-    def __init__(self) -> None:
-        """Inicializa a conexão UART."""
+    def __init__(self, port='/dev/serial0', baudrate=115200, timeout=0.5) -> None:
+        """Inicializa a conexão UART.
+
+        :param port: Porta serial, default é '/dev/serial0'
+        :type port: str
+        :param baudrate: Taxa de transmissão, default é 115200
+        :type baudrate: int
+        :param timeout: Tempo máximo de uma leitura ou escrita na porta, em segundos, default é 0.5
+        :type timeout: float
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.serial_connection = None
         try:
             self.serial_connection = serial.Serial(
-                port='/dev/serial0',
-                baudrate=115200,
+                port=port,
+                baudrate=baudrate,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
                 bytesize=serial.EIGHTBITS,
+                # Uma resposta perdida pela ESP32 devolve uma leitura incompleta em vez de travar o barramento
+                timeout=timeout,
+                write_timeout=timeout,
             )
         except Exception as e:
             print(f"Erro de conexão UART: {e}")
@@ -68,6 +83,35 @@ class Uart:
             return b''
 
 
+    def reset(self) -> None:
+        """Fecha e reabre a porta serial, descartando os dados pendentes nos buffers. Fechar a porta
+        também interrompe uma leitura em andamento em outra thread.
+        """
+        if self.serial_connection is None:
+            return
+        try:
+            self.serial_connection.close()
+            self.serial_connection.open()
+            self.serial_connection.reset_input_buffer()
+            self.serial_connection.reset_output_buffer()
+        except Exception as e:
+            print(f"Erro ao reabrir conexão UART: {e}")
+
+    def reopen(self) -> "Uart":
+        """Fecha esta conexão de vez e abre outra na mesma porta. Uma leitura ainda travada nesta
+        conexão termina sem dados e não recebe nada do que chegar pela nova.
+
+        :return: Nova conexão UART
+        :rtype: class:`Uart`
+        """
+        stale, self.serial_connection = self.serial_connection, None
+        if stale is not None:
+            try:
+                stale.close()
+            except Exception as e:
+                print(f"Erro ao fechar conexão UART: {e}")
+        return Uart(port=self.port, baudrate=self.baudrate, timeout=self.timeout)
+
     def disconnect(self) -> None:
         """Desconecta da UART
         """